@@ -0,0 +1,262 @@
+"""Throughput / memory benchmarks for the modeling and export hot paths.
+
+Synthetic data shaped like the exported samples (``make_df`` in the tests:
+66 float features, tYear, label) at several row counts. Every case is timed
+``--repeat`` times (min and median reported) and run once more under
+tracemalloc for its peak allocation. Results go to JSON; ``--compare`` checks
+them against a stored baseline and exits non-zero on regressions::
+
+    PYTHONPATH=. python benchmarks/bench.py --sizes 10k,100k,1M --out benchmarks/baseline.json
+    PYTHONPATH=. python benchmarks/bench.py --sizes 10k,100k,1M --compare benchmarks/baseline.json
+
+``10M`` works too, but the CSV cases need a box with well over 10 GB of RAM
+(``pd.read_csv`` materializes float64); use ``--cases`` to run only the rest.
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.modeling import metrics
+from src.modeling.ann import IVFIndex
+from src.modeling.export_weights import gee_fragment, weights_csv
+from src.modeling.train_logit import FEATURE_COLS, fit_logit, load_xy, raw_space_weights
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Callable[["Data"], Any]
+    run: Callable[[Any], Any]
+    sized: bool = True  # False: independent of the row count, run once
+
+
+class Data:
+    """Lazily generated synthetic inputs for one row count (CSV cached under ``root``)."""
+
+    def __init__(self, rows: int, root: Path, seed: int = 0) -> None:
+        self.rows = rows
+        self.root = root
+        self.seed = seed
+        self._df: Optional[pd.DataFrame] = None
+        self._fit = None
+
+    def df(self) -> pd.DataFrame:
+        if self._df is None:
+            rng = np.random.default_rng(self.seed)
+            X = rng.standard_normal((self.rows, len(FEATURE_COLS)), dtype=np.float32)
+            X[:, -2] = X[:, -2] * 1000 + 5000
+            X[:, -1] = X[:, -1] * 5000 + 20000
+            df = pd.DataFrame(X, columns=FEATURE_COLS)
+            df["tYear"] = rng.choice([2018, 2019, 2020], size=self.rows)
+            z = X[:, 0] + 0.5 * X[:, 3] - X[:, -1] / 20000 + rng.standard_normal(self.rows)
+            df["label"] = (z > 0).astype(int)
+            self._df = df
+        return self._df
+
+    def csv(self) -> Path:
+        path = self.root / f"bench_{self.rows}_{self.seed}.csv"
+        if not path.exists():
+            self.df().to_csv(path, index=False, float_format="%.7g")
+        return path
+
+    def xy(self) -> tuple[np.ndarray, np.ndarray]:
+        return load_xy(self.df())
+
+    def scores(self) -> tuple[np.ndarray, np.ndarray]:
+        """Labels and model-like probabilities (with ties, as real scores have)."""
+        rng = np.random.default_rng(self.seed + 1)
+        y = self.df()["label"].to_numpy(np.int32)
+        p = 1 / (1 + np.exp(-(2.0 * (y - 0.5) + rng.standard_normal(len(y)))))
+        return y, np.round(p, 4)
+
+    def ann(self) -> tuple[IVFIndex, np.ndarray]:
+        """IVF index over the embedding columns, plus 1000 query rows."""
+        X, y = self.xy()
+        return IVFIndex.build(X[:, :64], labels=y), X[:1000, :64]
+
+    def model(self):
+        if self._fit is None:
+            X, y = self.xy()
+            self._fit = fit_logit(X, y)
+        return self._fit
+
+
+def _accumulate(ys_ps):
+    y, p = ys_ps
+    acc = metrics.MetricsAccumulator()
+    for i in range(0, len(y), 262_144):
+        acc.update(y[i : i + 262_144], p[i : i + 262_144])
+    return acc
+
+
+CASES = [
+    Case("read_csv_load_xy", lambda d: d.csv(), lambda path: load_xy(pd.read_csv(path))),
+    Case("fit_logit", lambda d: d.xy(), lambda xy: fit_logit(*xy)),
+    Case("raw_space_weights", lambda d: d.model(), raw_space_weights),
+    Case("metrics.eval_probs", lambda d: d.scores(), lambda s: metrics.eval_probs(*s)),
+    Case("metrics.summarize_at_threshold", lambda d: d.scores(), lambda s: metrics.summarize_at_threshold(*s, 0.5)),
+    Case("metrics.topk_report", lambda d: d.scores(), lambda s: metrics.topk_report(*s)),
+    Case("metrics.evaluate", lambda d: d.scores(), lambda s: metrics.evaluate(*s)),
+    Case("metrics.metrics_row", lambda d: d.scores(), lambda s: metrics.metrics_row(*s, "bench")),
+    Case("metrics.RankedScores", lambda d: d.scores(), lambda s: metrics.RankedScores(*s)),
+    Case(
+        "metrics.RankedScores.eval_probs+topk_report",
+        lambda d: metrics.RankedScores(*d.scores()),
+        lambda r: (r.eval_probs(), r.topk_report()),
+    ),
+    Case(
+        "metrics.RankedScores.threshold_sweep",
+        lambda d: metrics.RankedScores(*d.scores()),
+        lambda r: r.threshold_sweep(np.linspace(0.05, 0.95, 19)),
+    ),
+    Case("metrics.MetricsAccumulator.update", lambda d: d.scores(), _accumulate),
+    Case(
+        "metrics.MetricsAccumulator.report",
+        lambda d: _accumulate(d.scores()),
+        lambda acc: (acc.eval_probs(), acc.topk_report(), acc.calibration()),
+    ),
+    Case("ann.build", lambda d: d.xy(), lambda xy: IVFIndex.build(xy[0][:, :64], labels=xy[1])),
+    Case("ann.search_1k", lambda d: d.ann(), lambda a: a[0].search(a[1], k=10)),
+    Case("ann.knn_risk_1k", lambda d: d.ann(), lambda a: a[0].knn_risk(a[1], k=20)),
+    Case("export.weights_csv", lambda d: np.random.default_rng(0).normal(size=66), weights_csv, sized=False),
+    Case(
+        "export.gee_fragment",
+        lambda d: np.random.default_rng(0).normal(size=66),
+        lambda w: gee_fragment(w=w, b=-1.5, tag="bench", s2Years="2020,2021,2022,2023"),
+        sized=False,
+    ),
+]
+
+UNSIZED_LOOPS = 1000  # microsecond-scale cases are timed over this many calls
+
+
+def parse_size(s: str) -> int:
+    s = s.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s.rstrip("km")) * mult)
+
+
+def measure(case: Case, ctx: Any, repeat: int) -> dict:
+    loops = 1 if case.sized else UNSIZED_LOOPS
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            case.run(ctx)
+        times.append((time.perf_counter() - t0) / loops)
+
+    tracemalloc.start()
+    case.run(ctx)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "seconds_min": min(times),
+        "seconds_median": statistics.median(times),
+        "peak_mb": peak / 2**20,
+    }
+
+
+def run(sizes: list[int], patterns: list[str], repeat: int, root: Path, log=print) -> list[dict]:
+    cases = [c for c in CASES if any(fnmatch.fnmatch(c.name, p) for p in patterns)]
+    results = []
+    for case in [c for c in cases if not c.sized]:
+        res = {"name": case.name, "rows": None, **measure(case, case.setup(Data(0, root)), repeat)}
+        results.append(res)
+        log(f"{case.name:<45} {'-':>10} {res['seconds_median'] * 1e6:10.1f} us  {res['peak_mb']:8.2f} MB")
+    for rows in sizes:
+        data = Data(rows, root)
+        for case in [c for c in cases if c.sized]:
+            res = {"name": case.name, "rows": rows, **measure(case, case.setup(data), repeat)}
+            res["rows_per_s"] = rows / res["seconds_median"] if res["seconds_median"] > 0 else None
+            results.append(res)
+            log(f"{case.name:<45} {rows:>10} {res['seconds_median']:10.4f} s   {res['peak_mb']:8.1f} MB")
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float = 1.3, min_seconds: float = 1e-3) -> list[dict]:
+    """Cases slower (median time) or hungrier (peak memory) than ``tolerance`` x the baseline.
+
+    Timings below ``min_seconds`` in both runs are too noisy to judge and are skipped.
+    """
+    base = {(b["name"], b["rows"]): b for b in baseline}
+    regressions = []
+    for r in results:
+        b = base.get((r["name"], r["rows"]))
+        if b is None:
+            continue
+        checks = [("peak_mb", r["peak_mb"], b["peak_mb"])]
+        if max(r["seconds_median"], b["seconds_median"]) >= min_seconds:
+            checks.append(("seconds_median", r["seconds_median"], b["seconds_median"]))
+        for metric, new, old in checks:
+            if old > 0 and new / old > tolerance:
+                regressions.append({"name": r["name"], "rows": r["rows"], "metric": metric, "baseline": old, "current": new, "ratio": new / old})
+    return regressions
+
+
+def environment() -> dict:
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the modeling and export hot paths.")
+    ap.add_argument("--sizes", default="10k,100k,1M", help="Comma list of row counts (10k,100k,1M,10M)")
+    ap.add_argument("--cases", default="*", help="Comma list of case name globs, e.g. 'metrics.*,fit_logit'")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--data", default=None, help="Cache directory for the synthetic CSVs (default: temp dir)")
+    ap.add_argument("--out", default=None, help="Write results JSON here")
+    ap.add_argument("--compare", default=None, help="Baseline results JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=1.3, help="Allowed current/baseline ratio")
+    ap.add_argument("--list", action="store_true", help="List case names and exit")
+    args = ap.parse_args()
+
+    if args.list:
+        print("\n".join(c.name for c in CASES))
+        return
+
+    root = Path(args.data) if args.data else Path(tempfile.mkdtemp(prefix="bench_"))
+    root.mkdir(parents=True, exist_ok=True)
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    patterns = [p.strip() for p in args.cases.split(",") if p.strip()]
+    results = run(sizes, patterns, args.repeat, root)
+
+    payload = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": environment(), "results": results}
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(payload, indent=2) + "\n")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for r in regressions:
+            rows = "-" if r["rows"] is None else r["rows"]
+            print(f"REGRESSION {r['name']} rows={rows} {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} (x{r['ratio']:.2f})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond x{args.tolerance} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
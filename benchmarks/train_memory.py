@@ -0,0 +1,147 @@
+"""Peak-memory comparison of the training paths on a synthetic sample set.
+
+Each method runs in a fresh subprocess and reports its peak RSS (ru_maxrss),
+so the numbers are what a nightly job would see. Example::
+
+    PYTHONPATH=. python benchmarks/train_memory.py --rows 5000000 --source store
+    PYTHONPATH=. python benchmarks/train_memory.py --rows 1500000 --source csv
+
+Measured on a 5 GB / 1 CPU Linux box (numpy 2.4, scikit-learn 1.9); the
+interpreter with sklearn imported is ~150 MB of each figure:
+
+    source  rows (train)   method            peak RSS   train matrix
+    store   7.5M (5.0M)    train_from_store  4250 MB    1259 MB
+    store   7.5M (5.0M)    train_lean        1525 MB    1259 MB
+    csv     1.5M (1.0M)    train_from_csv    3015 MB     252 MB
+    csv     1.5M (1.0M)    train_lean         490 MB     252 MB
+
+train_from_csv at 5M train rows does not fit in 5 GB (the float64 DataFrame
+alone is ~2.6 GB); train_lean on the same CSV needs about what the store run
+does.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.modeling.train_logit import FEATURE_COLS
+
+YEARS = (2018, 2019, 2020)
+TRAIN_YEARS = [2018, 2019]
+
+METHODS = {
+    "store": ("train_from_store", "store"),
+    "csv": ("train_from_csv", "csv"),
+    "lean_store": ("train_lean", "store"),
+    "lean_csv": ("train_lean", "csv"),
+}
+
+
+def synth_block(rng: np.random.Generator, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Rows shaped like the exports: 64 unit-scale embeddings + two metre-scale distances."""
+    X = rng.standard_normal((n, len(FEATURE_COLS)), dtype=np.float32)
+    X[:, -2] = X[:, -2] * 1000 + 5000
+    X[:, -1] = X[:, -1] * 5000 + 20000
+    z = X[:, 0] + 0.5 * X[:, 3] - X[:, -1] / 20000 + rng.standard_normal(n, dtype=np.float32)
+    return X, (z > 0).astype(np.int8)
+
+
+def write_store(out: Path, rows: int, seed: int = 0, block: int = 500_000) -> None:
+    """Synthetic sample store (same layout as ``ingest_csv``), written block by block."""
+    rng = np.random.default_rng(seed)
+    per_year = rows // len(YEARS)
+    partitions = {}
+    for year in YEARS:
+        d = out / f"tYear={year}"
+        d.mkdir(parents=True, exist_ok=True)
+        X = np.lib.format.open_memmap(d / "X.npy", mode="w+", dtype=np.float32, shape=(per_year, len(FEATURE_COLS)))
+        y = np.empty(per_year, dtype=np.int8)
+        for i in range(0, per_year, block):
+            Xb, yb = synth_block(rng, min(block, per_year - i))
+            X[i : i + len(yb)] = Xb
+            y[i : i + len(yb)] = yb
+        X.flush()
+        del X
+        np.save(d / "y.npy", y)
+        partitions[str(year)] = {"n": per_year, "pos": int(y.sum())}
+    meta = {"version": 1, "feature_cols": FEATURE_COLS, "partitions": partitions, "sources": ["synthetic"]}
+    (out / "meta.json").write_text(json.dumps(meta, indent=2) + "\n")
+
+
+def write_csv(out: Path, rows: int, seed: int = 0, block: int = 200_000) -> None:
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    with open(out, "w") as f:
+        for i in range(0, rows, block):
+            X, y = synth_block(rng, min(block, rows - i))
+            df = pd.DataFrame(X, columns=FEATURE_COLS)
+            df["label"] = y
+            df["tYear"] = rng.choice(YEARS, size=len(y))
+            df.to_csv(f, index=False, header=i == 0, float_format="%.6g")
+
+
+def run_one(method: str, source: str) -> dict:
+    """Child-process entry point: train once, report peak RSS."""
+    from src.modeling import train_logit
+
+    fn = getattr(train_logit, METHODS[method][0])
+    t0 = time.perf_counter()
+    res, info = fn(source, TRAIN_YEARS, test_year=2020)
+    return {
+        "method": method,
+        "train_n": info["train_n"],
+        "seconds": round(time.perf_counter() - t0, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "matrix_mb": round(info["train_n"] * len(FEATURE_COLS) * 4 / 2**20, 1),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=5_000_000)
+    ap.add_argument("--source", choices=["store", "csv"], default="store")
+    ap.add_argument("--data", default=None, help="Reuse/keep synthetic data here (default: temp dir)")
+    ap.add_argument("--out_json", default=None)
+    ap.add_argument("--_child", nargs=2, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args._child:
+        print(json.dumps(run_one(*args._child)))
+        return
+
+    root = Path(args.data or tempfile.mkdtemp(prefix="train_memory_"))
+    root.mkdir(parents=True, exist_ok=True)
+    if args.source == "store":
+        data = root / f"store_{args.rows}"
+        if not (data / "meta.json").exists():
+            write_store(data, args.rows)
+    else:
+        data = root / f"train_{args.rows}.csv"
+        if not data.exists():
+            write_csv(data, args.rows)
+
+    results = []
+    for method, (_, kind) in METHODS.items():
+        if kind != args.source:
+            continue
+        out = subprocess.run(
+            [sys.executable, __file__, "--_child", method, str(data)], check=True, capture_output=True, text=True
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        print(results[-1])
+
+    if args.out_json:
+        Path(args.out_json).write_text(json.dumps({"rows": args.rows, "source": args.source, "results": results}, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
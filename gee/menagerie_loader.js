@@ -5,7 +5,10 @@
 //   lo=-10;hi=10;roadKm=15;nfMaxKm=5;s2m1=7;s2m2=9;s2cloud=60;s2Years=2020,2021,2022,2023;
 //   b=-4.18;w=...(66 nums A00..A63,dist_to_nonforest_m,dist_to_road_m);
 //
-// Required: w (66 numbers). Optional: b.
+// Required: w (66 numbers), or wz (the same weights base64-encoded, see encode_weights in
+// src/modeling/export_weights.py). Optional: b.
+// Sparse models add bands=<comma list of feature_cols>; w then has one weight per listed band
+// and only those bands are read and multiplied.
 // Adds Sentinel-2 RGB composites for years listed in s2Years (default: year-2..year+1).
 // ============================================================================
 
@@ -29,6 +32,8 @@ function getParam(key, def) {
   // Context features controls (Better not to increase this very much, cause it can bias your results)
   var roadKm  = parseFloat(getParam('roadKm', '15')); // max road search radius in km 
   var nfMaxKm = parseFloat(getParam('nfMaxKm', '5')); // cap dist-to-nonforest for stability (km)
+  // Optional precomputed frontier stack (src/gee/frontier_cache.py); skips both distance computations.
+  var frontierAsset = String(getParam('frontierAsset', '') || '');
   
   // Sentinel-2 controls (RGB only)
   var s2m1     = parseInt(getParam('s2m1', '7'), 10);      // start month
@@ -49,14 +54,66 @@ function getParam(key, def) {
   var s2Years = parseIntListCSV(s2YearsStr);
   if (s2Years === null) s2Years = [year-2, year-1, year, year+1];
   
-  // Parse weights vector
+  // Compact weights: 'F' + base64url(float32 LE) or 'H' + base64url(float32 scale, float16 LE).
+  function base64UrlBytes(s) {
+    var alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_';
+    var bytes = [], buf = 0, bits = 0;
+    for (var i = 0; i < s.length; i++) {
+      var v = alphabet.indexOf(s.charAt(i));
+      if (v < 0) continue;  // padding / stray characters
+      buf = (buf << 6) | v;
+      bits += 6;
+      if (bits >= 8) {
+        bits -= 8;
+        bytes.push((buf >> bits) & 0xff);
+        buf &= (1 << bits) - 1;
+      }
+    }
+    return bytes;
+  }
+  function float32At(b, o) {
+    var u = (b[o] | (b[o+1] << 8) | (b[o+2] << 16) | (b[o+3] << 24)) >>> 0;
+    var sign = (u >>> 31) ? -1 : 1, e = (u >>> 23) & 0xff, f = u & 0x7fffff;
+    if (e === 0) return sign * f * Math.pow(2, -149);
+    if (e === 255) return f ? NaN : sign * Infinity;
+    return sign * (1 + f / 8388608) * Math.pow(2, e - 127);
+  }
+  function float16At(b, o) {
+    var u = b[o] | (b[o+1] << 8);
+    var sign = (u >>> 15) ? -1 : 1, e = (u >>> 10) & 0x1f, f = u & 0x3ff;
+    if (e === 0) return sign * f * Math.pow(2, -24);
+    if (e === 31) return f ? NaN : sign * Infinity;
+    return sign * (1 + f / 1024) * Math.pow(2, e - 15);
+  }
+  function decodeWeights(s) {
+    var mode = s.charAt(0), b = base64UrlBytes(s.slice(1)), out = [], i;
+    if (mode === 'F') {
+      for (i = 0; i + 4 <= b.length; i += 4) out.push(float32At(b, i));
+    } else if (mode === 'H') {
+      var scale = float32At(b, 0);
+      for (i = 4; i + 2 <= b.length; i += 2) out.push(float16At(b, i) * scale);
+    } else {
+      throw new Error("Unknown wz encoding '" + mode + "' (expected F or H)");
+    }
+    return out;
+  }
+  
+  // Parse weights vector (text w=..., or compact wz=...)
+  var wzStr = String(getParam('wz', '') || '');
   var wStr  = String(getParam('w', '') || '');
-  var w = wStr
+  var w = wzStr ? decodeWeights(wzStr) : wStr
     .split(',')
     .map(function(x) { return x.trim(); })
     .filter(function(x) { return x.length > 0; })
     .map(function(x) { return parseFloat(x); });
   
+  // Optional band subset (pruned models); default is all 66 bands.
+  var bandsStr = String(getParam('bands', '') || '');
+  var bands = bandsStr ? bandsStr.split(',').map(function(x) { return x.trim(); })
+                                     .filter(function(x) { return x.length > 0; }) : null;
+  var useNF = !bands || bands.indexOf('dist_to_nonforest_m') >= 0;
+  var useRoad = !bands || bands.indexOf('dist_to_road_m') >= 0;
+  
   // Intercept is optional. Detect presence (b=0 is valid).
   var bStr = getParam('b', null);
   var hasB = (bStr !== null && bStr !== undefined && String(bStr).trim().length > 0);
@@ -69,11 +126,16 @@ function getParam(key, def) {
   print('Map start:', {lat: lat, lon: lon, zoom: zoom});
   print('Score range:', {lo: lo, hi: hi});
   print('Vector length:', w.length);
+  if (bands) print('Bands:', bands);
   print('Has intercept (b)?', hasB, hasB ? ('b=' + b) : '');
   print('roadKm:', roadKm, 'nfMaxKm:', nfMaxKm);
+  if (frontierAsset) print('Frontier asset:', frontierAsset);
   print('S2 months:', s2m1 + '-' + s2m2, 'S2 cloud <=', s2cloud, 'S2 years:', s2Years);
   
-  if (w.length !== 66) {
+  if (bands && w.length !== bands.length) {
+    throw new Error("Expected one weight per band in bands= (" + bands.length + "). Got: " + w.length);
+  }
+  if (!bands && w.length !== 66) {
     throw new Error("Expected w length 66 (A00..A63, dist_to_nonforest_m, dist_to_road_m). Got: " + w.length);
   }
   
@@ -156,27 +218,35 @@ function getParam(key, def) {
   var forest = isForestIGBP(lc).rename('forest').toByte();
   var nonforest = forest.not().rename('nonforest').toByte();
   
-  var pix_m = ee.Number(lc.projection().nominalScale());
-  var nfMax_m = ee.Number(nfMaxKm).multiply(1000);
-  
-  var dist_to_nonforest_m = nonforest.selfMask()
-    .fastDistanceTransform(256)
-    .sqrt()
-    .multiply(pix_m)
-    .rename('dist_to_nonforest_m')
-    .updateMask(forest)
-    .clamp(0, nfMax_m);
-  
-  // dist_to_road_m using GRIP4 Central-South-America roads
-  var ROADS_BR = ee.FeatureCollection('projects/sat-io/open-datasets/GRIP4/Central-South-America')
-    .filterBounds(roi);
-  
-  print('Road features in ROI:', ROADS_BR.size());
-  
-  var dist_to_road_m = ROADS_BR
-    .distance({searchRadius: ee.Number(roadKm).multiply(1000)})
-    .rename('dist_to_road_m')
-    .clip(roi);
+  var dist_to_nonforest_m, dist_to_road_m;
+  if (frontierAsset) {
+    // Exported with its own roadKm / nfMaxKm (encoded in the asset name).
+    var frontierImg = ee.Image(frontierAsset);
+    dist_to_nonforest_m = frontierImg.select('dist_to_nonforest_m');
+    dist_to_road_m = frontierImg.select('dist_to_road_m');
+  } else {
+    var pix_m = ee.Number(lc.projection().nominalScale());
+    var nfMax_m = ee.Number(nfMaxKm).multiply(1000);
+  
+    dist_to_nonforest_m = nonforest.selfMask()
+      .fastDistanceTransform(256)
+      .sqrt()
+      .multiply(pix_m)
+      .rename('dist_to_nonforest_m')
+      .updateMask(forest)
+      .clamp(0, nfMax_m);
+  
+    // dist_to_road_m using GRIP4 Central-South-America roads
+    var ROADS_BR = ee.FeatureCollection('projects/sat-io/open-datasets/GRIP4/Central-South-America')
+      .filterBounds(roi);
+  
+    if (useRoad) print('Road features in ROI:', ROADS_BR.size());
+  
+    dist_to_road_m = ROADS_BR
+      .distance({searchRadius: ee.Number(roadKm).multiply(1000)})
+      .rename('dist_to_road_m')
+      .clip(roi);
+  }
   
   // =================== APPLY 66-D LINEAR MODEL ===================
   
@@ -185,11 +255,15 @@ function getParam(key, def) {
   var aBands = aef.bandNames();
   print('AEF band count:', aBands.size());
   
-  // Build 66-band image in expected order:
+  // Build the feature image in the weights' order (66 bands, or the pruned model's bands):
   var bandNames66 = aBands.cat(ee.List(['dist_to_nonforest_m', 'dist_to_road_m']));
-  var X = aef.addBands([dist_to_nonforest_m, dist_to_road_m]).select(bandNames66);
+  var featureBands = bands ? ee.List(bands) : bandNames66;
+  var X = aef;
+  if (useNF) X = X.addBands(dist_to_nonforest_m);
+  if (useRoad) X = X.addBands(dist_to_road_m);
+  X = X.select(featureBands);
   
-  var wImg = ee.Image.constant(w).rename(bandNames66);
+  var wImg = ee.Image.constant(w).rename(featureBands);
   
   // Score and prob
   var score = X.multiply(wImg).reduce(ee.Reducer.sum());
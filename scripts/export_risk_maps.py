@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import argparse
+from typing import List
+
+import ee
+
+from src.gee.accounting import RequestAccounting
+from src.gee.frontier_cache import EarthEngineAssetStore, FrontierAssetCache
+from src.gee.sampling import ImageCache
+from src.gee.scheduler import (
+    EarthEngineTaskBackend,
+    ExportJob,
+    ExportManifest,
+    ExportScheduler,
+    SchedulerConfig,
+    parse_grid,
+    split_bbox,
+)
+from src.gee.scoring import export_image_to_asset, export_image_to_drive, score_image_for_year
+from src import profiling
+from src.profiling import span
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export score/prob risk maps from Earth Engine, one task per tile x year.")
+    ap.add_argument("--weights", required=True, help="Weights JSON from scripts/train_logit.py")
+    ap.add_argument("--bbox", required=True, help="xmin,ymin,xmax,ymax (lon/lat)")
+    ap.add_argument("--years", default="2022", help="Comma list of years to score")
+    ap.add_argument("--scale", type=int, default=500)
+    ap.add_argument("--road_search_radius_m", type=int, default=100_000)
+    ap.add_argument("--nf_max_km", type=float, default=None)
+    ap.add_argument("--all_pixels", action="store_true", help="Do not mask non-forest pixels")
+    ap.add_argument("--prefix", default="risk_v1", help="Filename / asset prefix")
+
+    dest = ap.add_mutually_exclusive_group()
+    dest.add_argument("--drive_folder", default=None, help="GeoTIFFs to this Drive folder (default destination)")
+    dest.add_argument(
+        "--asset_root",
+        default=None,
+        help="Asset folder; each year becomes an ImageCollection <root>/<prefix>_<year> of tile images",
+    )
+    ap.add_argument("--frontier_assets", default=None, help="Frontier asset folder (see src/gee/frontier_cache.py)")
+
+    # Scheduling (one task per tile x year)
+    ap.add_argument("--tiles", default="1x1", help="Tile grid over the bbox, e.g. 4x4")
+    ap.add_argument("--max_concurrent", type=int, default=4)
+    ap.add_argument("--max_retries", type=int, default=3)
+    ap.add_argument("--poll_s", type=float, default=15.0, help="Initial poll interval in seconds")
+    ap.add_argument("--manifest", default=None, help="Resumable manifest JSON (default: outputs/<prefix>_risk_manifest.json)")
+    ap.add_argument("--dry_run", action="store_true", help="Build every risk image and report its graph cost; submit nothing")
+    ap.add_argument("--profile", default=None, help="Write a Chrome-trace JSON of the run's stages here")
+
+    args = ap.parse_args()
+
+    prof = profiling.enable() if args.profile else None
+    try:
+        with span("export_risk_maps"):
+            run(args)
+    finally:
+        if prof is not None:
+            profiling.disable()
+            prof.save(args.profile)
+            print(prof.summary())
+            print(f"Saved profile to: {args.profile}")
+
+
+def _ensure_collection(asset_id: str) -> None:
+    try:
+        ee.data.getAsset(asset_id)
+    except ee.EEException:
+        ee.data.createAsset({"type": "IMAGE_COLLECTION"}, asset_id)
+
+
+def run(args) -> None:
+    with span("ee_initialize"):
+        ee.Initialize()
+
+    bbox = [float(x.strip()) for x in args.bbox.split(",")]
+    years: List[int] = [int(x) for x in args.years.split(",") if x.strip()]
+    tiles = split_bbox(bbox, *parse_grid(args.tiles))
+
+    assets = FrontierAssetCache(bbox, EarthEngineAssetStore(args.frontier_assets)) if args.frontier_assets else None
+    # One cache per run: every tile of a year shares the AEF / LC / forest images.
+    cache = ImageCache(assets=assets)
+    acct = RequestAccounting(analyze=args.dry_run)
+
+    jobs = [
+        ExportJob(
+            key=f"risk_{y}_{tile.name}",
+            kind="risk",
+            year=y,
+            tile=tile,
+            tile_scale=1,
+            params={"filename": f"{args.prefix}_{y}_{tile.name}"},
+        )
+        for y in years
+        for tile in tiles
+    ]
+
+    def build(job: ExportJob) -> ee.Image:
+        region = ee.Geometry.Rectangle(job.tile.bbox)
+        return score_image_for_year(
+            args.weights,
+            job.year,
+            region,
+            scale=args.scale,
+            road_search_radius_m=args.road_search_radius_m,
+            nf_max_km=args.nf_max_km,
+            forest_only=not args.all_pixels,
+            cache=cache,
+        )
+
+    def submit(job: ExportJob) -> ee.batch.Task:
+        with span("submit", key=job.key):
+            img = build(job)
+            region = ee.Geometry.Rectangle(job.tile.bbox)
+            desc = f"{args.prefix}_{job.key}"
+
+            def start() -> ee.batch.Task:
+                if args.asset_root:
+                    asset_id = f"{args.asset_root.rstrip('/')}/{args.prefix}_{job.year}/{job.tile.name}"
+                    return export_image_to_asset(img, desc, asset_id, region, args.scale)
+                return export_image_to_drive(img, desc, job.params["filename"], region, args.scale, folder=args.drive_folder)
+
+            return acct.call("start", job.key, start, obj=img)
+
+    if args.dry_run:
+        for job in jobs:
+            acct.graph(build(job), job.key)
+        print(acct.report())
+        return
+
+    if args.asset_root:
+        for y in years:
+            _ensure_collection(f"{args.asset_root.rstrip('/')}/{args.prefix}_{y}")
+
+    manifest = ExportManifest.load(args.manifest or f"outputs/{args.prefix}_risk_manifest.json")
+    scheduler = ExportScheduler(
+        EarthEngineTaskBackend(submit),
+        manifest,
+        SchedulerConfig(
+            max_concurrent=args.max_concurrent,
+            max_retries=args.max_retries,
+            poll_interval_s=args.poll_s,
+        ),
+    )
+    print(f"Scheduling {len(jobs)} risk-map exports over {len(tiles)} tile(s); manifest: {manifest.path}")
+    with span("schedule", jobs=len(jobs), tiles=len(tiles)):
+        scheduler.run(jobs)
+
+    print("\nAll risk-map exports finished; failed tiles (if any) are listed in the manifest.")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,27 @@ from typing import List
 import ee
 
 from src.gee.sampling import (
+    ImageCache,
     aef_for_year,
     sampling_image_for_year,
     stratified_samples_for_year,
     unbiased_forest_samples,
     export_fc_to_drive,
 )
+from src.gee.accounting import RequestAccounting
+from src.gee.export_cache import ExportCacheIndex, add_unit_args, units_from_args
+from src.gee.frontier_cache import EarthEngineAssetStore, FrontierAssetCache
+from src.gee.scheduler import (
+    COMPLETED,
+    EarthEngineTaskBackend,
+    ExportJob,
+    ExportManifest,
+    ExportScheduler,
+    SchedulerConfig,
+    Tile,
+)
+from src import profiling
+from src.profiling import span
 
 
 def parse_bbox(s: str) -> ee.Geometry:
@@ -21,70 +36,171 @@ def parse_bbox(s: str) -> ee.Geometry:
 
 
 def main():
-    ap = argparse.ArgumentParser(description="Export training/unbiased CSV tables from Earth Engine to Google Drive.")
-    ap.add_argument("--bbox", required=True, help="xmin,ymin,xmax,ymax (lon/lat)")
-    ap.add_argument("--scale", type=int, default=500)
-    ap.add_argument("--seed", type=int, default=42)
-
-    ap.add_argument("--train_years", default="2018,2019,2020")
-    ap.add_argument("--n_pos", type=int, default=5000)
-    ap.add_argument("--n_neg", type=int, default=5000)
-
-    ap.add_argument("--unbiased_year", type=int, default=2022)
-    ap.add_argument("--n_unbiased", type=int, default=30000)
-
-    ap.add_argument("--use_stable_label", action="store_true")
+    ap = argparse.ArgumentParser(description="Export training/unbiased CSV shards from Earth Engine to Google Drive.")
+    # Unit parameters (bbox, years, sizes, tiles, ...) and the local index of exported shards
+    add_unit_args(ap)
     ap.add_argument("--drive_folder", default=None, help="Optional Drive folder name")
     ap.add_argument("--prefix", default="defrisk_v1", help="Filename prefix for exports")
 
+    # Scheduling (one task per tile x year)
+    ap.add_argument("--max_concurrent", type=int, default=4)
+    ap.add_argument("--max_retries", type=int, default=3)
+    ap.add_argument("--tile_scale", type=int, default=4, help="Initial tileScale (doubled on each retry, max 16)")
+    ap.add_argument("--poll_s", type=float, default=15.0, help="Initial poll interval in seconds")
+    ap.add_argument("--manifest", default=None, help="Resumable manifest JSON (default: outputs/<prefix>_export_manifest.json)")
+    ap.add_argument("--profile", default=None, help="Write a Chrome-trace JSON of the run's stages here")
+    ap.add_argument("--ee_report", default=None, help="Write per-request EE accounting (graph size, latency) JSON here")
+    ap.add_argument("--dry_run", action="store_true", help="Build every export graph and report its cost; submit nothing")
+
     args = ap.parse_args()
 
+    prof = profiling.enable() if args.profile else None
+    try:
+        with span("export_samples"):
+            run(args)
+    finally:
+        if prof is not None:
+            profiling.disable()
+            prof.save(args.profile)
+            print(prof.summary())
+            print(f"Saved profile to: {args.profile}")
+
+
+def run(args) -> None:
     # Auth/init
-    ee.Initialize()
+    with span("ee_initialize"):
+        ee.Initialize()
 
+    bbox = [float(x.strip()) for x in args.bbox.split(",")]
     roi = parse_bbox(args.bbox)
     train_years: List[int] = [int(x) for x in args.train_years.split(",") if x.strip()]
 
+    # Each (kind, year, tile) unit is keyed by a hash of its parameters; units already
+    # in the index were exported by an earlier run (any prefix) and are not resubmitted.
+    index = ExportCacheIndex.load(args.export_index)
+    units = units_from_args(args)
+    todo = index.missing(units)
+    n_tiles = len({u.tile.name for u in units})
+    print(f"{len(units) - len(todo)} of {len(units)} shard(s) already exported (index: {index.path})")
+
+    # Frontier stacks persisted as assets over the whole bbox, read back per tile.
+    assets = FrontierAssetCache(bbox, EarthEngineAssetStore(args.frontier_assets)) if args.frontier_assets else None
+
+    # One image cache per run: overlapping years reuse the same LC/forest/AEF/frontier images.
+    cache = ImageCache(assets=assets)
+    # Graphs are only serialized for the report when one was asked for.
+    acct = RequestAccounting(analyze=bool(args.ee_report or args.dry_run))
+
     # Determine band list once (ensures correct ordering)
-    bands = aef_for_year(train_years[0], roi).bandNames().getInfo()
+    bands = acct.get_info(aef_for_year((train_years or [args.unbiased_year])[0], roi, cache).bandNames(), "bandNames")
     frontier_bands = ["dist_to_nonforest_m", "dist_to_road_m"]
     train_selectors = bands + frontier_bands + ["label", "tYear"]
     unbiased_selectors = bands + frontier_bands + ["label", "tYear", "unbiased"]
 
-    # 1) Balanced train exports (one task per year, or you can merge them)
-    fc_all = None
-    for y in train_years:
-        fc_y = stratified_samples_for_year(
-            t_year=y,
-            region=roi,
-            n_neg=args.n_neg,
-            n_pos=args.n_pos,
+    # 1) Balanced train exports, one per (year, tile)  2) unbiased forest-only exports, one per tile
+    by_key = {u.key: u for u in todo}
+    jobs: List[ExportJob] = [
+        ExportJob(
+            key=u.key,
+            kind=u.kind,
+            year=u.year,
+            tile=u.tile,
+            tile_scale=args.tile_scale,
+            params={**u.sizes, "filename": f"{args.prefix}_{u.key}"},
+        )
+        for u in todo
+    ]
+
+    def build(job: ExportJob) -> tuple[ee.FeatureCollection, List[str]]:
+        region = ee.Geometry.Rectangle(job.tile.bbox)
+        if job.kind == "train":
+            fc = stratified_samples_for_year(
+                t_year=job.year,
+                region=region,
+                n_neg=job.params["n_neg"],
+                n_pos=job.params["n_pos"],
+                scale=args.scale,
+                seed=args.seed,
+                use_stable_label=args.use_stable_label,
+                tile_scale=job.tile_scale,
+                cache=cache,
+            )
+            return fc, train_selectors
+        fc = unbiased_forest_samples(
+            t_year=job.year,
+            region=region,
+            n_pixels=job.params["n_pixels"],
             scale=args.scale,
             seed=args.seed,
             use_stable_label=args.use_stable_label,
+            tile_scale=job.tile_scale,
+            cache=cache,
         )
-        fc_all = fc_y if fc_all is None else fc_all.merge(fc_y)
-
-    desc = f"{args.prefix}_train_{train_years[0]}_{train_years[-1]}"
-    fname = f"{args.prefix}_train_balanced_{train_years[0]}_{train_years[-1]}"
-    task = export_fc_to_drive(fc_all, desc, fname, train_selectors, folder=args.drive_folder)
-    print("Started:", desc, "| task id:", task.id)
-
-    # 2) Unbiased forest-only export
-    fc_u = unbiased_forest_samples(
-        t_year=args.unbiased_year,
-        region=roi,
-        n_pixels=args.n_unbiased,
-        scale=args.scale,
-        seed=args.seed,
-        use_stable_label=args.use_stable_label,
+        return fc, unbiased_selectors
+
+    def submit(job: ExportJob) -> ee.batch.Task:
+        with span("submit", key=job.key, tile_scale=job.tile_scale):
+            if job.kind == "frontier":
+                return acct.call("start", job.key, lambda: assets.export(job.year, args.scale))
+            fc, selectors = build(job)
+            desc = f"{args.prefix}_{job.key}"
+            return acct.call(
+                "start",
+                job.key,
+                lambda: export_fc_to_drive(fc, desc, job.params["filename"], selectors, folder=args.drive_folder),
+                obj=fc,
+            )
+
+    if args.dry_run:
+        for job in jobs:
+            acct.graph(build(job)[0], job.key)
+        print(acct.report())
+        if args.ee_report:
+            acct.save(args.ee_report)
+        return
+
+    manifest = ExportManifest.load(args.manifest or f"outputs/{args.prefix}_export_manifest.json")
+    scheduler = ExportScheduler(
+        EarthEngineTaskBackend(submit),
+        manifest,
+        SchedulerConfig(
+            max_concurrent=args.max_concurrent,
+            max_retries=args.max_retries,
+            poll_interval_s=args.poll_s,
+        ),
+    )
+    if assets is not None:
+        missing = assets.missing(sorted({u.year for u in todo}), args.scale)
+        frontier_jobs = [
+            ExportJob(key=f"frontier_{y}", kind="frontier", year=y, tile=Tile(0, 0, *bbox), tile_scale=1)
+            for y in missing
+        ]
+        if frontier_jobs:
+            print(f"Exporting {len(frontier_jobs)} frontier asset(s) to {args.frontier_assets} first")
+            with span("schedule_frontier", jobs=len(frontier_jobs)):
+                scheduler.run(frontier_jobs)
+            assets.refresh()
+        # units are keyed on reading the asset; computing the distances instead would give other rows
+        failed = assets.missing(sorted({u.year for u in todo}), args.scale)
+        if failed:
+            raise SystemExit(f"Frontier assets missing for {failed} after export; re-run, or drop --frontier_assets")
+
+    print(f"Scheduling {len(jobs)} export tasks over {n_tiles} tile(s); manifest: {manifest.path}")
+    with span("schedule", jobs=len(jobs), tiles=n_tiles):
+        scheduler.run(jobs)
+    done = [manifest.jobs[j.key] for j in jobs if manifest.jobs[j.key].state == COMPLETED]
+    for job in done:
+        index.record(by_key[job.key], job.params["filename"], job.task_id)
+    index.save()
+    if args.ee_report:
+        print(acct.report())
+        acct.save(args.ee_report)
+
+    print(
+        f"\nAll export tasks finished ({len(done)} new shard(s) in Google Drive; failed tiles, if any, are listed in "
+        f"the manifest). Download the shards and build the tables with `python -m src.gee.export_cache` "
+        f"and the same unit arguments plus --shards/--out_train/--out_unbiased."
     )
-    desc_u = f"{args.prefix}_unbiased_{args.unbiased_year}"
-    fname_u = f"{args.prefix}_unbiased_forest_eval_{args.unbiased_year}"
-    task_u = export_fc_to_drive(fc_u, desc_u, fname_u, unbiased_selectors, folder=args.drive_folder)
-    print("Started:", desc_u, "| task id:", task_u.id)
-
-    print("\nAll export tasks started. Check them in the Earth Engine Tasks tab (Code Editor) or in the EE Python task list.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from src.modeling.sample_store import SampleStore
+from src.modeling.sweep import FEATURE_SETS, best_by, expanding_splits, parse_splits, run_sweep
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sweep C x year splits x feature sets over a sample store.")
+    ap.add_argument("--train_store", required=True, help="Sample store dir from `python -m src.modeling.sample_store`")
+    ap.add_argument("--Cs", default="0.01,0.1,1,10", help="Comma list of C values")
+    ap.add_argument("--splits", default=None, help='e.g. "2018,2019:2020;2018,2019,2020:2021" (default: expanding window)')
+    ap.add_argument("--feature_sets", default="all", help=f"Comma list from {sorted(FEATURE_SETS)}")
+    ap.add_argument("--unbiased_store", default=None)
+    ap.add_argument("--unbiased_year", type=int, default=None, help="Only read this tYear from --unbiased_store")
+    ap.add_argument("--metric", default=None, help="Selection metric (default: unbiased_pr_auc if given, else test_pr_auc)")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--scratch_dir", default=None, help="Where the shared standardized train matrices are written")
+    ap.add_argument("--out_csv", default="outputs/logit_sweep.csv")
+    args = ap.parse_args()
+
+    Cs = [float(c) for c in args.Cs.split(",") if c.strip()]
+    splits = parse_splits(args.splits) if args.splits else expanding_splits(SampleStore(args.train_store).years)
+    names = [n.strip() for n in args.feature_sets.split(",") if n.strip()]
+    unknown = [n for n in names if n not in FEATURE_SETS]
+    if unknown:
+        raise ValueError(f"Unknown feature sets: {unknown}. Choose from {sorted(FEATURE_SETS)}")
+
+    table = run_sweep(
+        args.train_store,
+        Cs,
+        splits=splits,
+        feature_sets={n: FEATURE_SETS[n] for n in names},
+        eval_store=args.unbiased_store,
+        eval_years=None if args.unbiased_year is None else [args.unbiased_year],
+        n_workers=args.workers,
+        scratch_dir=args.scratch_dir,
+    )
+
+    Path(args.out_csv).parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(args.out_csv, index=False)
+    print(f"Saved {len(table)} fits to: {args.out_csv}")
+
+    metric = args.metric or ("unbiased_pr_auc" if args.unbiased_store else "test_pr_auc")
+    if metric in table.columns:
+        print(f"Best C by mean {metric}:")
+        print(best_by(table, metric).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,161 @@
 from __future__ import annotations
 
 import argparse
-from pathlib import Path
-import json
 
 import numpy as np
 import pandas as pd
 
-from src.modeling.train_logit import FEATURE_COLS, train_from_csv
-from src.modeling.metrics import eval_probs, topk_report
+from src.modeling.export_weights import WEIGHT_ENCODINGS, save_logit_weights
+from src.modeling.sample_store import SampleStore
+from src.modeling.train_logit import (
+    TrainState,
+    state_path_for,
+    train_from_csv,
+    train_from_store,
+    train_incremental,
+    train_lean,
+    train_streaming,
+)
+from src.modeling.metrics import RankedScores
+from src import profiling
+from src.profiling import span
 
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--train_csv", required=True)
-    ap.add_argument("--unbiased_csv", default=None)
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--train_csv")
+    src.add_argument("--train_store", help="Sample store dir from `python -m src.modeling.sample_store`")
+    u_src = ap.add_mutually_exclusive_group()
+    u_src.add_argument("--unbiased_csv", default=None)
+    u_src.add_argument("--unbiased_store", default=None)
+    ap.add_argument("--unbiased_year", type=int, default=None, help="Only read this tYear from --unbiased_store")
     ap.add_argument("--train_years", required=True, help="Comma list, e.g. 2018,2019")
     ap.add_argument("--test_year", type=int, default=None)
     ap.add_argument("--out_json", default="models/logit_weights.json")
-    ap.add_argument("--C", type=float, default=1.0)
+    ap.add_argument("--C", type=float, default=None, help="Default 1.0 (or the previous C with --incremental_from)")
+    ap.add_argument("--streaming", action="store_true", help="Out-of-core fit over row chunks (bounded memory)")
+    ap.add_argument("--profile", default=None, help="Write a Chrome-trace JSON of the run's stages here")
+    ap.add_argument("--lean", action="store_true", help="One float32 copy of the train rows, standardized in place")
+    ap.add_argument("--chunk_rows", type=int, default=200_000)
+    ap.add_argument(
+        "--max_features",
+        type=int,
+        default=None,
+        help="Keep at most this many bands (L1 path); the JSON then lists only the active feature_cols",
+    )
+    ap.add_argument(
+        "--l1_ratio",
+        type=float,
+        default=None,
+        help="Select bands with an elastic-net fit at --C (1.0 = lasso); kept bands are refit with L2",
+    )
+    ap.add_argument(
+        "--weights_encoding",
+        choices=WEIGHT_ENCODINGS,
+        default="text",
+        help="Store w as decimal text, or compactly as base64 float32 / scaled float16 (\"wz\")",
+    )
+    ap.add_argument(
+        "--incremental_from",
+        default=None,
+        help="Previous weights JSON; --train_years are then the NEW years, fitted warm from its saved state",
+    )
     args = ap.parse_args()
 
+    prof = profiling.enable() if args.profile else None
+    try:
+        with span("train_logit"):
+            run(args, ap)
+    finally:
+        if prof is not None:
+            profiling.disable()
+            prof.save(args.profile)
+            print(prof.summary())
+            print(f"Saved profile to: {args.profile}")
+
+
+def run(args, ap) -> None:
     train_years = [int(x.strip()) for x in args.train_years.split(",") if x.strip()]
 
-    res, info = train_from_csv(args.train_csv, train_years, test_year=args.test_year, C=args.C)
+    with span("train"):
+        res, info, state = _train(args, ap, train_years)
     print("Train info:", info)
 
-    out_path = Path(args.out_json)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    payload = {"w": [float(x) for x in res.w_raw], "b": float(res.b_raw), "feature_cols": FEATURE_COLS}
-    out_path.write_text(json.dumps(payload, indent=2) + "\n")
-    print(f"Saved weights to: {out_path}")
+    with span("save_weights"):
+        save_logit_weights(
+            res.w_raw, res.b_raw, args.out_json, feature_cols=res.feature_cols, encoding=args.weights_encoding
+        )
+        state.save(state_path_for(args.out_json))
+    print(f"Saved weights to: {args.out_json} ({len(res.feature_cols)} bands)")
 
     # optional unbiased evaluation
-    if args.unbiased_csv:
-        df_u = pd.read_csv(args.unbiased_csv)
-        Xu = df_u[FEATURE_COLS].to_numpy(np.float32)
-        yu = df_u["label"].to_numpy(np.int32)
-        p = res.model.predict_proba(Xu)[:, 1]
-        print("Unbiased metrics:", eval_probs(yu, p, name="unbiased"))
-        print("TopK:", topk_report(yu, p))
+    if args.unbiased_csv or args.unbiased_store:
+        with span("unbiased_load") as sp:
+            if args.unbiased_store:
+                years = None if args.unbiased_year is None else [args.unbiased_year]
+                Xu, yu = SampleStore(args.unbiased_store).load_xy(years, feature_cols=res.feature_cols)
+            else:
+                df_u = pd.read_csv(args.unbiased_csv)
+                Xu = df_u[res.feature_cols].to_numpy(np.float32)
+                yu = df_u["label"].to_numpy(np.int32)
+            sp.set(rows=len(yu))
+        with span("unbiased_score", rows=len(yu)):
+            p = res.model.predict_proba(Xu)[:, 1]
+        with span("unbiased_metrics", rows=len(yu)):
+            ranked = RankedScores(yu, p)
+            probs = ranked.eval_probs(name="unbiased")
+            topk = ranked.topk_report()
+        print("Unbiased metrics:", probs)
+        print("TopK:", topk)
+
+
+def _train(args, ap, train_years):
+    if args.incremental_from:
+        if not args.train_store:
+            ap.error("--incremental_from needs --train_store")
+        prev = TrainState.load(state_path_for(args.incremental_from))
+        return train_incremental(args.train_store, prev, train_years, test_year=args.test_year, C=args.C)
+
+    C = 1.0 if args.C is None else args.C
+    sparse = args.max_features is not None or args.l1_ratio is not None
+    if sparse and (args.streaming or args.lean):
+        ap.error("--max_features / --l1_ratio need the in-memory path (drop --streaming / --lean)")
+    if args.streaming:
+        res, info = train_streaming(
+            args.train_store or args.train_csv,
+            train_years,
+            test_year=args.test_year,
+            C=C,
+            chunk_rows=args.chunk_rows,
+        )
+    elif args.lean:
+        res, info = train_lean(
+            args.train_store or args.train_csv,
+            train_years,
+            test_year=args.test_year,
+            C=C,
+            chunk_rows=args.chunk_rows,
+        )
+    elif args.train_store:
+        res, info = train_from_store(
+            args.train_store,
+            train_years,
+            test_year=args.test_year,
+            C=C,
+            l1_ratio=args.l1_ratio,
+            max_features=args.max_features,
+        )
+    else:
+        res, info = train_from_csv(
+            args.train_csv,
+            train_years,
+            test_year=args.test_year,
+            C=C,
+            l1_ratio=args.l1_ratio,
+            max_features=args.max_features,
+        )
+    return res, info, TrainState.from_result(res, train_years, C, feature_cols=res.feature_cols)
 
 
 if __name__ == "__main__":
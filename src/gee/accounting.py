@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import ee
+
+from src.profiling import span
+
+
+@dataclass
+class Duplicate:
+    """A subexpression the graph references more than once."""
+
+    function: str
+    refs: int
+    nodes: int  # expanded size of one copy
+
+    @property
+    def repeated_nodes(self) -> int:
+        return (self.refs - 1) * self.nodes
+
+
+@dataclass
+class GraphStats:
+    bytes: int
+    nodes: int  # distinct function invocations (what the request carries)
+    expanded_nodes: int  # invocations with every reference inlined
+    duplicates: List[Duplicate] = field(default_factory=list)
+
+
+@dataclass
+class RequestRecord:
+    kind: str  # "graph" (built, not sent), "getInfo", "start", ...
+    label: str
+    seconds: Optional[float] = None
+    graph: Optional[GraphStats] = None
+
+
+def _function_name(value: Any) -> str:
+    if isinstance(value, dict) and "functionInvocationValue" in value:
+        return str(value["functionInvocationValue"].get("functionName"))
+    return "value"
+
+
+def graph_stats(obj: Any, min_duplicate_nodes: int = 2) -> GraphStats:
+    """Size of an ``ee`` object's serialized expression and its repeated subgraphs.
+
+    Works on the Cloud API encoding (``ee.serializer.encode``): equal
+    subexpressions are hash-consed into one ``values`` entry, so a value
+    referenced more than once is a subgraph the graph uses repeatedly (the same
+    image rebuilt or reused for t-1/t/t+1, a mask applied twice, ...). Only
+    repeats of at least ``min_duplicate_nodes`` invocations that are not wholly
+    inside another repeat are reported, largest repeated cost first.
+    """
+    expr = ee.serializer.encode(obj, is_compound=True, for_cloud_api=True)
+    values: Dict[str, Any] = expr["values"]
+    refs: Counter = Counter()
+    parents: Dict[str, set] = {}
+    expanded: Dict[str, int] = {}
+    distinct = 0
+
+    def walk(v: Any, owner: Optional[str]) -> int:
+        nonlocal distinct
+        if isinstance(v, dict):
+            if "valueReference" in v:
+                rid = v["valueReference"]
+                refs[rid] += 1
+                parents.setdefault(rid, set()).add(owner)
+                if rid not in expanded:
+                    expanded[rid] = 0  # guards against cycles
+                    expanded[rid] = walk(values[rid], rid)
+                return expanded[rid]
+            n = 0
+            if "functionInvocationValue" in v:
+                distinct += 1
+                n = 1
+            return n + sum(walk(x, owner) for x in v.values())
+        if isinstance(v, list):
+            return sum(walk(x, owner) for x in v)
+        return 0
+
+    total = walk({"valueReference": expr["result"]}, None)
+    repeated = {rid for rid, n in refs.items() if n > 1}
+    duplicates = [
+        Duplicate(_function_name(values[rid]), refs[rid], expanded[rid])
+        for rid in repeated
+        if expanded[rid] >= min_duplicate_nodes and not parents[rid] <= repeated
+    ]
+    duplicates.sort(key=lambda d: d.repeated_nodes, reverse=True)
+    return GraphStats(
+        bytes=len(json.dumps(expr, separators=(",", ":"))),
+        nodes=distinct,
+        expanded_nodes=total,
+        duplicates=duplicates,
+    )
+
+
+class RequestAccounting:
+    """Counts and times the ``ee`` round-trips of a run, with the graph each one sends.
+
+    Route calls through ``get_info`` / ``call`` instead of calling ``ee``
+    directly; ``graph`` records a built object without sending it (the dry-run
+    cost of an export). With ``analyze=False`` only counts and latencies are
+    kept, so nothing is serialized twice on normal runs.
+    """
+
+    def __init__(self, analyze: bool = True, min_duplicate_nodes: int = 2) -> None:
+        self.analyze = analyze
+        self.min_duplicate_nodes = min_duplicate_nodes
+        self.records: List[RequestRecord] = []
+
+    def _stats(self, obj: Any) -> Optional[GraphStats]:
+        if not self.analyze or obj is None:
+            return None
+        return graph_stats(obj, self.min_duplicate_nodes)
+
+    def graph(self, obj: Any, label: str) -> GraphStats:
+        stats = graph_stats(obj, self.min_duplicate_nodes)
+        self.records.append(RequestRecord("graph", label, graph=stats))
+        return stats
+
+    def call(self, kind: str, label: str, fn: Callable[[], Any], obj: Any = None) -> Any:
+        """Time ``fn()`` as one ``kind`` request carrying ``obj``'s graph."""
+        record = RequestRecord(kind, label, graph=self._stats(obj))
+        with span(kind, label=label):
+            t0 = time.perf_counter()
+            try:
+                return fn()
+            finally:
+                record.seconds = time.perf_counter() - t0
+                self.records.append(record)
+
+    def get_info(self, obj: Any, label: str) -> Any:
+        return self.call("getInfo", label, obj.getInfo, obj)
+
+    def count(self, kind: str) -> int:
+        return sum(r.kind == kind for r in self.records)
+
+    def to_dict(self) -> dict:
+        kinds = Counter(r.kind for r in self.records)
+        return {
+            "calls": dict(kinds),
+            "seconds": {k: sum(r.seconds or 0.0 for r in self.records if r.kind == k) for k in kinds},
+            "records": [asdict(r) for r in self.records],
+        }
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2) + "\n")
+
+    def report(self, max_duplicates: int = 5) -> str:
+        counts = ", ".join(f"{k}={v}" for k, v in Counter(r.kind for r in self.records).items())
+        lines = [f"EE requests: {counts or 'none'}"]
+        lines.append(f"{'kind':<9} {'label':<36} {'latency s':>10} {'bytes':>9} {'nodes':>7} {'expanded':>9}")
+        for r in self.records:
+            g = r.graph
+            lat = "" if r.seconds is None else f"{r.seconds:.3f}"
+            size = ("", "", "") if g is None else (g.bytes, g.nodes, g.expanded_nodes)
+            lines.append(f"{r.kind:<9} {r.label:<36} {lat:>10} {size[0]:>9} {size[1]:>7} {size[2]:>9}")
+        for r in self.records:
+            if r.graph is None:
+                continue
+            for d in r.graph.duplicates[:max_duplicates]:
+                lines.append(
+                    f"DUPLICATE {r.label}: {d.function} referenced {d.refs}x ({d.nodes} nodes per copy)"
+                )
+        return "\n".join(lines)
+
+
+def main() -> None:
+    from src.gee.sampling import ImageCache, sampling_image_for_year, stratified_samples_for_year
+
+    ap = argparse.ArgumentParser(description="Report the expression cost of the sampling graphs without exporting.")
+    ap.add_argument("--bbox", required=True, help="xmin,ymin,xmax,ymax (lon/lat)")
+    ap.add_argument("--years", default="2018,2019,2020")
+    ap.add_argument("--scale", type=int, default=500)
+    ap.add_argument("--use_stable_label", action="store_true")
+    ap.add_argument("--no_cache", action="store_true", help="Build without an ImageCache")
+    ap.add_argument("--out_json", default=None)
+    args = ap.parse_args()
+
+    ee.Initialize()
+    region = ee.Geometry.Rectangle([float(x) for x in args.bbox.split(",")])
+    cache = None if args.no_cache else ImageCache()
+    acct = RequestAccounting()
+    for y in [int(x) for x in args.years.split(",") if x.strip()]:
+        acct.graph(sampling_image_for_year(y, region, args.scale, args.use_stable_label, cache=cache), f"sampling_image_{y}")
+        fc = stratified_samples_for_year(y, region, 5000, 5000, args.scale, 42, args.use_stable_label, cache=cache)
+        acct.graph(fc, f"train_fc_{y}")
+    print(acct.report())
+    if args.out_json:
+        acct.save(args.out_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Optional, Sequence
+
+
+# Source datasets read by src.gee.sampling. No Earth Engine import here, so
+# local steps (e.g. src.gee.export_cache) can key on them without a client.
+AEF_COLLECTION = "GOOGLE/SATELLITE_EMBEDDING/V1/ANNUAL"
+MODIS_LC_COLLECTION = "MODIS/061/MCD12Q1"
+ROADS_COLLECTION = "projects/sat-io/open-datasets/GRIP4/Central-South-America"
+
+# Bump when the frontier recipe in sampling.frontier_features_for_year changes,
+# so stale assets stop matching instead of being read back.
+FRONTIER_RECIPE_VERSION = 1
+
+# Bump when stratified_samples_for_year / unbiased_forest_samples change what
+# an exported sample contains, so cached shards stop matching.
+SAMPLES_RECIPE_VERSION = 1
+
+
+def _num(v: Optional[float]) -> Optional[float]:
+    return None if v is None else float(v)
+
+
+def frontier_asset_name(
+    t_year: int,
+    bbox: Sequence[float],
+    scale: float,
+    road_search_radius_m: float = 100_000,
+    nf_max_km: Optional[float] = None,
+) -> str:
+    """Deterministic asset name for one year's frontier stack over ``bbox``.
+
+    The readable prefix carries year / scale / radius / cap; the suffix hashes
+    the full spec (bbox rounded to 1e-6 degrees, recipe version), so equal
+    parameters always map to the same asset whatever their numeric type.
+    """
+    spec = {
+        "version": FRONTIER_RECIPE_VERSION,
+        "year": int(t_year),
+        "bbox": [round(float(v), 6) for v in bbox],
+        "scale": _num(scale),
+        "road_search_radius_m": _num(road_search_radius_m),
+        "nf_max_km": _num(nf_max_km),
+    }
+    digest = hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:12]
+    nf = "none" if nf_max_km is None else f"{float(nf_max_km):g}"
+    name = f"frontier_{int(t_year)}_s{float(scale):g}_r{float(road_search_radius_m):g}_nf{nf}_{digest}"
+    return name.replace(".", "p")  # asset ids allow [A-Za-z0-9_-]
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from src.gee.datasets import (
+    AEF_COLLECTION,
+    FRONTIER_RECIPE_VERSION,
+    MODIS_LC_COLLECTION,
+    ROADS_COLLECTION,
+    SAMPLES_RECIPE_VERSION,
+    frontier_asset_name,
+)
+from src.gee.scheduler import Tile, parse_grid, split_bbox
+
+
+# Everything upstream of a shard that is not an export argument.
+DATASET_VERSIONS: Dict[str, Any] = {
+    "aef": AEF_COLLECTION,
+    "modis_lc": MODIS_LC_COLLECTION,
+    "roads": ROADS_COLLECTION,
+    "frontier_recipe": FRONTIER_RECIPE_VERSION,
+    "samples_recipe": SAMPLES_RECIPE_VERSION,
+}
+FRONTIER_COMPUTED = "computed"
+
+DEFAULT_INDEX = "outputs/export_cache_index.json"
+
+
+@dataclass
+class ExportUnit:
+    """One exported shard: a (kind, year, tile) sample with every parameter that shapes it.
+
+    ``sizes`` holds ``n_pos`` / ``n_neg`` for train units and ``n_pixels`` for
+    unbiased ones. ``frontier`` is the frontier asset the distances are read
+    from, or ``"computed"`` when they are computed on the tile (roads and
+    non-forest are then only seen inside the tile, so values near its edges
+    differ). ``tile_scale`` is not part of the unit: it changes how Earth
+    Engine splits the work, not the rows.
+    """
+
+    kind: str
+    year: int
+    tile: Tile
+    scale: float
+    seed: int
+    use_stable_label: bool
+    sizes: Dict[str, int]
+    frontier: str = FRONTIER_COMPUTED
+    datasets: Dict[str, Any] = field(default_factory=lambda: dict(DATASET_VERSIONS))
+
+    def spec(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "year": int(self.year),
+            "bbox": [round(float(v), 6) for v in self.tile.bbox],
+            "scale": float(self.scale),
+            "seed": int(self.seed),
+            "use_stable_label": bool(self.use_stable_label),
+            "sizes": {k: int(v) for k, v in self.sizes.items()},
+            "frontier": self.frontier,
+            "datasets": self.datasets,
+        }
+
+    @property
+    def key(self) -> str:
+        """``<kind>_<year>_<tile>_<sha1[:12] of spec()>``: equal parameters give the same key on any run."""
+        digest = hashlib.sha1(json.dumps(self.spec(), sort_keys=True).encode()).hexdigest()[:12]
+        return f"{self.kind}_{int(self.year)}_{self.tile.name}_{digest}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "ExportUnit":
+        d = dict(d)
+        d["tile"] = Tile(**d["tile"])
+        return cls(**d)
+
+
+def plan_units(
+    bbox: Sequence[float],
+    grid: tuple[int, int],
+    train_years: Iterable[int],
+    unbiased_years: Iterable[int],
+    scale: float,
+    seed: int,
+    use_stable_label: bool,
+    n_pos: int,
+    n_neg: int,
+    n_unbiased: int,
+    frontier_assets: Optional[str] = None,
+) -> List[ExportUnit]:
+    """Every shard of a train/unbiased export, sample sizes split evenly over the tiles.
+
+    With ``frontier_assets`` (an asset folder, as in ``--frontier_assets``) the
+    units read each year's whole-bbox frontier asset instead of computing it.
+    """
+    tiles = split_bbox(bbox, *grid)
+    n_tiles = len(tiles)
+
+    def frontier(year: int) -> str:
+        if not frontier_assets:
+            return FRONTIER_COMPUTED
+        return f"{frontier_assets.rstrip('/')}/{frontier_asset_name(year, bbox, scale)}"
+
+    units: List[ExportUnit] = []
+    for tile in tiles:
+        for y in train_years:
+            sizes = {"n_pos": math.ceil(n_pos / n_tiles), "n_neg": math.ceil(n_neg / n_tiles)}
+            units.append(ExportUnit("train", int(y), tile, scale, seed, use_stable_label, sizes, frontier(y)))
+        for y in unbiased_years:
+            sizes = {"n_pixels": math.ceil(n_unbiased / n_tiles)}
+            units.append(ExportUnit("unbiased", int(y), tile, scale, seed, use_stable_label, sizes, frontier(y)))
+    return units
+
+
+class ExportCacheIndex:
+    """Local JSON record of exported shards: unit key -> unit spec, Drive filename, task id.
+
+    Shared across runs and prefixes, so a later export with overlapping
+    parameters only submits the units that are not recorded yet.
+    """
+
+    def __init__(self, path: str | Path, entries: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = entries or {}
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ExportCacheIndex":
+        path = Path(path)
+        if not path.exists():
+            return cls(path)
+        return cls(path, json.loads(path.read_text()).get("units", {}))
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"units": self.entries}, indent=2, sort_keys=True) + "\n")
+        os.replace(tmp, self.path)
+
+    def __contains__(self, unit: ExportUnit) -> bool:
+        return unit.key in self.entries
+
+    def missing(self, units: Iterable[ExportUnit]) -> List[ExportUnit]:
+        return [u for u in units if u not in self]
+
+    def record(self, unit: ExportUnit, filename: str, task_id: Optional[str] = None) -> None:
+        self.entries[unit.key] = {
+            "unit": unit.to_dict(),
+            "filename": filename,
+            "task_id": task_id,
+            "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    def shard_path(self, unit: ExportUnit, shard_dir: str | Path) -> Path:
+        """Where the downloaded CSV of a recorded unit is expected (``<shard_dir>/<filename>.csv``)."""
+        entry = self.entries.get(unit.key)
+        if entry is None:
+            raise ValueError(f"Unit {unit.key} has not been exported; run export_samples_to_drive.py first")
+        return Path(shard_dir) / f"{entry['filename']}.csv"
+
+
+def assemble(index: ExportCacheIndex, units: Sequence[ExportUnit], shard_dir: str | Path, out: str | Path) -> int:
+    """Concatenate the cached shard CSVs of ``units`` (in order) into ``out``; returns the row count.
+
+    Shards are copied line by line, so memory does not grow with the table.
+    All shards must share one header; empty shards (no rows sampled) are skipped.
+    """
+    paths = [index.shard_path(u, shard_dir) for u in units]
+    absent = [str(p) for p in paths if not p.exists()]
+    if absent:
+        raise ValueError(f"{len(absent)} shard(s) missing from {shard_dir} (download them from Drive): {absent[:5]}")
+
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    header: Optional[str] = None
+    n_rows = 0
+    with out.open("w", newline="") as dst:
+        for p in paths:
+            with p.open(newline="") as src:
+                first = src.readline()
+                if not first.strip():
+                    continue
+                if header is None:
+                    header = first
+                    dst.write(header if header.endswith("\n") else header + "\n")
+                elif first.rstrip("\r\n") != header.rstrip("\r\n"):
+                    raise ValueError(f"{p} has columns {first.strip()!r}, expected {header.strip()!r}")
+                for line in src:
+                    if line.strip():
+                        dst.write(line if line.endswith("\n") else line + "\n")
+                        n_rows += 1
+    return n_rows
+
+
+def add_unit_args(ap: argparse.ArgumentParser) -> None:
+    """The export parameters that make up unit keys (shared with export_samples_to_drive.py)."""
+    ap.add_argument("--bbox", required=True, help="xmin,ymin,xmax,ymax (lon/lat)")
+    ap.add_argument("--scale", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=42)
+
+    ap.add_argument("--train_years", default="2018,2019,2020")
+    ap.add_argument("--n_pos", type=int, default=5000, help="Positives per year (split evenly across tiles)")
+    ap.add_argument("--n_neg", type=int, default=5000, help="Negatives per year (split evenly across tiles)")
+
+    ap.add_argument("--unbiased_year", type=int, default=2022)
+    ap.add_argument("--n_unbiased", type=int, default=30000, help="Unbiased pixels (split evenly across tiles)")
+
+    ap.add_argument("--use_stable_label", action="store_true")
+    ap.add_argument("--tiles", default="1x1", help="Tile grid over the bbox, e.g. 4x4")
+    ap.add_argument(
+        "--frontier_assets",
+        default=None,
+        help="Asset folder for per-year frontier stacks (exported once, then read instead of recomputed)",
+    )
+    ap.add_argument("--export_index", default=DEFAULT_INDEX, help="Local index of exported shards")
+
+
+def units_from_args(args) -> List[ExportUnit]:
+    return plan_units(
+        [float(x.strip()) for x in args.bbox.split(",")],
+        parse_grid(args.tiles),
+        [int(x) for x in args.train_years.split(",") if x.strip()],
+        [args.unbiased_year],
+        scale=args.scale,
+        seed=args.seed,
+        use_stable_label=args.use_stable_label,
+        n_pos=args.n_pos,
+        n_neg=args.n_neg,
+        n_unbiased=args.n_unbiased,
+        frontier_assets=args.frontier_assets,
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Assemble train/unbiased CSV tables from cached export shards.")
+    add_unit_args(ap)
+    ap.add_argument("--shards", required=True, help="Directory with the shard CSVs downloaded from Drive")
+    ap.add_argument("--out_train", default=None, help="Train CSV (all --train_years)")
+    ap.add_argument("--out_unbiased", default=None, help="Unbiased CSV (--unbiased_year)")
+    args = ap.parse_args()
+
+    if not args.out_train and not args.out_unbiased:
+        ap.error("pass --out_train and/or --out_unbiased")
+    index = ExportCacheIndex.load(args.export_index)
+    units = units_from_args(args)
+    for kind, out in (("train", args.out_train), ("unbiased", args.out_unbiased)):
+        if out:
+            selected = sorted((u for u in units if u.kind == kind), key=lambda u: (u.year, u.tile.iy, u.tile.ix))
+            n = assemble(index, selected, args.shards, out)
+            print(f"Assembled {n} {kind} rows from {len(selected)} shard(s) -> {out}")
+
+
+if __name__ == "__main__":
+    main()
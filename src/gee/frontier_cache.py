@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import argparse
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Sequence, Set
+
+import ee
+
+from src.gee.datasets import FRONTIER_RECIPE_VERSION, frontier_asset_name  # noqa: F401 (re-exported)
+from src.gee.sampling import frontier_features_for_year
+
+
+class AssetStore(Protocol):
+    def list(self) -> Set[str]:
+        """Names (last path component) of the assets currently under the store's root."""
+
+    def export(self, image: ee.Image, asset_id: str, region: ee.Geometry, scale: float) -> Any:
+        """Start persisting ``image`` as ``asset_id``; returns the started task."""
+
+
+class EarthEngineAssetStore:
+    """Image assets under an Earth Engine folder, e.g. ``projects/<project>/assets/frontier``."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root.rstrip("/")
+
+    def list(self) -> Set[str]:
+        ids: Set[str] = set()
+        params: Dict[str, Any] = {"parent": self.root}
+        while True:
+            try:
+                page = ee.data.listAssets(params)
+            except ee.EEException:
+                return ids  # folder does not exist yet
+            ids.update((a.get("id") or a["name"]).rsplit("/", 1)[-1] for a in page.get("assets", []))
+            token = page.get("nextPageToken")
+            if not token:
+                return ids
+            params = {"parent": self.root, "pageToken": token}
+
+    def export(self, image: ee.Image, asset_id: str, region: ee.Geometry, scale: float) -> Any:
+        try:
+            ee.data.getAsset(self.root)
+        except ee.EEException:
+            ee.data.createAsset({"type": "FOLDER"}, self.root)
+        task = ee.batch.Export.image.toAsset(
+            image=image,
+            description=asset_id.rsplit("/", 1)[-1][:100],
+            assetId=asset_id,
+            region=region,
+            scale=scale,
+            maxPixels=1e13,
+            pyramidingPolicy={".default": "mean"},
+        )
+        task.start()
+        return task
+
+
+class LocalAssetStore:
+    """In-process stand-in: an export is "complete" as soon as it is started."""
+
+    class Task:
+        def __init__(self, asset_id: str) -> None:
+            self.id = f"local-{asset_id}"
+
+    def __init__(self, root: str = "local/frontier") -> None:
+        self.root = root.rstrip("/")
+        self.images: Dict[str, Any] = {}
+
+    def list(self) -> Set[str]:
+        return {asset_id.rsplit("/", 1)[-1] for asset_id in self.images}
+
+    def export(self, image: ee.Image, asset_id: str, region: ee.Geometry, scale: float) -> Any:
+        self.images[asset_id] = image
+        return self.Task(asset_id)
+
+
+class FrontierAssetCache:
+    """Persisted frontier stacks (``dist_to_nonforest_m``, ``dist_to_road_m``) for one bbox.
+
+    Pass it to ``ImageCache(assets=...)``: sampling then reads the year's stack
+    from its asset (clipped to the tile) when one was exported with the same
+    scale / road radius / nf cap, and computes it otherwise. ``export_missing``
+    starts the exports; existence is listed once and re-read after ``refresh``.
+    """
+
+    def __init__(self, bbox: Sequence[float], store: AssetStore) -> None:
+        self.bbox = [float(v) for v in bbox]
+        self.store = store
+        self._existing: Optional[Set[str]] = None
+        self.hits = 0
+        self.misses = 0
+
+    def asset_id(
+        self,
+        t_year: int,
+        scale: float,
+        road_search_radius_m: float = 100_000,
+        nf_max_km: Optional[float] = None,
+    ) -> str:
+        name = frontier_asset_name(t_year, self.bbox, scale, road_search_radius_m, nf_max_km)
+        return f"{self.store.root}/{name}"
+
+    def refresh(self) -> None:
+        self._existing = None
+
+    def exists(self, asset_id: str) -> bool:
+        if self._existing is None:
+            self._existing = set(self.store.list())
+        return asset_id.rsplit("/", 1)[-1] in self._existing
+
+    def lookup(self, dataset: str, year: int, region: ee.Geometry, **params: Any) -> Optional[ee.Image]:
+        """``ImageCache`` hook: the persisted stack for ``frontier`` entries, else None."""
+        if dataset != "frontier":
+            return None
+        asset_id = self.asset_id(year, params["scale"], params["road_search_radius_m"], params["nf_max_km"])
+        if not self.exists(asset_id):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return ee.Image(asset_id).select(["dist_to_nonforest_m", "dist_to_road_m"]).clip(region)
+
+    def image_to_export(
+        self,
+        t_year: int,
+        scale: float,
+        road_search_radius_m: float = 100_000,
+        nf_max_km: Optional[float] = None,
+    ) -> ee.Image:
+        region = ee.Geometry.Rectangle(self.bbox)
+        return frontier_features_for_year(
+            t_year, region, scale, road_search_radius_m=road_search_radius_m, nf_max_km=nf_max_km
+        ).toFloat()
+
+    def export(
+        self,
+        t_year: int,
+        scale: float,
+        road_search_radius_m: float = 100_000,
+        nf_max_km: Optional[float] = None,
+    ) -> Any:
+        asset_id = self.asset_id(t_year, scale, road_search_radius_m, nf_max_km)
+        image = self.image_to_export(t_year, scale, road_search_radius_m, nf_max_km)
+        task = self.store.export(image, asset_id, ee.Geometry.Rectangle(self.bbox), scale)
+        self.refresh()
+        return task
+
+    def missing(
+        self,
+        years: Iterable[int],
+        scale: float,
+        road_search_radius_m: float = 100_000,
+        nf_max_km: Optional[float] = None,
+    ) -> List[int]:
+        return [
+            int(y)
+            for y in dict.fromkeys(years)
+            if not self.exists(self.asset_id(y, scale, road_search_radius_m, nf_max_km))
+        ]
+
+    def export_missing(
+        self,
+        years: Iterable[int],
+        scale: float,
+        road_search_radius_m: float = 100_000,
+        nf_max_km: Optional[float] = None,
+    ) -> Dict[int, Any]:
+        """Start an export for every year without an asset; returns {year: task}."""
+        todo = self.missing(years, scale, road_search_radius_m, nf_max_km)
+        return {y: self.export(y, scale, road_search_radius_m, nf_max_km) for y in todo}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Export per-year frontier stacks as Earth Engine image assets.")
+    ap.add_argument("--bbox", required=True, help="xmin,ymin,xmax,ymax (lon/lat)")
+    ap.add_argument("--years", required=True, help="Comma list of years")
+    ap.add_argument("--root", required=True, help="Asset folder, e.g. projects/<project>/assets/frontier")
+    ap.add_argument("--scale", type=float, default=500)
+    ap.add_argument("--road_search_radius_m", type=float, default=100_000)
+    ap.add_argument("--nf_max_km", type=float, default=None)
+    args = ap.parse_args()
+
+    ee.Initialize()
+    bbox = [float(x.strip()) for x in args.bbox.split(",")]
+    years = [int(x) for x in args.years.split(",") if x.strip()]
+    cache = FrontierAssetCache(bbox, EarthEngineAssetStore(args.root))
+    params = dict(road_search_radius_m=args.road_search_radius_m, nf_max_km=args.nf_max_km)
+
+    tasks = cache.export_missing(years, args.scale, **params)
+    for y in years:
+        state = f"export started (task {tasks[y].id})" if y in tasks else "exists"
+        print(f"{y}: {cache.asset_id(y, args.scale, **params)}  {state}")
+
+
+if __name__ == "__main__":
+    main()
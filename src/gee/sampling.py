@@ -1,34 +1,103 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import ee
-def aef_ic() -> ee.ImageCollection:
-    return ee.ImageCollection("GOOGLE/SATELLITE_EMBEDDING/V1/ANNUAL")
 
-def modis_lc_ic() -> ee.ImageCollection:
-    return ee.ImageCollection("MODIS/061/MCD12Q1")
+from src.gee.datasets import AEF_COLLECTION, MODIS_LC_COLLECTION, ROADS_COLLECTION
 
-def roads_br_fc() -> ee.FeatureCollection:
-    return ee.FeatureCollection("projects/sat-io/open-datasets/GRIP4/Central-South-America")
 
+def aef_ic() -> ee.ImageCollection:
+    return ee.ImageCollection(AEF_COLLECTION)
 
-def aef_for_year(year: int, region: ee.Geometry) -> ee.Image:
-    start = ee.Date.fromYMD(year, 1, 1)
-    end = start.advance(1, "year")
-    return aef_ic().filterDate(start, end).filterBounds(region).mosaic().clip(region)
+def modis_lc_ic() -> ee.ImageCollection:
+    return ee.ImageCollection(MODIS_LC_COLLECTION)
 
+def roads_br_fc() -> ee.FeatureCollection:
+    return ee.FeatureCollection(ROADS_COLLECTION)
+
+
+class ImageCache:
+    """Per-run memo of Earth Engine images keyed by (dataset, year, region, params).
+
+    Building an ``ee.Image`` only constructs a client-side expression graph, but a
+    sampling run asks for the same year's LC, forest mask, AEF mosaic and frontier
+    stack many times (labels need t-1/t/t+1, consecutive train years overlap, the
+    unbiased sample rebuilds the forest mask). Passing one cache through the helpers
+    builds each of those once and reuses the same object, so the graphs we send
+    stay small. Scope a cache to one run; it never expires entries.
+
+    ``assets`` (e.g. ``frontier_cache.FrontierAssetCache``) is asked first on a
+    miss via ``assets.lookup(dataset, year, region, **params)``; an image it
+    returns (read from a persisted asset) is used instead of building one.
+    """
+
+    def __init__(self, assets: Optional[Any] = None) -> None:
+        self._images: Dict[Tuple[Any, ...], Any] = {}
+        self.assets = assets
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, dataset: str, year: int, region: ee.Geometry, build: Callable[[], Any], **params: Any) -> Any:
+        key = (dataset, int(year), _region_key(region), tuple(sorted(params.items())))
+        if key in self._images:
+            self.hits += 1
+            return self._images[key]
+        self.misses += 1
+        img = self.assets.lookup(dataset, year, region, **params) if self.assets is not None else None
+        if img is None:
+            img = build()
+        self._images[key] = img
+        return img
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+
+def _region_key(region: ee.Geometry) -> Any:
+    # ee.ComputedObject hashes by value, so equal geometries share entries.
+    try:
+        hash(region)
+    except TypeError:
+        return id(region)
+    return region
+
+
+def _memo(
+    cache: Optional[ImageCache],
+    dataset: str,
+    year: int,
+    region: ee.Geometry,
+    build: Callable[[], Any],
+    **params: Any,
+) -> Any:
+    if cache is None:
+        return build()
+    return cache.get(dataset, year, region, build, **params)
+
+
+def aef_for_year(year: int, region: ee.Geometry, cache: Optional[ImageCache] = None) -> ee.Image:
+    def build() -> ee.Image:
+        start = ee.Date.fromYMD(year, 1, 1)
+        end = start.advance(1, "year")
+        return aef_ic().filterDate(start, end).filterBounds(region).mosaic().clip(region)
+
+    return _memo(cache, "aef", year, region, build)
+
+
+def modis_lc_for_year(year: int, region: ee.Geometry, cache: Optional[ImageCache] = None) -> ee.Image:
+    def build() -> ee.Image:
+        # MODIS MCD12Q1 has one image per year; filter by calendar year.
+        img = (
+            modis_lc_ic().filter(ee.Filter.calendarRange(year, year, "year"))
+            .first()
+            .select("LC_Type1")
+            .clip(region)
+        )
+        return img
 
-def modis_lc_for_year(year: int, region: ee.Geometry) -> ee.Image:
-    # MODIS MCD12Q1 has one image per year; filter by calendar year.
-    img = (
-        modis_lc_ic().filter(ee.Filter.calendarRange(year, year, "year"))
-        .first()
-        .select("LC_Type1")
-        .clip(region)
-    )
-    return img
+    return _memo(cache, "modis_lc", year, region, build)
 
 
 def is_forest_igbp(lc_type1: ee.Image) -> ee.Image:
@@ -42,10 +111,24 @@ def is_forest_igbp(lc_type1: ee.Image) -> ee.Image:
     )
 
 
-def forest_mask_for_year(t_year: int, region: ee.Geometry) -> ee.Image:
-    lc_t = modis_lc_for_year(t_year, region)
-    forest = is_forest_igbp(lc_t).rename("forest").toByte()
-    return forest.updateMask(lc_t.mask())
+def forest_igbp_for_year(year: int, region: ee.Geometry, cache: Optional[ImageCache] = None) -> ee.Image:
+    """``is_forest_igbp`` of the year's MODIS LC (unmasked boolean image)."""
+    return _memo(
+        cache,
+        "forest_igbp",
+        year,
+        region,
+        lambda: is_forest_igbp(modis_lc_for_year(year, region, cache)),
+    )
+
+
+def forest_mask_for_year(t_year: int, region: ee.Geometry, cache: Optional[ImageCache] = None) -> ee.Image:
+    def build() -> ee.Image:
+        lc_t = modis_lc_for_year(t_year, region, cache)
+        forest = forest_igbp_for_year(t_year, region, cache).rename("forest").toByte()
+        return forest.updateMask(lc_t.mask())
+
+    return _memo(cache, "forest_mask", t_year, region, build)
 
 
 def frontier_features_for_year(
@@ -54,72 +137,96 @@ def frontier_features_for_year(
     scale: int,
     road_search_radius_m: int = 100_000,
     nf_max_km: Optional[float] = None,
+    cache: Optional[ImageCache] = None,
 ) -> ee.Image:
-    lc_t = modis_lc_for_year(t_year, region)
-    forest = is_forest_igbp(lc_t).rename("forest").toByte()
-    nonforest = forest.Not().rename("nonforest").toByte()
-
-    pix_m = ee.Number(lc_t.projection().nominalScale())
-
-    dist_nf = (
-        nonforest.selfMask()
-        .fastDistanceTransform(256)
-        .sqrt()
-        .multiply(pix_m)
-        .rename("dist_to_nonforest_m")
-        .updateMask(forest)
-    )
+    def build() -> ee.Image:
+        lc_t = modis_lc_for_year(t_year, region, cache)
+        forest = forest_igbp_for_year(t_year, region, cache).rename("forest").toByte()
+        nonforest = forest.Not().rename("nonforest").toByte()
+
+        pix_m = ee.Number(lc_t.projection().nominalScale())
+
+        dist_nf = (
+            nonforest.selfMask()
+            .fastDistanceTransform(256)
+            .sqrt()
+            .multiply(pix_m)
+            .rename("dist_to_nonforest_m")
+            .updateMask(forest)
+        )
 
-    if nf_max_km is not None:
-        dist_nf = dist_nf.clamp(0, ee.Number(nf_max_km).multiply(1000))
+        if nf_max_km is not None:
+            dist_nf = dist_nf.clamp(0, ee.Number(nf_max_km).multiply(1000))
 
-    dist_rd = (
-        roads_br_fc().filterBounds(region)
-        .distance(searchRadius=road_search_radius_m)
-        .rename("dist_to_road_m")
-        .clip(region)
-    )
+        dist_rd = (
+            roads_br_fc().filterBounds(region)
+            .distance(searchRadius=road_search_radius_m)
+            .rename("dist_to_road_m")
+            .clip(region)
+        )
 
-    return dist_nf.addBands(dist_rd)
+        return dist_nf.addBands(dist_rd)
+
+    return _memo(
+        cache,
+        "frontier",
+        t_year,
+        region,
+        build,
+        scale=scale,
+        road_search_radius_m=road_search_radius_m,
+        nf_max_km=nf_max_km,
+    )
 
 
-def label_basic_loss(t_year: int, region: ee.Geometry) -> ee.Image:
+def label_basic_loss(t_year: int, region: ee.Geometry, cache: Optional[ImageCache] = None) -> ee.Image:
     # pos = forest(t)=1 & forest(t+1)=0
-    lc_t = modis_lc_for_year(t_year, region)
-    lc_t1 = modis_lc_for_year(t_year + 1, region)
+    def build() -> ee.Image:
+        lc_t = modis_lc_for_year(t_year, region, cache)
+        lc_t1 = modis_lc_for_year(t_year + 1, region, cache)
+
+        forest_t = forest_igbp_for_year(t_year, region, cache)
+        forest_t1 = forest_igbp_for_year(t_year + 1, region, cache)
 
-    forest_t = is_forest_igbp(lc_t)
-    forest_t1 = is_forest_igbp(lc_t1)
+        y = forest_t.And(forest_t1.Not()).rename("label").toByte()
+        valid = lc_t.mask().And(lc_t1.mask())
+        return y.updateMask(valid)
 
-    y = forest_t.And(forest_t1.Not()).rename("label").toByte()
-    valid = lc_t.mask().And(lc_t1.mask())
-    return y.updateMask(valid)
+    return _memo(cache, "label_basic", t_year, region, build)
 
 
-def label_stable_loss(t_year: int, region: ee.Geometry) -> ee.Image:
+def label_stable_loss(t_year: int, region: ee.Geometry, cache: Optional[ImageCache] = None) -> ee.Image:
     # pos = forest(t-1)=1 & forest(t)=1 & nonforest(t+1)=1
     # neg = forest(t-1)=1 & forest(t)=1 & forest(t+1)=1
-    lc_tm1 = modis_lc_for_year(t_year - 1, region)
-    lc_t = modis_lc_for_year(t_year, region)
-    lc_tp1 = modis_lc_for_year(t_year + 1, region)
+    def build() -> ee.Image:
+        lc_tm1 = modis_lc_for_year(t_year - 1, region, cache)
+        lc_t = modis_lc_for_year(t_year, region, cache)
+        lc_tp1 = modis_lc_for_year(t_year + 1, region, cache)
 
-    f_tm1 = is_forest_igbp(lc_tm1)
-    f_t = is_forest_igbp(lc_t)
-    f_tp1 = is_forest_igbp(lc_tp1)
+        f_tm1 = forest_igbp_for_year(t_year - 1, region, cache)
+        f_t = forest_igbp_for_year(t_year, region, cache)
+        f_tp1 = forest_igbp_for_year(t_year + 1, region, cache)
 
-    pos = f_tm1.And(f_t).And(f_tp1.Not())
-    neg = f_tm1.And(f_t).And(f_tp1)
+        pos = f_tm1.And(f_t).And(f_tp1.Not())
+        neg = f_tm1.And(f_t).And(f_tp1)
 
-    y = pos.rename("label").toByte()
-    y = y.where(neg, 0)
+        y = pos.rename("label").toByte()
+        y = y.where(neg, 0)
 
-    keep = pos.Or(neg)
-    valid = lc_tm1.mask().And(lc_t.mask()).And(lc_tp1.mask())
-    return y.updateMask(keep).updateMask(valid)
+        keep = pos.Or(neg)
+        valid = lc_tm1.mask().And(lc_t.mask()).And(lc_tp1.mask())
+        return y.updateMask(keep).updateMask(valid)
 
+    return _memo(cache, "label_stable", t_year, region, build)
 
-def label_for_year(t_year: int, region: ee.Geometry, use_stable_label: bool) -> ee.Image:
-    return label_stable_loss(t_year, region) if use_stable_label else label_basic_loss(t_year, region)
+
+def label_for_year(
+    t_year: int,
+    region: ee.Geometry,
+    use_stable_label: bool,
+    cache: Optional[ImageCache] = None,
+) -> ee.Image:
+    return label_stable_loss(t_year, region, cache) if use_stable_label else label_basic_loss(t_year, region, cache)
 
 
 def sampling_image_for_year(
@@ -129,13 +236,32 @@ def sampling_image_for_year(
     use_stable_label: bool,
     road_search_radius_m: int = 100_000,
     nf_max_km: Optional[float] = None,
+    cache: Optional[ImageCache] = None,
 ) -> ee.Image:
-    X = aef_for_year(t_year, region)  # A00..A63
-    F = frontier_features_for_year(
-        t_year, region, scale, road_search_radius_m=road_search_radius_m, nf_max_km=nf_max_km
+    def build() -> ee.Image:
+        X = aef_for_year(t_year, region, cache)  # A00..A63
+        F = frontier_features_for_year(
+            t_year,
+            region,
+            scale,
+            road_search_radius_m=road_search_radius_m,
+            nf_max_km=nf_max_km,
+            cache=cache,
+        )
+        y = label_for_year(t_year, region, use_stable_label, cache)
+        return X.addBands(F).addBands(y)
+
+    return _memo(
+        cache,
+        "sampling",
+        t_year,
+        region,
+        build,
+        scale=scale,
+        use_stable_label=use_stable_label,
+        road_search_radius_m=road_search_radius_m,
+        nf_max_km=nf_max_km,
     )
-    y = label_for_year(t_year, region, use_stable_label)
-    return X.addBands(F).addBands(y)
 
 
 def stratified_samples_for_year(
@@ -147,8 +273,9 @@ def stratified_samples_for_year(
     seed: int,
     use_stable_label: bool,
     tile_scale: int = 4,
+    cache: Optional[ImageCache] = None,
 ) -> ee.FeatureCollection:
-    img = sampling_image_for_year(t_year, region, scale, use_stable_label)
+    img = sampling_image_for_year(t_year, region, scale, use_stable_label, cache=cache)
 
     fc = img.stratifiedSample(
         numPoints=1,
@@ -173,9 +300,10 @@ def unbiased_forest_samples(
     seed: int,
     use_stable_label: bool,
     tile_scale: int = 4,
+    cache: Optional[ImageCache] = None,
 ) -> ee.FeatureCollection:
-    img = sampling_image_for_year(t_year, region, scale, use_stable_label)
-    forest = forest_mask_for_year(t_year, region)
+    img = sampling_image_for_year(t_year, region, scale, use_stable_label, cache=cache)
+    forest = forest_mask_for_year(t_year, region, cache)
     img_forest = img.updateMask(forest)
 
     fc = (
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol
+
+from src.profiling import span
+
+
+# Earth Engine task states (ee.data.getTaskStatus / ee.batch.Task.status()).
+COMPLETED = "COMPLETED"
+FAILED_STATES = ("FAILED", "CANCELLED")
+
+# Scheduler-side states stored in the manifest.
+PENDING = "PENDING"
+SUBMITTED = "SUBMITTED"
+RUNNING = "RUNNING"
+FAILED = "FAILED"
+
+
+@dataclass
+class Tile:
+    ix: int
+    iy: int
+    xmin: float
+    ymin: float
+    xmax: float
+    ymax: float
+
+    @property
+    def name(self) -> str:
+        return f"x{self.ix}y{self.iy}"
+
+    @property
+    def bbox(self) -> List[float]:
+        return [self.xmin, self.ymin, self.xmax, self.ymax]
+
+
+def split_bbox(bbox: Iterable[float], nx: int, ny: int) -> List[Tile]:
+    """Split xmin,ymin,xmax,ymax into an nx-by-ny grid of tiles (row-major from the south-west)."""
+    xmin, ymin, xmax, ymax = [float(v) for v in bbox]
+    if nx < 1 or ny < 1:
+        raise ValueError(f"Tile grid must be at least 1x1, got {nx}x{ny}")
+    if xmax <= xmin or ymax <= ymin:
+        raise ValueError(f"Empty bbox: {[xmin, ymin, xmax, ymax]}")
+
+    dx = (xmax - xmin) / nx
+    dy = (ymax - ymin) / ny
+    tiles = []
+    for iy in range(ny):
+        for ix in range(nx):
+            tiles.append(
+                Tile(
+                    ix=ix,
+                    iy=iy,
+                    xmin=xmin + ix * dx,
+                    ymin=ymin + iy * dy,
+                    # snap the last row/column to the bbox edge (no float drift)
+                    xmax=xmax if ix == nx - 1 else xmin + (ix + 1) * dx,
+                    ymax=ymax if iy == ny - 1 else ymin + (iy + 1) * dy,
+                )
+            )
+    return tiles
+
+
+def parse_grid(s: str) -> tuple[int, int]:
+    """Parse "NxM" (e.g. "4x3") into (nx, ny)."""
+    try:
+        nx, ny = [int(v) for v in s.lower().split("x")]
+    except ValueError:
+        raise ValueError(f"Tile grid must look like '4x3', got {s!r}") from None
+    return nx, ny
+
+
+@dataclass
+class ExportJob:
+    """One export task: a (kind, year, tile) unit plus its scheduling state."""
+
+    key: str
+    kind: str
+    year: int
+    tile: Tile
+    tile_scale: int = 4
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    state: str = PENDING
+    task_id: Optional[str] = None
+    attempts: int = 0
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "ExportJob":
+        d = dict(d)
+        d["tile"] = Tile(**d["tile"])
+        return cls(**d)
+
+
+class ExportManifest:
+    """Resumable JSON record of every export job, rewritten after each state change."""
+
+    def __init__(self, path: str | Path, jobs: Optional[Dict[str, ExportJob]] = None) -> None:
+        self.path = Path(path)
+        self.jobs: Dict[str, ExportJob] = jobs or {}
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ExportManifest":
+        path = Path(path)
+        if not path.exists():
+            return cls(path)
+        obj = json.loads(path.read_text())
+        jobs = {d["key"]: ExportJob.from_dict(d) for d in obj.get("jobs", [])}
+        return cls(path, jobs)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"jobs": [j.to_dict() for j in self.jobs.values()]}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(payload, indent=2) + "\n")
+        os.replace(tmp, self.path)
+
+    def add(self, job: ExportJob) -> ExportJob:
+        """Register a job; a job already in the manifest keeps its recorded state."""
+        existing = self.jobs.get(job.key)
+        if existing is not None:
+            return existing
+        self.jobs[job.key] = job
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        out: Dict[str, int] = {}
+        for j in self.jobs.values():
+            out[j.state] = out.get(j.state, 0) + 1
+        return out
+
+
+class TaskBackend(Protocol):
+    def start(self, job: ExportJob) -> str:
+        """Submit the job's export task and return its task id."""
+
+    def status(self, task_id: str) -> Dict[str, Any]:
+        """Return at least {"state": ...}; failed tasks should carry "error_message"."""
+
+
+class EarthEngineTaskBackend:
+    """Submit through a job -> started ``ee.batch.Task`` builder; poll via ee.data."""
+
+    def __init__(self, submit: Callable[[ExportJob], Any]) -> None:
+        self.submit = submit
+
+    def start(self, job: ExportJob) -> str:
+        task = self.submit(job)
+        return str(task.id)
+
+    def status(self, task_id: str) -> Dict[str, Any]:
+        import ee
+
+        with span("getTaskStatus"):
+            return dict(ee.data.getTaskStatus(task_id)[0])
+
+
+@dataclass
+class SchedulerConfig:
+    max_concurrent: int = 4
+    max_retries: int = 3
+    poll_interval_s: float = 15.0
+    max_poll_interval_s: float = 300.0
+    backoff: float = 1.5
+    max_tile_scale: int = 16
+
+
+class ExportScheduler:
+    """Run export jobs with a concurrency cap, polling backoff and tile_scale retries.
+
+    Every failure (including "Computation timed out." / out-of-memory) is
+    retried up to ``max_retries`` times with a doubled ``tile_scale``. State is
+    written to the manifest after each change, so a restarted run skips
+    completed jobs and resumes polling tasks that are still running.
+    """
+
+    def __init__(
+        self,
+        backend: TaskBackend,
+        manifest: ExportManifest,
+        config: Optional[SchedulerConfig] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.backend = backend
+        self.manifest = manifest
+        self.config = config or SchedulerConfig()
+        self.sleep = sleep
+        self.log = log
+
+    def run(self, jobs: Iterable[ExportJob]) -> ExportManifest:
+        cfg = self.config
+        queue: List[ExportJob] = []
+        for job in jobs:
+            job = self.manifest.add(job)
+            if job.state == COMPLETED:
+                continue
+            if job.state == FAILED:
+                # a restart gives permanently failed jobs a fresh set of retries
+                job.state, job.attempts = PENDING, 0
+            queue.append(job)
+        self.manifest.save()
+
+        interval = cfg.poll_interval_s
+        while True:
+            active = [j for j in queue if j.state in (SUBMITTED, RUNNING)]
+            pending = [j for j in queue if j.state == PENDING]
+            if not active and not pending:
+                break
+
+            changed = False
+            for job in pending[: max(cfg.max_concurrent - len(active), 0)]:
+                self._submit(job)
+                changed = True
+
+            active = [j for j in queue if j.state in (SUBMITTED, RUNNING)]
+            if active:
+                self.sleep(interval)
+                for job in active:
+                    changed |= self._poll(job)
+
+            interval = cfg.poll_interval_s if changed else min(interval * cfg.backoff, cfg.max_poll_interval_s)
+
+        self.log(f"Export scheduler finished: {self.manifest.counts()}")
+        return self.manifest
+
+    def _submit(self, job: ExportJob) -> None:
+        job.attempts += 1
+        job.error = None
+        try:
+            job.task_id = self.backend.start(job)
+        except Exception as e:  # quota / request errors count as a failed attempt
+            self._fail(job, str(e))
+        else:
+            job.state = SUBMITTED
+            self.log(f"Started: {job.key} | task id: {job.task_id} | tile_scale={job.tile_scale}")
+        self.manifest.save()
+
+    def _poll(self, job: ExportJob) -> bool:
+        st = self.backend.status(job.task_id)
+        state = st.get("state", "")
+        if state == COMPLETED:
+            job.state = COMPLETED
+            self.log(f"Completed: {job.key}")
+        elif state in FAILED_STATES:
+            self._fail(job, st.get("error_message") or state)
+        elif state == "RUNNING" and job.state != RUNNING:
+            job.state = RUNNING
+        else:
+            return False
+        self.manifest.save()
+        return True
+
+    def _fail(self, job: ExportJob, error: str) -> None:
+        job.error = error
+        if job.attempts > self.config.max_retries:
+            job.state = FAILED
+            self.log(f"Failed: {job.key} after {job.attempts} attempts: {error}")
+            return
+        job.tile_scale = min(job.tile_scale * 2, self.config.max_tile_scale)
+        job.state = PENDING
+        self.log(f"Retrying: {job.key} ({error}) with tile_scale={job.tile_scale}")
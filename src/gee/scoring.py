@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional, Sequence
+
+import ee
+
+from src.gee.sampling import (
+    ImageCache,
+    aef_for_year,
+    forest_igbp_for_year,
+    frontier_features_for_year,
+)
+from src.modeling.export_weights import load_logit_model
+
+
+FRONTIER_BANDS = ["dist_to_nonforest_m", "dist_to_road_m"]
+
+
+def feature_image_for_year(
+    t_year: int,
+    region: ee.Geometry,
+    scale: int,
+    feature_cols: Sequence[str],
+    road_search_radius_m: int = 100_000,
+    nf_max_km: Optional[float] = None,
+    cache: Optional[ImageCache] = None,
+) -> ee.Image:
+    """The year's model inputs in ``feature_cols`` order (frontier stack built only if used)."""
+    X = aef_for_year(t_year, region, cache)
+    if any(c in FRONTIER_BANDS for c in feature_cols):
+        F = frontier_features_for_year(
+            t_year, region, scale, road_search_radius_m=road_search_radius_m, nf_max_km=nf_max_km, cache=cache
+        )
+        X = X.addBands(F)
+    return X.select(list(feature_cols))
+
+
+def score_image(X: ee.Image, w: Sequence[float], b: Optional[float], mask: Optional[ee.Image] = None) -> ee.Image:
+    """``score`` = X . w + b and ``prob`` = sigmoid(score), as one two-band float image.
+
+    The per-pixel dot product is a single ``arrayDotProduct`` against a constant
+    weight array (the JS loader's ``multiply`` + ``reduce(sum)`` materializes all
+    weighted bands first). The mask is applied once, before the sigmoid.
+    """
+    weights = ee.Image.constant([float(v) for v in w]).toArray()
+    score = X.toArray().arrayDotProduct(weights)
+    if b is not None:
+        score = score.add(float(b))
+    if mask is not None:
+        score = score.updateMask(mask)
+    score = score.rename("score")
+    prob = score.multiply(-1).exp().add(1).pow(-1).rename("prob")
+    return score.addBands(prob).toFloat()
+
+
+def score_image_for_year(
+    weights: str | Path,
+    t_year: int,
+    region: ee.Geometry,
+    scale: int = 500,
+    road_search_radius_m: int = 100_000,
+    nf_max_km: Optional[float] = None,
+    forest_only: bool = True,
+    cache: Optional[ImageCache] = None,
+) -> ee.Image:
+    """Risk map for one year from a weights JSON (bands ``score``, ``prob``; like ``src.raster.score``).
+
+    Uses the same feature recipe as the sample exports, so a model scores the
+    pixels it was trained on; with ``forest_only`` non-forest pixels are masked,
+    as in the map loader. Pass an ``ImageCache`` (optionally with frontier
+    assets) when scoring many tiles / years in one run.
+    """
+    w, b, feature_cols = load_logit_model(weights)
+    X = feature_image_for_year(t_year, region, scale, feature_cols, road_search_radius_m, nf_max_km, cache)
+    mask = forest_igbp_for_year(t_year, region, cache) if forest_only else None
+    return score_image(X, w, b, mask)
+
+
+def export_image_to_drive(
+    image: ee.Image,
+    description: str,
+    filename_prefix: str,
+    region: ee.Geometry,
+    scale: int,
+    folder: Optional[str] = None,
+) -> ee.batch.Task:
+    kwargs = dict(
+        image=image,
+        description=description[:100],
+        fileNamePrefix=filename_prefix,
+        region=region,
+        scale=scale,
+        fileFormat="GeoTIFF",
+        maxPixels=1e13,
+    )
+    if folder:
+        kwargs["folder"] = folder
+    task = ee.batch.Export.image.toDrive(**kwargs)
+    task.start()
+    return task
+
+
+def export_image_to_asset(
+    image: ee.Image,
+    description: str,
+    asset_id: str,
+    region: ee.Geometry,
+    scale: int,
+) -> ee.batch.Task:
+    task = ee.batch.Export.image.toAsset(
+        image=image,
+        description=description[:100],
+        assetId=asset_id,
+        region=region,
+        scale=scale,
+        maxPixels=1e13,
+        pyramidingPolicy={".default": "mean"},
+    )
+    task.start()
+    return task
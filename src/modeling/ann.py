@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.modeling.metrics import RankedScores
+from src.modeling.quantize import AEF_BANDS
+
+
+INDEX_VERSION = 1
+META_FILE = "meta.json"
+
+
+def _normalize(X: np.ndarray) -> np.ndarray:
+    """Unit-length float32 rows (cosine similarity == dot product); zero rows stay zero."""
+    X = np.array(X, dtype=np.float32)
+    norm = np.linalg.norm(X, axis=1, keepdims=True)
+    norm[norm == 0] = 1.0
+    X /= norm
+    return X
+
+
+def _top_k(S: np.ndarray, k: int, axis: int) -> np.ndarray:
+    """Indices of the ``k`` largest entries along ``axis`` (unordered)."""
+    if S.shape[axis] <= k:
+        return np.broadcast_to(
+            np.arange(S.shape[axis]).reshape([-1 if a == axis else 1 for a in range(S.ndim)]), S.shape
+        )
+    return np.take(np.argpartition(-S, k - 1, axis=axis), np.arange(k), axis=axis)
+
+
+def spherical_kmeans(X: np.ndarray, n_lists: int, n_iter: int = 10, seed: int = 0, batch: int = 65_536) -> np.ndarray:
+    """(n_lists, d) unit centroids of unit rows ``X`` by Lloyd iterations on cosine similarity."""
+    rng = np.random.default_rng(seed)
+    C = X[rng.choice(len(X), size=n_lists, replace=False)].copy()
+    for _ in range(n_iter):
+        sums = np.zeros_like(C, dtype=np.float64)
+        counts = np.zeros(n_lists, dtype=np.int64)
+        for i in range(0, len(X), batch):
+            Xb = X[i : i + batch]
+            a = np.argmax(Xb @ C.T, axis=1)
+            ones = np.ones(len(a), dtype=np.float32)
+            onehot = sparse.csr_matrix((ones, (a, np.arange(len(a)))), shape=(n_lists, len(a)))
+            sums += onehot @ Xb
+            counts += np.bincount(a, minlength=n_lists)
+        empty = counts == 0
+        if empty.any():  # reseed empty lists from random rows
+            sums[empty] = X[rng.choice(len(X), size=int(empty.sum()), replace=False)]
+        C = _normalize(sums)
+    return C
+
+
+class IVFIndex:
+    """Inverted-file index over unit-normalized embeddings (cosine similarity).
+
+    Rows are grouped into ``n_lists`` spherical k-means cells and stored
+    contiguously by cell, so a query only scans the ``n_probe`` cells nearest
+    to it: about ``n * n_probe / n_lists`` dot products instead of ``n``.
+    Queries are batched per cell (one matmul per probed cell for all queries
+    that probe it). ``save`` / ``load`` keep the arrays as ``.npy`` files that
+    are opened memory-mapped, so a 10M-row index does not need to fit in RAM.
+
+    Each row keeps its source ``id`` (e.g. its row number in the table) and
+    its ``label``; ``knn_risk`` turns neighbour labels into a score.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        vectors: np.ndarray,
+        ids: np.ndarray,
+        labels: np.ndarray,
+        feature_cols: Optional[list[str]] = None,
+    ) -> None:
+        self.centroids = centroids
+        self.offsets = offsets
+        self.vectors = vectors
+        self.ids = ids
+        self.labels = labels
+        self.feature_cols = list(feature_cols or AEF_BANDS)
+
+    @property
+    def n(self) -> int:
+        return int(len(self.ids))
+
+    @property
+    def n_lists(self) -> int:
+        return int(len(self.centroids))
+
+    @classmethod
+    def build(
+        cls,
+        X: np.ndarray,
+        labels: Optional[np.ndarray] = None,
+        ids: Optional[np.ndarray] = None,
+        n_lists: Optional[int] = None,
+        train_rows: int = 256,
+        n_iter: int = 10,
+        seed: int = 0,
+        feature_cols: Optional[list[str]] = None,
+    ) -> "IVFIndex":
+        """Index the rows of ``X`` (n, d).
+
+        ``n_lists`` defaults to ~sqrt(n) (4096 cells at 10M rows); the cells are
+        trained on at most ``train_rows * n_lists`` sampled rows.
+        """
+        Xn = _normalize(X)
+        n = len(Xn)
+        if n == 0:
+            raise ValueError("No rows to index")
+        n_lists = int(n_lists or max(1, min(65_536, round(np.sqrt(n)))))
+        n_lists = min(n_lists, n)
+        rng = np.random.default_rng(seed)
+        sample = Xn if n <= train_rows * n_lists else Xn[np.sort(rng.choice(n, train_rows * n_lists, replace=False))]
+        C = spherical_kmeans(sample, n_lists, n_iter=n_iter, seed=seed)
+
+        assign = np.empty(n, dtype=np.int32)
+        for i in range(0, n, 65_536):
+            assign[i : i + 65_536] = np.argmax(Xn[i : i + 65_536] @ C.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))]).astype(np.int64)
+
+        ids = np.arange(n, dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        labels = np.zeros(n, dtype=np.int8) if labels is None else np.asarray(labels, dtype=np.int8)
+        return cls(C, offsets, Xn[order], ids[order], labels[order], feature_cols)
+
+    def search(self, Q: np.ndarray, k: int = 10, n_probe: int = 8, batch: int = 4096) -> tuple[np.ndarray, np.ndarray]:
+        """(similarities (m, k) float32, positions (m, k) int64) of each query's approximate k-NN.
+
+        Sorted by decreasing similarity. Positions index the index's rows
+        (``ids[pos]`` / ``labels[pos]``); -1 with similarity -inf where fewer
+        than ``k`` rows were scanned.
+        """
+        Qn = _normalize(Q)
+        m = len(Qn)
+        n_probe = min(n_probe, self.n_lists)
+        sims = np.full((m, k), -np.inf, dtype=np.float32)
+        pos = np.full((m, k), -1, dtype=np.int64)
+        for s in range(0, m, batch):
+            Qb = Qn[s : s + batch]
+            mb = len(Qb)
+            probes = _top_k(Qb @ self.centroids.T, n_probe, axis=1)
+
+            best_s = np.full((mb, n_probe, k), -np.inf, dtype=np.float32)
+            best_i = np.full((mb, n_probe, k), -1, dtype=np.int64)
+            qi = np.repeat(np.arange(mb), n_probe)
+            slot = np.tile(np.arange(n_probe), mb)
+            li = np.asarray(probes).ravel()
+            order = np.argsort(li, kind="stable")
+            lists, starts = np.unique(li[order], return_index=True)
+            for lst, g in zip(lists, np.split(order, starts[1:])):
+                a, b = int(self.offsets[lst]), int(self.offsets[lst + 1])
+                if a == b:
+                    continue
+                q, sl = qi[g], slot[g]
+                S = np.asarray(self.vectors[a:b]) @ Qb[q].T  # (rows in cell, queries)
+                kk = min(k, b - a)
+                top = _top_k(S, kk, axis=0)
+                best_s[q, sl, :kk] = np.take_along_axis(S, top, axis=0).T
+                best_i[q, sl, :kk] = (a + top).T
+
+            flat_s = best_s.reshape(mb, -1)
+            flat_i = best_i.reshape(mb, -1)
+            top = _top_k(flat_s, k, axis=1)
+            ts = np.take_along_axis(flat_s, top, axis=1)
+            ti = np.take_along_axis(flat_i, top, axis=1)
+            rank = np.argsort(-ts, axis=1, kind="stable")
+            kk = ts.shape[1]
+            sims[s : s + mb, :kk] = np.take_along_axis(ts, rank, axis=1)
+            pos[s : s + mb, :kk] = np.take_along_axis(ti, rank, axis=1)
+        return sims, pos
+
+    def search_exact(self, Q: np.ndarray, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """Brute-force ``search`` (every row), for recall checks."""
+        Qn = _normalize(Q)
+        batch = max(1, 2**24 // max(self.n, 1))  # <= 64 MB of similarities at a time
+        sims = np.empty((len(Qn), k), dtype=np.float32)
+        pos = np.empty((len(Qn), k), dtype=np.int64)
+        for s in range(0, len(Qn), batch):
+            S = Qn[s : s + batch] @ np.asarray(self.vectors).T
+            top = _top_k(S, k, axis=1)
+            ts = np.take_along_axis(S, top, axis=1)
+            rank = np.argsort(-ts, axis=1, kind="stable")
+            sims[s : s + batch] = np.take_along_axis(ts, rank, axis=1)
+            pos[s : s + batch] = np.take_along_axis(top, rank, axis=1)
+        return sims, pos
+
+    def knn_risk(
+        self,
+        Q: np.ndarray,
+        k: int = 20,
+        n_probe: int = 8,
+        alpha: float = 1.0,
+        prior: Optional[float] = None,
+    ) -> np.ndarray:
+        """Similarity-weighted share of positive labels among each query's k-NN.
+
+        ``(sum w * y + alpha * prior) / (sum w + alpha)`` with ``w = max(sim, 0)``;
+        ``prior`` defaults to the indexed positive rate. On a class-balanced
+        index it ranks like a probability but is not calibrated to the
+        unbiased positive rate. A single-class index (``--positives_only``) would
+        give every query the same score; use ``analog_score`` for those.
+        """
+        labels = np.asarray(self.labels)
+        if len(labels) and labels.min() == labels.max():
+            raise ValueError(f"Index holds only label={labels[0]} rows; knn_risk is constant, use analog_score")
+        sims, pos = self.search(Q, k=k, n_probe=n_probe)
+        valid = pos >= 0
+        w = np.where(valid, np.maximum(sims, 0.0), 0.0).astype(np.float64)
+        y = np.where(valid, np.asarray(self.labels)[np.where(valid, pos, 0)], 0)
+        prior = float(np.mean(self.labels)) if prior is None else float(prior)
+        return (np.sum(w * y, axis=1) + alpha * prior) / (np.sum(w, axis=1) + alpha)
+
+    def analog_score(self, Q: np.ndarray, k: int = 20, n_probe: int = 8) -> np.ndarray:
+        """Mean clipped cosine similarity ``max(sim, 0)`` to each query's k nearest indexed rows.
+
+        The score for a positives-only index: how closely a pixel resembles
+        past loss pixels, in [0, 1]. Missing neighbours (fewer than k rows in
+        the probed lists) count as 0. With a k well above the size of one
+        cluster of analogs it ranks by the local density of positives.
+        """
+        sims, pos = self.search(Q, k=k, n_probe=n_probe)
+        return np.where(pos >= 0, np.maximum(sims, 0.0), 0.0).astype(np.float64).mean(axis=1)
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ("centroids", "offsets", "vectors", "ids", "labels"):
+            np.save(path / f"{name}.npy", np.asarray(getattr(self, name)))
+        meta = {"version": INDEX_VERSION, "n": self.n, "n_lists": self.n_lists, "feature_cols": self.feature_cols}
+        (path / META_FILE).write_text(json.dumps(meta, indent=2) + "\n")
+
+    @classmethod
+    def load(cls, path: str | Path, mmap: bool = True) -> "IVFIndex":
+        """Open a saved index; the row arrays stay memory-mapped unless ``mmap=False``."""
+        path = Path(path)
+        meta_path = path / META_FILE
+        if not meta_path.exists():
+            raise ValueError(f"Not an IVF index (missing {META_FILE}): {path}")
+        meta = json.loads(meta_path.read_text())
+        mode = "r" if mmap else None
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode=mode if name in ("vectors", "ids", "labels") else None)
+            for name in ("centroids", "offsets", "vectors", "ids", "labels")
+        }
+        return cls(feature_cols=meta["feature_cols"], **arrays)
+
+
+def _load_embeddings(csv: Optional[str], store: Optional[str], years: Optional[list[int]]) -> tuple[np.ndarray, np.ndarray]:
+    if store:
+        from src.modeling.sample_store import SampleStore
+
+        return SampleStore(store).load_xy(years, feature_cols=AEF_BANDS)
+    df = pd.read_csv(csv, usecols=AEF_BANDS + ["label", "tYear"], dtype={c: np.float32 for c in AEF_BANDS})
+    if years is not None:
+        df = df[df["tYear"].isin(years)]
+    return df[AEF_BANDS].to_numpy(np.float32), df["label"].to_numpy(np.int32)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Build / evaluate an IVF nearest-neighbour index over the AEF embeddings.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--train_csv", default=None)
+    src.add_argument("--train_store", default=None)
+    ap.add_argument("--train_years", default=None, help="Comma list; default all years")
+    ap.add_argument("--positives_only", action="store_true", help="Index only label=1 rows (analog lookup)")
+    ap.add_argument("--out", default=None, help="Save the index to this directory")
+    ap.add_argument("--n_lists", type=int, default=None, help="Default ~sqrt(rows)")
+    ap.add_argument("--seed", type=int, default=0)
+
+    ev = ap.add_mutually_exclusive_group()
+    ev.add_argument(
+        "--eval_csv",
+        default=None,
+        help="Score these rows (knn_risk, or analog_score with --positives_only) and report eval_probs / top-K",
+    )
+    ev.add_argument("--eval_store", default=None)
+    ap.add_argument("--eval_years", default=None)
+    ap.add_argument("--k", type=int, default=20)
+    ap.add_argument("--n_probe", type=int, default=8)
+    args = ap.parse_args()
+
+    parse = lambda s: [int(x) for x in s.split(",") if x.strip()] if s else None  # noqa: E731
+    X, y = _load_embeddings(args.train_csv, args.train_store, parse(args.train_years))
+    ids = np.arange(len(y))
+    if args.positives_only:
+        X, y, ids = X[y == 1], y[y == 1], ids[y == 1]
+
+    t0 = time.perf_counter()
+    index = IVFIndex.build(X, labels=y, ids=ids, n_lists=args.n_lists, seed=args.seed)
+    print(f"Indexed {index.n} rows in {index.n_lists} lists ({time.perf_counter() - t0:.1f}s)")
+    if args.out:
+        index.save(args.out)
+        print(f"Saved index to: {args.out}")
+
+    if args.eval_csv or args.eval_store:
+        Xe, ye = _load_embeddings(args.eval_csv, args.eval_store, parse(args.eval_years))
+        t0 = time.perf_counter()
+        score = index.analog_score if args.positives_only else index.knn_risk
+        p = score(Xe, k=args.k, n_probe=args.n_probe)
+        dt = time.perf_counter() - t0
+        ranked = RankedScores(ye, p)
+        name = "analog" if args.positives_only else "knn"
+        print(f"{name} scores for {len(ye)} rows in {dt:.2f}s ({1e3 * dt / max(len(ye), 1):.3f} ms/row)")
+        print("Eval:", ranked.eval_probs(name=name))
+        print("TopK:", ranked.topk_report())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,131 @@
 from __future__ import annotations
 
 import argparse
+import base64
 import json
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional, Tuple
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
 from urllib.parse import quote
 
+import numpy as np
+
+from src.modeling.train_logit import FEATURE_COLS
 
-BASE_GEE_EDITOR_URL = "https://code.earthengine.google.com/#"
 
+BASE_GEE_EDITOR_URL = "https://code.earthengine.google.com/#"
 
-def save_logit_weights(w: Iterable[float], b: Optional[float], out_path: str | Path) -> None:
+# Compact weight encodings: one mode letter + unpadded URL-safe base64 of little-endian
+#   F: float32 weights
+#   H: float32 scale, then float16 weights / scale
+WEIGHT_ENCODINGS = ("text", "f32", "f16")
+_F16_TOP = 2.0**15  # largest |w| maps here: every |w| >= ~2e-9 * max|w| stays a normal float16
+
+
+def encode_weights(w: Iterable[float], encoding: str = "f32") -> str:
+    """Compact text form of ``w`` for ``wz=`` / ``"wz"`` (see ``WEIGHT_ENCODINGS``)."""
+    w = np.asarray(list(w), dtype=np.float64)
+    if encoding == "f32":
+        return "F" + _b64(w.astype("<f4").tobytes())
+    if encoding == "f16":
+        top = float(np.max(np.abs(w))) if len(w) else 0.0
+        scale = np.float32(top / _F16_TOP if top > 0 else 1.0)
+        return "H" + _b64(np.array([scale], "<f4").tobytes() + (w / scale).astype("<f2").tobytes())
+    raise ValueError(f"Unknown weight encoding {encoding!r}; expected 'f32' or 'f16'")
+
+
+def decode_weights(s: str) -> np.ndarray:
+    """Inverse of ``encode_weights`` (float64 array)."""
+    mode, data = s[:1], base64.urlsafe_b64decode(s[1:] + "=" * (-len(s[1:]) % 4))
+    if mode == "F":
+        return np.frombuffer(data, dtype="<f4").astype(np.float64)
+    if mode == "H":
+        scale = np.frombuffer(data[:4], dtype="<f4")[0]
+        return np.frombuffer(data[4:], dtype="<f2").astype(np.float64) * float(scale)
+    raise ValueError(f"Unknown weight encoding prefix {mode!r}")
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def weights_roundtrip_error(w: Iterable[float], encoding: str) -> Dict[str, Any]:
+    """How much an encoding changes the weights, and how long the fragment value gets."""
+    w = np.asarray(list(w), dtype=np.float64)
+    if encoding == "text":
+        enc = weights_csv(w)
+        back = np.array([float(x) for x in enc.split(",")]) if len(w) else w
+    else:
+        enc = encode_weights(w, encoding)
+        back = decode_weights(enc)
+    err = np.abs(back - w)
+    nz = w != 0
+    return {
+        "encoding": encoding,
+        "chars": len(enc),
+        "text_chars": len(weights_csv(w)),
+        "max_abs_err": float(err.max()) if len(w) else 0.0,
+        "max_rel_err": float((err[nz] / np.abs(w[nz])).max()) if nz.any() else 0.0,
+    }
+
+
+def save_logit_weights(
+    w: Iterable[float],
+    b: Optional[float],
+    out_path: str | Path,
+    feature_cols: Optional[Sequence[str]] = None,
+    encoding: str = "text",
+) -> None:
     """Save logistic regression weights for Earth Engine usage.
 
     Output JSON format:
-      {"w": [...], "b": ...}
+      {"w": [...], "b": ..., "feature_cols": [...]}   (feature_cols optional)
+    With ``encoding="f32"`` / ``"f16"`` the weights are stored compactly as
+    ``"wz": "<encode_weights string>"`` instead of ``"w"``.
     """
     out_path = Path(out_path)
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    payload: Dict[str, Any] = {"w": [float(x) for x in w]}
+    if encoding == "text":
+        payload: Dict[str, Any] = {"w": [float(x) for x in w]}
+    else:
+        payload = {"wz": encode_weights(w, encoding)}
     if b is not None:
         payload["b"] = float(b)
+    if feature_cols is not None:
+        payload["feature_cols"] = list(feature_cols)
 
     out_path.write_text(json.dumps(payload, indent=2) + "\n")
 
 
 def load_logit_weights(path: str | Path) -> Tuple[list[float], Optional[float]]:
-    """Load {"w": [...], "b": ...} from JSON."""
+    """Load {"w": [...], "b": ...} (or {"wz": "...", "b": ...}) from JSON."""
     path = Path(path)
     obj = json.loads(path.read_text())
 
-    if "w" not in obj:
-        raise ValueError(f"Missing key 'w' in weights file: {path}")
-
-    w = [float(x) for x in obj["w"]]
+    if "w" in obj:
+        w = [float(x) for x in obj["w"]]
+    elif "wz" in obj:
+        w = decode_weights(obj["wz"]).tolist()
+    else:
+        raise ValueError(f"Missing key 'w' or 'wz' in weights file: {path}")
     b = float(obj["b"]) if "b" in obj and obj["b"] is not None else None
     return w, b
 
 
+def load_logit_model(path: str | Path) -> Tuple[list[float], Optional[float], list[str]]:
+    """Load (w, b, feature_cols); files without "feature_cols" must hold the 66 training features."""
+    w, b = load_logit_weights(path)
+    obj = json.loads(Path(path).read_text())
+    feature_cols = obj.get("feature_cols")
+    if feature_cols is None:
+        if len(w) != len(FEATURE_COLS):
+            raise ValueError(f"Weights file {path} has {len(w)} weights but no 'feature_cols'")
+        feature_cols = FEATURE_COLS
+    if len(feature_cols) != len(w):
+        raise ValueError(f"Weights file {path}: {len(w)} weights vs {len(feature_cols)} feature_cols")
+    return w, b, list(feature_cols)
+
+
 def weights_csv(w: Iterable[float]) -> str:
     """Return comma-separated weights suitable for URL fragment param w=..."""
     return ",".join(f"{float(x):.10g}" for x in w)
@@ -92,6 +179,9 @@ def gee_fragment(
     s2m2: int = 9,
     s2cloud: float = 60,
     s2Years: Optional[str] = None,  # e.g. "2020,2021,2022,2023"
+    frontierAsset: Optional[str] = None,  # precomputed frontier stack, see src/gee/frontier_cache.py
+    bands: Optional[Sequence[str]] = None,  # feature_cols of a pruned model; None = all 66
+    encoding: str = "text",  # "f32" / "f16": compact wz= instead of w=
 ) -> str:
     """
     Build the full Earth Engine Code Editor fragment expected by your menagerie_loader.js.
@@ -99,6 +189,9 @@ def gee_fragment(
     Returns something like:
       title=...;tag=...;year=2022;lat=-9.5;lon=-62.5;zoom=9;lo=-10;hi=10;roadKm=100;nfMaxKm=30;
       s2m1=7;s2m2=9;s2cloud=60;s2Years=2020,2021,2022,2023;b=...;w=...
+
+    With ``encoding="f32"`` / ``"f16"`` the weights go out as ``wz=`` (see
+    ``encode_weights``), about a third / a sixth of the text length.
     """
     parts: list[str] = []
     _add(parts, "title", title)
@@ -115,6 +208,14 @@ def gee_fragment(
 
     _add(parts, "roadKm", roadKm)
     _add(parts, "nfMaxKm", nfMaxKm)
+    _add(parts, "frontierAsset", frontierAsset)
+
+    # Sparse models: the loader reads and multiplies only these bands.
+    if bands is not None and list(bands) != FEATURE_COLS:
+        w = list(w)
+        if len(bands) != len(w):
+            raise ValueError(f"{len(w)} weights vs {len(bands)} bands")
+        _add(parts, "bands", ",".join(bands))
 
     _add(parts, "s2m1", s2m1)
     _add(parts, "s2m2", s2m2)
@@ -127,7 +228,10 @@ def gee_fragment(
     # Add weights last (huge)
     if b is not None:
         parts.append(f"b={float(b):.10g}")
-    parts.append(f"w={weights_csv(w)}")
+    if encoding == "text":
+        parts.append(f"w={weights_csv(w)}")
+    else:
+        parts.append(f"wz={encode_weights(w, encoding)}")
 
     return ";".join(parts) + ";"
 
@@ -156,11 +260,19 @@ def main() -> None:
     ap.add_argument("--s2m2", type=int, default=9)
     ap.add_argument("--s2cloud", type=float, default=60)
     ap.add_argument("--s2Years", default=None, help='Optional, e.g. "2020,2021,2022,2023"')
+    ap.add_argument("--frontierAsset", default=None, help="Optional frontier stack asset id for --year")
+
+    ap.add_argument(
+        "--encoding",
+        choices=WEIGHT_ENCODINGS,
+        default="text",
+        help="Weights in the fragment: decimal text (w=) or base64 float32 / scaled float16 (wz=)",
+    )
 
     ap.add_argument("--print", choices=["fragment", "url", "both"], default="both")
     args = ap.parse_args()
 
-    w, b = load_logit_weights(args.weights)
+    w, b, feature_cols = load_logit_model(args.weights)
 
     frag = gee_fragment(
         w=w,
@@ -179,6 +291,9 @@ def main() -> None:
         s2m2=args.s2m2,
         s2cloud=args.s2cloud,
         s2Years=args.s2Years,
+        frontierAsset=args.frontierAsset,
+        bands=feature_cols,
+        encoding=args.encoding,
     )
     url = BASE_GEE_EDITOR_URL + frag
 
@@ -190,6 +305,13 @@ def main() -> None:
         print("\n=== FULL CODE EDITOR URL ===")
         print(url)
 
+    if args.encoding != "text":
+        r = weights_roundtrip_error(w, args.encoding)
+        print(
+            f"\nEncoding {r['encoding']}: {r['chars']} chars (text: {r['text_chars']}), "
+            f"max abs err {r['max_abs_err']:.3g}, max rel err {r['max_rel_err']:.3g}"
+        )
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+# {"type":"Point","coordinates":[lon,lat]} as exported by Export.table.toDrive
+_POINT_RE = r'"coordinates"\s*:\s*\[\s*([-+0-9.eE]+)\s*,\s*([-+0-9.eE]+)'
+
+
+def parse_point_geo(geo: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """(lon, lat) float64 arrays from a ``.geo`` GeoJSON Point column; NaN where missing."""
+    xy = geo.astype("string").str.extract(_POINT_RE)
+    return xy[0].astype(float).to_numpy(np.float64), xy[1].astype(float).to_numpy(np.float64)
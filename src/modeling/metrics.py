@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import numpy as np
+from scipy.special import digamma
 from sklearn.metrics import (
     roc_auc_score,
     average_precision_score,
@@ -74,3 +75,336 @@ def topk_report(y, p, top_k_list=(1, 2, 5, 10)) -> list[dict]:
         prec = float(y[sel].mean()) if sel.sum() else 0.0
         out.append({"top_k_pct": int(k), "thr": thr, "capture": capture, "precision": prec})
     return out
+
+
+def _sorted_quantile(sorted_vals: np.ndarray, q) -> np.ndarray:
+    """``np.quantile(..., method="linear")`` on an already ascending-sorted array (no re-sort)."""
+    n = len(sorted_vals)
+    vi = (n - 1) * np.asarray(q, dtype=float)
+    lo = np.floor(vi).astype(np.int64)
+    hi = np.minimum(lo + 1, n - 1)
+    gamma = vi - lo
+    a, b = sorted_vals[lo], sorted_vals[hi]
+    diff = b - a
+    # same two-sided lerp as numpy, so thresholds match bit for bit
+    return np.where(gamma >= 0.5, b - diff * (1 - gamma), a + diff * gamma)
+
+
+class RankedScores:
+    """Scores sorted once; every metric below is read off that single sort.
+
+    ``eval_probs``, ``summarize_at_threshold`` (for any number of thresholds) and
+    ``topk_report`` return the same dicts as the module-level functions, but
+    without re-sorting ``p`` per metric, per threshold or per K. Labels must be 0/1.
+    """
+
+    def __init__(self, y, p) -> None:
+        y = np.asarray(y)
+        p = np.asarray(p).astype(float)
+        order = np.argsort(p, kind="stable")
+        self.p = p[order]  # ascending, unclipped (top-K uses raw scores)
+        self.pc = np.clip(self.p, 1e-6, 1 - 1e-6)  # clipping is monotone: still sorted
+        self.y = y[order].astype(np.int64)
+        self.n = int(len(self.y))
+        # cum_pos[i] = positives among the i lowest scores
+        self.cum_pos = np.concatenate([[0], np.cumsum(self.y)])
+        self.n_pos = int(self.cum_pos[-1])
+        self.n_neg = self.n - self.n_pos
+
+    def _curve(self) -> tuple[np.ndarray, np.ndarray]:
+        """Cumulative (tps, fps) at each distinct clipped score, from the top (sklearn's _binary_clf_curve)."""
+        p_desc = self.pc[::-1]
+        idx = np.r_[np.flatnonzero(np.diff(p_desc)), self.n - 1]
+        tps = np.cumsum(self.y[::-1])[idx].astype(float)
+        fps = 1 + idx - tps
+        return tps, fps
+
+    def roc_auc(self) -> float:
+        if self.n_pos == 0 or self.n_neg == 0:
+            return float("nan")
+        tps, fps = self._curve()
+        tpr = np.r_[0.0, tps / self.n_pos]
+        fpr = np.r_[0.0, fps / self.n_neg]
+        return float(np.trapezoid(tpr, fpr))
+
+    def pr_auc(self) -> float:
+        """Average precision (step-wise, no interpolation), as ``average_precision_score``."""
+        if self.n_pos == 0 or self.n_neg == 0:
+            return float("nan")
+        tps, fps = self._curve()
+        precision = tps / (tps + fps)
+        recall = tps / self.n_pos
+        return float(np.sum(np.diff(np.r_[0.0, recall]) * precision))
+
+    def eval_probs(self, name: str = "") -> dict:
+        y = self.y.astype(float)
+        pc = self.pc
+        return {
+            "name": name,
+            "n": self.n,
+            "pos_rate": float(y.mean()) if self.n else float("nan"),
+            "roc_auc": self.roc_auc(),
+            "pr_auc": self.pr_auc(),
+            "logloss": float(-np.mean(y * np.log(pc) + (1 - y) * np.log1p(-pc))),
+            "brier": float(np.mean((pc - y) ** 2)),
+        }
+
+    def threshold_sweep(self, thresholds, name: str = "") -> list[dict]:
+        """``summarize_at_threshold`` for every threshold, via one vectorized searchsorted."""
+        thrs = np.asarray(thresholds, dtype=float).ravel()
+        k = np.searchsorted(self.pc, thrs, side="left")  # rows predicted negative
+        fn = self.cum_pos[k]
+        tn = k - fn
+        tp = self.n_pos - fn
+        fp = (self.n - k) - tp
+
+        out = []
+        for t, tn_, fp_, fn_, tp_ in zip(thrs, tn, fp, fn, tp):
+            tn_, fp_, fn_, tp_ = int(tn_), int(fp_), int(fn_), int(tp_)
+            # balanced accuracy averages recall over the classes present in y
+            recalls = []
+            if self.n_neg:
+                recalls.append(tn_ / self.n_neg)
+            if self.n_pos:
+                recalls.append(tp_ / self.n_pos)
+            out.append(
+                {
+                    "name": name,
+                    "thr": float(t),
+                    "cm": [[tn_, fp_], [fn_, tp_]],
+                    "accuracy": float((tp_ + tn_) / self.n),
+                    "balanced_accuracy": float(np.mean(recalls)),
+                    "precision": float(tp_ / max(tp_ + fp_, 1)),
+                    "recall": float(tp_ / max(tp_ + fn_, 1)),
+                    "tn": tn_,
+                    "fp": fp_,
+                    "fn": fn_,
+                    "tp": tp_,
+                }
+            )
+        return out
+
+    def summarize_at_threshold(self, thr: float, name: str = "") -> dict:
+        return self.threshold_sweep([thr], name=name)[0]
+
+    def topk_report(self, top_k_list=(1, 2, 5, 10)) -> list[dict]:
+        ks = list(top_k_list)
+        thrs = _sorted_quantile(self.p, [1 - k / 100.0 for k in ks])
+        k_idx = np.searchsorted(self.p, thrs, side="left")
+        total_pos = max(self.n_pos, 1)
+        out = []
+        for k, thr, i in zip(ks, thrs, k_idx):
+            n_sel = self.n - int(i)
+            captured = self.n_pos - int(self.cum_pos[i])
+            out.append(
+                {
+                    "top_k_pct": int(k),
+                    "thr": float(thr),
+                    "capture": float(captured) / total_pos,
+                    "precision": float(captured) / n_sel if n_sel else 0.0,
+                }
+            )
+        return out
+
+
+def evaluate(y, p, name: str = "", thresholds=(0.5,), top_k_list=(1, 2, 5, 10)) -> dict:
+    """All metrics from one sort: {"probs": eval_probs, "thresholds": [...], "topk": [...]}."""
+    r = RankedScores(y, p)
+    return {
+        "probs": r.eval_probs(name=name),
+        "thresholds": r.threshold_sweep(thresholds, name=name),
+        "topk": r.topk_report(top_k_list),
+    }
+
+
+def metrics_row(y, p, prefix: str, top_k_list=(1, 2, 5, 10)) -> dict:
+    """Flat ``eval_probs`` + ``topk_report`` for one results-table row: ``{prefix}_roc_auc``, ``{prefix}_capture@5``, ..."""
+    r = RankedScores(y, p)
+    row = {f"{prefix}_{k}": v for k, v in r.eval_probs().items() if k != "name"}
+    for t in r.topk_report(top_k_list):
+        row[f"{prefix}_capture@{t['top_k_pct']}"] = t["capture"]
+        row[f"{prefix}_precision@{t['top_k_pct']}"] = t["precision"]
+    return row
+
+
+_P_CLIP = 1e-6
+_LOGIT_MAX = float(np.log((1 - _P_CLIP) / _P_CLIP))
+
+
+class MetricsAccumulator:
+    """Bounded-memory, mergeable evaluation over (y, p) chunks.
+
+    Keeps a fixed-size histogram of clipped scores per class (bins uniform in
+    logit space over the [1e-6, 1 - 1e-6] clip range used by ``eval_probs``),
+    exact running sums for pos_rate / log-loss / Brier, and fixed calibration
+    bins. Memory is O(n_bins) regardless of how many pixels are added, and
+    accumulators built on different tiles or processes combine with ``merge``.
+
+    Error bounds (all reported, all exact for the data seen):
+      * ROC-AUC treats pairs within a bin as ties; ``roc_auc_err`` bounds the
+        absolute error (sum over bins of pos_b * neg_b / (2 * P * N)).
+      * PR-AUC is bracketed by [``pr_auc_lo``, ``pr_auc_hi``]: the average
+        precision with every bin's negatives ranked before / after its positives.
+      * Top-K% thresholds are within one bin (logit width 2 * 13.8 / n_bins);
+        ``capture_lo`` / ``capture_hi`` bound the capture at that budget.
+    """
+
+    def __init__(self, n_bins: int = 4096, n_calib_bins: int = 10) -> None:
+        self.n_bins = int(n_bins)
+        self.n_calib_bins = int(n_calib_bins)
+        self.pos = np.zeros(self.n_bins, dtype=np.int64)
+        self.neg = np.zeros(self.n_bins, dtype=np.int64)
+        self.calib_n = np.zeros(self.n_calib_bins, dtype=np.int64)
+        self.calib_sum_p = np.zeros(self.n_calib_bins)
+        self.calib_sum_y = np.zeros(self.n_calib_bins)
+        self.sum_logloss = 0.0
+        self.sum_brier = 0.0
+
+    @property
+    def n(self) -> int:
+        return int(self.pos.sum() + self.neg.sum())
+
+    @property
+    def n_pos(self) -> int:
+        return int(self.pos.sum())
+
+    def _bin(self, pc: np.ndarray) -> np.ndarray:
+        z = np.log(pc) - np.log1p(-pc)
+        b = np.floor((z + _LOGIT_MAX) / (2 * _LOGIT_MAX) * self.n_bins).astype(np.int64)
+        return np.clip(b, 0, self.n_bins - 1)
+
+    def _edges(self) -> np.ndarray:
+        """Bin edges in probability space (n_bins + 1, ascending)."""
+        z = np.linspace(-_LOGIT_MAX, _LOGIT_MAX, self.n_bins + 1)
+        return 1 / (1 + np.exp(-z))
+
+    def update(self, y, p) -> "MetricsAccumulator":
+        y = np.asarray(y).astype(np.int64).ravel()
+        pc = np.clip(np.asarray(p).astype(float).ravel(), _P_CLIP, 1 - _P_CLIP)
+        b = self._bin(pc)
+        pos = y == 1
+        self.pos += np.bincount(b[pos], minlength=self.n_bins)
+        self.neg += np.bincount(b[~pos], minlength=self.n_bins)
+
+        yf = y.astype(float)
+        self.sum_logloss += float(-np.sum(yf * np.log(pc) + (1 - yf) * np.log1p(-pc)))
+        self.sum_brier += float(np.sum((pc - yf) ** 2))
+
+        cb = np.minimum((pc * self.n_calib_bins).astype(np.int64), self.n_calib_bins - 1)
+        self.calib_n += np.bincount(cb, minlength=self.n_calib_bins)
+        self.calib_sum_p += np.bincount(cb, weights=pc, minlength=self.n_calib_bins)
+        self.calib_sum_y += np.bincount(cb, weights=yf, minlength=self.n_calib_bins)
+        return self
+
+    def merge(self, other: "MetricsAccumulator") -> "MetricsAccumulator":
+        if (other.n_bins, other.n_calib_bins) != (self.n_bins, self.n_calib_bins):
+            raise ValueError("Cannot merge accumulators with different bin settings")
+        self.pos += other.pos
+        self.neg += other.neg
+        self.calib_n += other.calib_n
+        self.calib_sum_p += other.calib_sum_p
+        self.calib_sum_y += other.calib_sum_y
+        self.sum_logloss += other.sum_logloss
+        self.sum_brier += other.sum_brier
+        return self
+
+    def _auc(self) -> tuple[float, float, float, float, float]:
+        """(roc_auc, roc_auc_err, pr_auc_lo, pr_auc_hi, pr_auc) from the top bin down."""
+        P, N = self.n_pos, self.n - self.n_pos
+        if P == 0 or N == 0:
+            nan = float("nan")
+            return nan, nan, nan, nan, nan
+
+        pos, neg = self.pos[::-1].astype(float), self.neg[::-1].astype(float)
+        tps, fps = np.cumsum(pos), np.cumsum(neg)
+        roc = float(np.trapezoid(np.r_[0.0, tps / P], np.r_[0.0, fps / N]))
+        roc_err = float(np.sum(pos * neg) / (2.0 * P * N))
+
+        # AP: bins as ties (sklearn's treatment), plus best/worst in-bin orderings
+        keep = pos > 0
+        m, k = pos[keep], neg[keep]
+        a, f = (tps - pos)[keep], (fps - neg)[keep]
+        pr = float(np.sum(m * (a + m) / (a + f + m + k)) / P)
+
+        def sum_prec(c):
+            # sum_{j=1..m} (a + j) / (c + j), with c >= a
+            return m - (c - a) * (digamma(c + m + 1) - digamma(c + 1))
+
+        pr_hi = float(np.sum(sum_prec(a + f)) / P)
+        pr_lo = float(np.sum(sum_prec(a + f + k)) / P)
+        return roc, roc_err, pr_lo, pr_hi, pr
+
+    def eval_probs(self, name: str = "") -> dict:
+        n = self.n
+        roc, roc_err, pr_lo, pr_hi, pr = self._auc()
+        return {
+            "name": name,
+            "n": n,
+            "pos_rate": self.n_pos / n if n else float("nan"),
+            "roc_auc": roc,
+            "pr_auc": pr,
+            "logloss": self.sum_logloss / n if n else float("nan"),
+            "brier": self.sum_brier / n if n else float("nan"),
+            "roc_auc_err": roc_err,
+            "pr_auc_lo": pr_lo,
+            "pr_auc_hi": pr_hi,
+        }
+
+    def topk_report(self, top_k_list=(1, 2, 5, 10)) -> list[dict]:
+        """Approximate ``topk_report``; pixels are assumed uniform within the threshold bin.
+
+        The top-K% budget is the number of rows the exact report selects
+        (``p >= np.quantile(p, 1 - k/100)``), not ``k% * n``, so the capture bounds
+        also hold on small samples.
+        """
+        n = self.n
+        total_pos = max(self.n_pos, 1)
+        cnt = (self.pos + self.neg)[::-1]
+        pos = self.pos[::-1]
+        neg = self.neg[::-1]
+        cum_cnt = np.cumsum(cnt)
+        cum_pos = np.cumsum(pos)
+        edges = self._edges()[::-1]  # descending: bin i spans edges[i+1]..edges[i]
+
+        out = []
+        for k in top_k_list:
+            # rows with p >= np.quantile(p, 1 - k/100), as topk_report selects them
+            want = float(n - np.ceil((n - 1) * (1 - k / 100.0))) if n else 0.0
+            i = int(min(np.searchsorted(cum_cnt, want, side="left"), self.n_bins - 1))
+            above_cnt = float(cum_cnt[i] - cnt[i])
+            above_pos = float(cum_pos[i] - pos[i])
+            need = max(want - above_cnt, 0.0)
+            frac = need / cnt[i] if cnt[i] else 0.0
+
+            zi_hi = np.log(edges[i]) - np.log1p(-edges[i])
+            zi_lo = np.log(edges[i + 1]) - np.log1p(-edges[i + 1])
+            thr = float(1 / (1 + np.exp(-(zi_hi - frac * (zi_hi - zi_lo)))))
+
+            captured = above_pos + frac * pos[i]
+            out.append(
+                {
+                    "top_k_pct": int(k),
+                    "thr": thr,
+                    "capture": captured / total_pos,
+                    "precision": captured / want if want else 0.0,
+                    "capture_lo": (above_pos + max(0.0, need - neg[i])) / total_pos,
+                    "capture_hi": (above_pos + min(float(pos[i]), need)) / total_pos,
+                }
+            )
+        return out
+
+    def calibration(self) -> list[dict]:
+        """Reliability table: mean predicted probability vs observed rate per fixed bin."""
+        out = []
+        for i in range(self.n_calib_bins):
+            c = int(self.calib_n[i])
+            out.append(
+                {
+                    "bin_lo": i / self.n_calib_bins,
+                    "bin_hi": (i + 1) / self.n_calib_bins,
+                    "n": c,
+                    "mean_p": float(self.calib_sum_p[i] / c) if c else float("nan"),
+                    "obs_rate": float(self.calib_sum_y[i] / c) if c else float("nan"),
+                }
+            )
+        return out
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import argparse
+import json
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from src.modeling.train_logit import FEATURE_COLS, RunningMoments
+
+
+AEF_BANDS = FEATURE_COLS[:64]  # A00..A63; the frontier distances stay float32 in the sample store
+NODATA_CODE = -128  # codes span [-127, 127]; -128 marks NaN
+_QMAX = 127
+
+
+@dataclass
+class BandQuantizer:
+    """Per-band affine int8 codes: ``x ~= offset + scale * code``, ``code`` in [-127, 127].
+
+    ``offset`` is the middle of the band's range and ``scale`` half its width / 127,
+    so the rounding error is at most ``scale / 2`` (range / 508) per value.
+    """
+
+    bands: list[str]
+    scale: np.ndarray  # float32 (n_bands,)
+    offset: np.ndarray  # float32 (n_bands,)
+
+    @classmethod
+    def from_range(cls, bands: Sequence[str], lo, hi) -> "BandQuantizer":
+        lo = np.asarray(lo, dtype=np.float64)
+        hi = np.asarray(hi, dtype=np.float64)
+        if lo.shape != (len(bands),) or hi.shape != (len(bands),):
+            raise ValueError(f"Need one lo/hi per band ({len(bands)}), got {lo.shape} / {hi.shape}")
+        empty = ~np.isfinite(lo) | ~np.isfinite(hi)  # all-NaN band
+        lo, hi = np.where(empty, 0.0, lo), np.where(empty, 0.0, hi)
+        scale = (hi - lo) / (2 * _QMAX)
+        scale[scale <= 0] = 1.0
+        return cls(list(bands), scale.astype(np.float32), ((hi + lo) / 2).astype(np.float32))
+
+    @classmethod
+    def fit(cls, X: np.ndarray, bands: Sequence[str]) -> "BandQuantizer":
+        """Ranges from the columns of ``X`` (rows x bands), NaNs ignored."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[1] != len(bands):
+            raise ValueError(f"{X.shape[1]} columns for {len(bands)} bands")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN bands get scale 1
+            return cls.from_range(bands, np.nanmin(X, axis=0), np.nanmax(X, axis=0))
+
+    def to_dict(self) -> dict:
+        return {"bands": list(self.bands), "scale": self.scale.tolist(), "offset": self.offset.tolist()}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "BandQuantizer":
+        return cls(list(d["bands"]), np.asarray(d["scale"], dtype=np.float32), np.asarray(d["offset"], dtype=np.float32))
+
+    def encode(self, X: np.ndarray, axis: int = -1) -> np.ndarray:
+        """int8 codes of ``X`` with the bands along ``axis`` (columns by default); NaN -> ``NODATA_CODE``."""
+        shape = [1] * np.ndim(X)
+        shape[axis] = len(self.bands)
+        scale, offset = self.scale.reshape(shape), self.offset.reshape(shape)
+        q = (np.asarray(X, dtype=np.float32) - offset) / scale
+        nan = np.isnan(q)
+        np.rint(q, out=q)
+        np.clip(q, -_QMAX, _QMAX, out=q)
+        q[nan] = NODATA_CODE
+        return q.astype(np.int8)
+
+    def decode(self, Q: np.ndarray, axis: int = -1, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """float32 values of int8 codes (bands along ``axis``); ``NODATA_CODE`` -> NaN."""
+        shape = [1] * np.ndim(Q)
+        shape[axis] = len(self.bands)
+        out = np.multiply(Q, self.scale.reshape(shape), out=out, dtype=np.float32)
+        out += self.offset.reshape(shape)
+        out[Q == NODATA_CODE] = np.nan
+        return out
+
+    def code_moments(self, Q: np.ndarray) -> RunningMoments:
+        """Exact raw-space moments of ``decode(Q)`` from one 256-bin histogram per band.
+
+        Reads each code once as int8; no float copy of ``Q`` is made.
+        """
+        n = len(Q)
+        values = np.arange(-128, 128, dtype=np.float64)
+        mean = np.empty(len(self.bands))
+        m2 = np.empty(len(self.bands))
+        for j in range(len(self.bands)):
+            counts = np.bincount(np.asarray(Q[:, j]).view(np.uint8) ^ 0x80, minlength=256)
+            if counts[0]:
+                raise ValueError(f"Band {self.bands[j]} has NaN codes; moments need complete rows")
+            mean[j] = counts @ values / max(n, 1)
+            m2[j] = counts @ (values - mean[j]) ** 2
+        scale = self.scale.astype(np.float64)
+        return RunningMoments(n, self.offset + scale * mean, scale**2 * m2) if n else RunningMoments()
+
+    def fold(self, W: np.ndarray, b, feature_cols: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Weights / intercepts that score codes directly: ``w . x + b == w' . code + b'``.
+
+        ``W`` is (n_features,) or (n_features, n_models) over ``feature_cols``;
+        rows of bands this quantizer does not cover are left as they are.
+        """
+        W = np.array(W, dtype=np.float64)
+        b = np.array(b, dtype=np.float64)
+        for j, band in enumerate(self.bands):
+            if band in feature_cols:
+                i = list(feature_cols).index(band)
+                b = b + float(self.offset[j]) * W[i]
+                W[i] = W[i] * float(self.scale[j])
+        return W, b
+
+    def subset(self, bands: Sequence[str]) -> "BandQuantizer":
+        idx = [self.bands.index(b) for b in bands]
+        return BandQuantizer(list(bands), self.scale[idx], self.offset[idx])
+
+    def max_error(self) -> np.ndarray:
+        """Largest rounding error per band (values inside the fitted range)."""
+        return self.scale.astype(np.float64) / 2
+
+
+def _sidecar(path: Path) -> Path:
+    return path.with_name(path.name + ".quant.json")
+
+
+def save_stack_quantizer(path: str | Path, quantizer: BandQuantizer) -> None:
+    _sidecar(Path(path)).write_text(json.dumps(quantizer.to_dict()) + "\n")
+
+
+def load_stack_quantizer(path: str | Path) -> Optional[BandQuantizer]:
+    """The ``<file>.quant.json`` sidecar of an int8 raster stack, if there is one."""
+    p = _sidecar(Path(path))
+    return BandQuantizer.from_dict(json.loads(p.read_text())) if p.exists() else None
+
+
+def quantize_stack(
+    features: str | Path,
+    out: str | Path,
+    band_names: Optional[Sequence[str]] = None,
+    block_rows: int = 256,
+) -> BandQuantizer:
+    """Write an int8 copy of a (bands, rows, cols) float stack plus its ``.quant.json`` sidecar.
+
+    Two passes of ``block_rows`` rows: per-band ranges, then codes. ``src.raster.score``
+    reads the result directly, folding the scales into the weights.
+    """
+    from src.raster.io import RasterWriter, open_stack
+
+    stack = open_stack(features, band_names)
+    names = stack.band_names
+    if names is None:
+        if stack.n_bands != len(FEATURE_COLS):
+            raise ValueError(f"Feature stack has {stack.n_bands} unnamed bands; pass band_names")
+        names = FEATURE_COLS
+    rows, cols = stack.shape
+    bands = list(range(stack.n_bands))
+
+    lo = np.full(len(bands), np.inf)
+    hi = np.full(len(bands), -np.inf)
+    for r0 in range(0, rows, block_rows):
+        X = stack.read(bands, r0, min(r0 + block_rows, rows)).reshape(len(bands), -1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            lo = np.fmin(lo, np.nanmin(X, axis=1))
+            hi = np.fmax(hi, np.nanmax(X, axis=1))
+    quantizer = BandQuantizer.from_range(names, lo, hi)
+
+    writer = RasterWriter(out, len(bands), (rows, cols), np.int8, band_names=names, like=stack)
+    for r0 in range(0, rows, block_rows):
+        writer.write(r0, quantizer.encode(stack.read(bands, r0, min(r0 + block_rows, rows)), axis=0))
+    writer.close()
+    save_stack_quantizer(out, quantizer)
+    return quantizer
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Quantize a local (bands, rows, cols) feature stack to int8 codes.")
+    ap.add_argument("--features", required=True, help="Float .npy or GeoTIFF feature stack")
+    ap.add_argument("--out", required=True, help="Output int8 .npy/.tif (a <out>.quant.json sidecar is written too)")
+    ap.add_argument("--block_rows", type=int, default=256)
+    args = ap.parse_args()
+
+    q = quantize_stack(args.features, args.out, block_rows=args.block_rows)
+    err = q.max_error()
+    print(f"Quantized {len(q.bands)} bands to int8 -> {args.out} (max rounding error per band: {err.min():.3g}..{err.max():.3g})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.modeling.geo import parse_point_geo
+from src.modeling.quantize import AEF_BANDS, NODATA_CODE, BandQuantizer
+from src.modeling.train_logit import FEATURE_COLS, RunningMoments, standardize_inplace
+
+
+STORE_VERSION = 1
+META_FILE = "meta.json"
+_TMP_FILES = ("X.f32.tmp", "y.i8.tmp", "lonlat.f64.tmp")  # raw per-partition buffers while ingesting
+
+
+def _part_dir(root: Path, year: int) -> Path:
+    return root / f"tYear={int(year)}"
+
+
+class SampleStore:
+    """Year-partitioned float32 sample store.
+
+    Layout::
+
+        <root>/meta.json                 columns, per-year row counts
+        <root>/tYear=2018/X.npy          (n, n_features) float32, C order
+        <root>/tYear=2018/y.npy          (n,) int8 labels
+        <root>/tYear=2018/lonlat.npy     (n, 2) float64 point coordinates (if the CSVs had .geo)
+
+    Partitions are opened memory-mapped, so loading a year costs a page-in of
+    exactly the projected float32 matrix (no CSV parsing, no float64 copies).
+
+    A quantized store (``ingest_csv(quantize=True)``) keeps the AEF bands as
+    int8 codes with a per-band scale / offset (``meta.json["quantization"]``)::
+
+        <root>/tYear=2018/Xq.npy         (n, n_quantized) int8 codes
+        <root>/tYear=2018/Xf.npy         (n, n_other) float32 (the frontier distances)
+
+    It is read through the same methods: rows are decoded block by block into
+    the float32 output (``load_standardized`` folds the decoding into the
+    scaling), so partitions are about 3.7x smaller on disk and in the page cache.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        meta_path = self.path / META_FILE
+        if not meta_path.exists():
+            raise ValueError(f"Not a sample store (missing {META_FILE}): {self.path}")
+        self.meta = json.loads(meta_path.read_text())
+        self.feature_cols: list[str] = list(self.meta["feature_cols"])
+        self.partitions: Dict[int, dict] = {int(k): v for k, v in self.meta["partitions"].items()}
+        self.has_lonlat = bool(self.meta.get("has_lonlat", False))
+        q = self.meta.get("quantization")
+        self.quantizer: Optional[BandQuantizer] = BandQuantizer.from_dict(q) if q else None
+        self._float_cols = [c for c in self.feature_cols if self.quantizer is None or c not in self.quantizer.bands]
+
+    @property
+    def years(self) -> list[int]:
+        return sorted(self.partitions)
+
+    def n_rows(self, years: Optional[Iterable[int]] = None) -> int:
+        return sum(self.partitions[y]["n"] for y in self._select(years))
+
+    def _select(self, years: Optional[Iterable[int]]) -> list[int]:
+        if years is None:
+            return self.years
+        return [int(y) for y in years if int(y) in self.partitions]
+
+    def _col_idx(self, feature_cols: Optional[Sequence[str]]) -> Optional[list[int]]:
+        if feature_cols is None or list(feature_cols) == self.feature_cols:
+            return None
+        missing = [c for c in feature_cols if c not in self.feature_cols]
+        if missing:
+            raise ValueError(f"Missing feature cols in store: {missing[:5]} ... ({len(missing)} missing)")
+        return [self.feature_cols.index(c) for c in feature_cols]
+
+    def partition(self, year: int) -> tuple[np.ndarray, np.ndarray]:
+        """Memory-mapped (X, y) of one tYear partition (read-only; decoded in memory if quantized)."""
+        d = _part_dir(self.path, year)
+        y = np.load(d / "y.npy", mmap_mode="r")
+        if self.quantizer is not None:
+            X = np.empty((len(y), len(self.feature_cols)), dtype=np.float32)
+            self._fill(year, 0, len(y), self._layout(self.feature_cols), X, *self._decode_affine(self.feature_cols))
+            return X, y
+        X = np.load(d / "X.npy", mmap_mode="r")
+        return X, y
+
+    def partition_codes(self, year: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Memory-mapped (int8 codes, float32 other columns, y) of a quantized partition."""
+        if self.quantizer is None:
+            raise ValueError(f"Store is not quantized: {self.path}")
+        d = _part_dir(self.path, year)
+        Q = np.load(d / "Xq.npy", mmap_mode="r")
+        F = np.load(d / "Xf.npy", mmap_mode="r")
+        return Q, F, np.load(d / "y.npy", mmap_mode="r")
+
+    def _layout(self, cols: Sequence[str]) -> tuple[list[int], list[int], list[int], list[int]]:
+        """Output positions / source columns of ``cols`` in the code matrix and the float matrix."""
+        qb = self.quantizer.bands
+        qpos = [i for i, c in enumerate(cols) if c in qb]
+        fpos = [i for i, c in enumerate(cols) if c not in qb]
+        return qpos, [qb.index(cols[i]) for i in qpos], fpos, [self._float_cols.index(cols[i]) for i in fpos]
+
+    def _decode_affine(self, cols: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+        """(a, c) per column so that value = a * stored + c (codes for quantized bands, else as stored)."""
+        a = np.ones(len(cols), dtype=np.float64)
+        c = np.zeros(len(cols), dtype=np.float64)
+        qpos, qsel, _, _ = self._layout(cols)
+        a[qpos] = self.quantizer.scale[qsel]
+        c[qpos] = self.quantizer.offset[qsel]
+        return a, c
+
+    def _fill(
+        self,
+        year: int,
+        i0: int,
+        i1: int,
+        layout,
+        out: np.ndarray,
+        a: np.ndarray,
+        c: np.ndarray,
+        block_rows: int = 65_536,
+    ) -> None:
+        """out[:] = a * stored + c for rows i0:i1 of a quantized partition, one row block at a time."""
+        qpos, qsel, fpos, fsel = layout
+        Q, F, _ = self.partition_codes(year)
+        a = a.astype(np.float32)
+        c = c.astype(np.float32)
+        for j in range(i0, i1, block_rows):
+            k = min(j + block_rows, i1)
+            o = out[j - i0 : k - i0]
+            if qpos:
+                q = Q[j:k][:, qsel]
+                o[:, qpos] = q
+            if fpos:
+                o[:, fpos] = F[j:k][:, fsel]
+            o *= a
+            o += c
+            if qpos:
+                nan = q == NODATA_CODE
+                if nan.any():
+                    sub = o[:, qpos]
+                    sub[nan] = np.nan
+                    o[:, qpos] = sub
+
+    def load_xy(
+        self,
+        years: Optional[Iterable[int]] = None,
+        feature_cols: Optional[Sequence[str]] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return (X float32, y int32) for the selected years; other partitions are never opened.
+
+        A single partition with all columns comes back memory-mapped; otherwise the rows
+        are copied once into one preallocated contiguous float32 matrix.
+        """
+        sel = self._select(years)
+        idx = self._col_idx(feature_cols)
+        if self.quantizer is not None:
+            cols = self.feature_cols if idx is None else list(feature_cols)
+            return self._load_quantized(sel, cols, *self._decode_affine(cols))
+        if len(sel) == 1 and idx is None:
+            X, y = self.partition(sel[0])
+            return X, y.astype(np.int32)
+
+        n_feat = len(self.feature_cols) if idx is None else len(idx)
+        n = self.n_rows(sel)
+        X = np.empty((n, n_feat), dtype=np.float32)
+        y = np.empty(n, dtype=np.int32)
+        i = 0
+        for year in sel:
+            Xp, yp = self.partition(year)
+            m = len(yp)
+            if idx is None:
+                # read() straight into place: no mapped pages of the partition stay resident
+                _read_npy_into(_part_dir(self.path, year) / "X.npy", X[i : i + m])
+            else:
+                X[i : i + m] = Xp[:, idx]
+            y[i : i + m] = yp
+            i += m
+        return X, y
+
+    def _load_quantized(
+        self, sel: list[int], cols: list[str], a: np.ndarray, c: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        layout = self._layout(cols)
+        X = np.empty((self.n_rows(sel), len(cols)), dtype=np.float32)
+        y = np.empty(len(X), dtype=np.int32)
+        i = 0
+        for year in sel:
+            m = self.partitions[year]["n"]
+            self._fill(year, 0, m, layout, X[i : i + m], a, c)
+            y[i : i + m] = np.load(_part_dir(self.path, year) / "y.npy", mmap_mode="r")
+            i += m
+        return X, y
+
+    def load_standardized(
+        self,
+        years: Optional[Iterable[int]] = None,
+        feature_cols: Optional[Sequence[str]] = None,
+    ) -> tuple[np.ndarray, np.ndarray, RunningMoments]:
+        """(X standardized float32, y int32, raw-space moments) in one contiguous writable matrix.
+
+        The same matrix ``load_xy`` + ``standardize_inplace`` produce. On a
+        quantized store the moments come from per-band code histograms and each
+        code goes straight to its standardized value (one fused multiply-add),
+        without a decoded float copy.
+        """
+        sel = self._select(years)
+        if self.quantizer is None:
+            X, y = self.load_xy(sel, feature_cols)
+            if isinstance(X, np.memmap) or not X.flags.writeable:
+                X = np.array(X)
+            return X, y, standardize_inplace(X)
+
+        cols = self.feature_cols if feature_cols is None else list(feature_cols)
+        self._col_idx(cols)
+        qpos, qsel, fpos, fsel = self._layout(cols)
+        sub = self.quantizer.subset([self.quantizer.bands[j] for j in qsel])
+        moments = RunningMoments()
+        for year in sel:
+            Q, F, _ = self.partition_codes(year)
+            mq = sub.code_moments(Q[:, qsel]) if qsel else None
+            mf = RunningMoments()
+            for i in range(0, len(F), 65_536):
+                mf.update(F[i : i + 65_536][:, fsel])
+            n = len(Q)
+            if n == 0:
+                continue
+            mean, m2 = np.empty(len(cols)), np.empty(len(cols))
+            if qpos:
+                mean[qpos], m2[qpos] = mq.mean, mq.m2
+            if fpos:
+                mean[fpos], m2[fpos] = mf.mean, mf.m2
+            moments.merge(RunningMoments(n, mean, m2))
+        if moments.count == 0:
+            raise ValueError(f"No rows in {self.path} for years={sel}")
+
+        scaler = moments.to_scaler()
+        a, c = self._decode_affine(cols)
+        # (a * code + c - mean) / scale
+        return (*self._load_quantized(sel, cols, a / scaler.scale_, (c - scaler.mean_) / scaler.scale_), moments)
+
+    def load_lonlat(self, years: Optional[Iterable[int]] = None) -> tuple[np.ndarray, np.ndarray]:
+        """(lon, lat) of the selected years, row-aligned with ``load_xy(years)``."""
+        if not self.has_lonlat:
+            raise ValueError(f"Store has no coordinates (ingest CSVs with a .geo column): {self.path}")
+        sel = self._select(years)
+        parts = [np.load(_part_dir(self.path, y) / "lonlat.npy", mmap_mode="r") for y in sel]
+        ll = np.concatenate(parts) if parts else np.empty((0, 2))
+        return ll[:, 0].copy(), ll[:, 1].copy()
+
+    def iter_chunks(
+        self,
+        years: Optional[Iterable[int]] = None,
+        chunk_rows: int = 262_144,
+        feature_cols: Optional[Sequence[str]] = None,
+    ) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """Yield (X, y) row blocks of at most ``chunk_rows`` from the selected partitions."""
+        idx = self._col_idx(feature_cols)
+        if self.quantizer is not None:
+            cols = self.feature_cols if idx is None else list(feature_cols)
+            layout, (a, c) = self._layout(cols), self._decode_affine(cols)
+            for year in self._select(years):
+                yp = np.load(_part_dir(self.path, year) / "y.npy", mmap_mode="r")
+                for i in range(0, len(yp), chunk_rows):
+                    k = min(i + chunk_rows, len(yp))
+                    X = np.empty((k - i, len(cols)), dtype=np.float32)
+                    self._fill(year, i, k, layout, X, a, c)
+                    yield X, np.asarray(yp[i:k], dtype=np.int32)
+            return
+        for year in self._select(years):
+            Xp, yp = self.partition(year)
+            for i in range(0, len(yp), chunk_rows):
+                Xc = Xp[i : i + chunk_rows]
+                yield (np.asarray(Xc) if idx is None else Xc[:, idx]), np.asarray(yp[i : i + chunk_rows], dtype=np.int32)
+
+
+def _read_npy_into(path: Path, out: np.ndarray) -> None:
+    """Fill the contiguous ``out`` with the data of a .npy file of the same shape and dtype."""
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+        if shape != out.shape or fortran or dtype != out.dtype:
+            raise ValueError(f"{path}: expected {out.shape} {out.dtype}, found {shape} {dtype}")
+        if f.readinto(memoryview(out).cast("B")) != out.nbytes:
+            raise ValueError(f"{path}: truncated file")
+
+
+def _finalize_partition(
+    tmp_x: Path,
+    tmp_y: Path,
+    out_dir: Path,
+    n: int,
+    n_feat: int,
+    block_rows: int = 1_000_000,
+    quantizer: Optional[BandQuantizer] = None,
+    qidx: Sequence[int] = (),
+) -> None:
+    """Turn the raw appended buffers into .npy files, block by block.
+
+    With a ``quantizer`` the columns ``qidx`` go to int8 ``Xq.npy`` and the rest to ``Xf.npy``.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    raw_x = np.memmap(tmp_x, dtype=np.float32, mode="r", shape=(n, n_feat))
+    if quantizer is None:
+        X = np.lib.format.open_memmap(out_dir / "X.npy", mode="w+", dtype=np.float32, shape=(n, n_feat))
+        for i in range(0, n, block_rows):
+            X[i : i + block_rows] = raw_x[i : i + block_rows]
+        X.flush()
+        del X, raw_x
+    else:
+        fidx = [j for j in range(n_feat) if j not in set(qidx)]
+        Q = np.lib.format.open_memmap(out_dir / "Xq.npy", mode="w+", dtype=np.int8, shape=(n, len(qidx)))
+        F = np.lib.format.open_memmap(out_dir / "Xf.npy", mode="w+", dtype=np.float32, shape=(n, len(fidx)))
+        for i in range(0, n, block_rows):
+            block = raw_x[i : i + block_rows]
+            Q[i : i + block_rows] = quantizer.encode(block[:, list(qidx)])
+            F[i : i + block_rows] = block[:, fidx]
+        Q.flush()
+        F.flush()
+        del Q, F, raw_x
+
+    np.save(out_dir / "y.npy", np.fromfile(tmp_y, dtype=np.int8))
+    tmp_x.unlink()
+    tmp_y.unlink()
+
+
+def ingest_csv(
+    csv_paths: str | Path | Sequence[str | Path],
+    out_dir: str | Path,
+    feature_cols: Sequence[str] = FEATURE_COLS,
+    chunksize: int = 200_000,
+    quantize: bool = False,
+) -> SampleStore:
+    """Convert exported CSV shards into a year-partitioned float32 store at ``out_dir``.
+
+    Only ``feature_cols``, ``label`` and ``tYear`` are parsed (``system:index``
+    etc. are skipped), directly as float32/int8/int16, chunk by chunk, so peak
+    memory is one chunk regardless of the CSV size. When every shard has a
+    ``.geo`` column the point coordinates are kept too (``load_lonlat``). An
+    existing store at ``out_dir`` is replaced.
+
+    With ``quantize`` the AEF bands are stored as int8 codes, each band scaled
+    to its min / max over all shards (see ``SampleStore``).
+    """
+    if isinstance(csv_paths, (str, Path)):
+        csv_paths = [csv_paths]
+    csv_paths = [Path(p) for p in csv_paths]
+    if not csv_paths:
+        raise ValueError("No CSV files to ingest")
+    feature_cols = list(feature_cols)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    dtypes = {c: np.float32 for c in feature_cols}
+    dtypes.update({"label": np.int8, "tYear": np.int16})
+    usecols = feature_cols + ["label", "tYear"]
+    headers = {path: pd.read_csv(path, nrows=0).columns for path in csv_paths}
+    with_geo = all(".geo" in h for h in headers.values())
+    qidx = [j for j, c in enumerate(feature_cols) if quantize and c in AEF_BANDS]
+    lo = np.full(len(qidx), np.inf)
+    hi = np.full(len(qidx), -np.inf)
+
+    counts: Dict[int, int] = {}
+    positives: Dict[int, int] = {}
+    handles: Dict[int, tuple] = {}
+    try:
+        for path in csv_paths:
+            missing = [c for c in usecols if c not in headers[path]]
+            if missing:
+                raise ValueError(f"Missing cols in {path}: {missing[:5]} ... ({len(missing)} missing)")
+
+            cols = usecols + [".geo"] if with_geo else usecols
+            for chunk in pd.read_csv(path, usecols=cols, dtype=dtypes, chunksize=chunksize):
+                X = chunk[feature_cols].to_numpy(np.float32)
+                y = chunk["label"].to_numpy(np.int8)
+                t = chunk["tYear"].to_numpy(np.int16)
+                ll = np.column_stack(parse_point_geo(chunk[".geo"])) if with_geo else None
+                if qidx and len(X):
+                    lo = np.fmin(lo, np.nanmin(X[:, qidx], axis=0))
+                    hi = np.fmax(hi, np.nanmax(X[:, qidx], axis=0))
+                for year in np.unique(t):
+                    year = int(year)
+                    sel = t == year
+                    if year not in handles:
+                        d = _part_dir(out_dir, year)
+                        d.mkdir(parents=True, exist_ok=True)
+                        handles[year] = (
+                            open(d / "X.f32.tmp", "wb"),
+                            open(d / "y.i8.tmp", "wb"),
+                            open(d / "lonlat.f64.tmp", "wb") if with_geo else None,
+                        )
+                    fx, fy, fll = handles[year]
+                    np.ascontiguousarray(X[sel]).tofile(fx)
+                    y[sel].tofile(fy)
+                    if fll is not None:
+                        np.ascontiguousarray(ll[sel]).tofile(fll)
+                    counts[year] = counts.get(year, 0) + int(sel.sum())
+                    positives[year] = positives.get(year, 0) + int(y[sel].sum())
+        for fh in handles.values():  # flushed before the buffers are read back
+            for f in fh:
+                if f is not None:
+                    f.close()
+
+        quantizer = BandQuantizer.from_range([feature_cols[j] for j in qidx], lo, hi) if qidx else None
+        partitions = {}
+        for year in sorted(counts):
+            d = _part_dir(out_dir, year)
+            for stale in ("X.npy", "Xq.npy", "Xf.npy"):
+                (d / stale).unlink(missing_ok=True)
+            _finalize_partition(
+                d / "X.f32.tmp", d / "y.i8.tmp", d, counts[year], len(feature_cols), quantizer=quantizer, qidx=qidx
+            )
+            if with_geo:
+                np.save(d / "lonlat.npy", np.fromfile(d / "lonlat.f64.tmp", dtype=np.float64).reshape(-1, 2))
+                (d / "lonlat.f64.tmp").unlink()
+            partitions[str(year)] = {"n": counts[year], "pos": positives[year]}
+
+        # a replaced store keeps no partitions of years the new CSVs do not have
+        keep = {_part_dir(out_dir, y).name for y in counts}
+        for d in out_dir.glob("tYear=*"):
+            if d.is_dir() and d.name not in keep:
+                shutil.rmtree(d)
+    finally:
+        # raw buffers of a failed ingest (a finished partition has already consumed its own)
+        for year, fh in handles.items():
+            for f in fh:
+                if f is not None:
+                    f.close()
+            d = _part_dir(out_dir, year)
+            for name in _TMP_FILES:
+                (d / name).unlink(missing_ok=True)
+            if d.exists() and not any(d.iterdir()):
+                d.rmdir()
+
+    meta = {
+        "version": STORE_VERSION,
+        "feature_cols": feature_cols,
+        "partitions": partitions,
+        "has_lonlat": with_geo,
+        "sources": [p.name for p in csv_paths],
+    }
+    if quantizer is not None:
+        meta["quantization"] = quantizer.to_dict()
+    (out_dir / META_FILE).write_text(json.dumps(meta, indent=2) + "\n")
+    return SampleStore(out_dir)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Ingest exported sample CSV shards into a year-partitioned float32 store.")
+    ap.add_argument("--csv", nargs="+", required=True, help="One or more CSV shards (e.g. data/aef_train_*.csv)")
+    ap.add_argument("--out", required=True, help="Output store directory (e.g. data/train_store)")
+    ap.add_argument("--chunksize", type=int, default=200_000)
+    ap.add_argument("--quantize", action="store_true", help="Store the AEF bands as int8 codes (per-band scale/offset)")
+    args = ap.parse_args()
+
+    store = ingest_csv(args.csv, args.out, chunksize=args.chunksize, quantize=args.quantize)
+    for year in store.years:
+        p = store.partitions[year]
+        print(f"tYear={year}: n={p['n']} pos={p['pos']}")
+    print(f"Saved store to: {store.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+from src.modeling.export_weights import load_logit_model
+
+
+@dataclass
+class LogitModel:
+    w: np.ndarray  # float64 (n_features,)
+    b: float
+    feature_cols: list[str]
+    path: str
+    version: int
+    loaded_at: float
+
+    def score(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        z = X @ self.w + self.b
+        return z, 1.0 / (1.0 + np.exp(-z))
+
+
+class ModelHandle:
+    """The current model of a weights JSON, reloaded when the file's mtime / size change.
+
+    The file is stat'ed at most every ``check_s`` seconds. A file that fails to
+    load (e.g. caught mid-write) keeps the previous model; the error is kept in
+    ``last_error`` and the load is retried at the next check.
+    """
+
+    def __init__(self, path: str | Path, check_s: float = 1.0) -> None:
+        self.path = Path(path)
+        self.check_s = check_s
+        self.version = 0
+        self.last_error: Optional[str] = None
+        self._sig: Optional[tuple[int, int]] = None
+        self._checked = 0.0
+        self.model = self._load()
+
+    def _signature(self) -> tuple[int, int]:
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self) -> LogitModel:
+        sig = self._signature()
+        w, b, feature_cols = load_logit_model(self.path)
+        self._sig = sig
+        self.version += 1
+        w = np.asarray(w, dtype=np.float64)
+        return LogitModel(w, float(b or 0.0), feature_cols, str(self.path), self.version, time.time())
+
+    def current(self) -> LogitModel:
+        now = time.monotonic()
+        if now - self._checked >= self.check_s:
+            self._checked = now
+            try:
+                if self._signature() != self._sig:
+                    self.model = self._load()
+                    self.last_error = None
+            except (OSError, ValueError, KeyError) as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+        return self.model
+
+
+@dataclass
+class ServiceStats:
+    """Request / batch counters and a window of recent request latencies."""
+
+    window: int = 10_000
+    started: float = field(default_factory=time.monotonic)
+    requests: int = 0
+    points: int = 0
+    batches: int = 0
+    errors: int = 0
+    max_batch_points: int = 0
+    latencies_ms: deque = field(default_factory=deque)
+    recent: deque = field(default_factory=deque)  # (t, points) of recent requests
+
+    def record(self, n_points: int, latency_s: float) -> None:
+        self.requests += 1
+        self.points += n_points
+        self.latencies_ms.append(1e3 * latency_s)
+        self.recent.append((time.monotonic(), n_points))
+        while len(self.latencies_ms) > self.window:
+            self.latencies_ms.popleft()
+        while len(self.recent) > self.window:
+            self.recent.popleft()
+
+    def to_dict(self) -> dict:
+        now = time.monotonic()
+        lat = np.fromiter(self.latencies_ms, dtype=np.float64)
+        pct = {f"p{q}_ms": float(np.percentile(lat, q)) if len(lat) else None for q in (50, 90, 99)}
+        last = [n for t, n in self.recent if now - t <= 10.0]
+        uptime = now - self.started
+        return {
+            "uptime_s": uptime,
+            "requests": self.requests,
+            "points": self.points,
+            "batches": self.batches,
+            "errors": self.errors,
+            "mean_batch_points": self.points / self.batches if self.batches else None,
+            "max_batch_points": self.max_batch_points,
+            "points_per_s": self.points / uptime if uptime > 0 else None,
+            "points_per_s_10s": sum(last) / min(10.0, uptime) if uptime > 0 else None,
+            "latency_window": int(len(lat)),
+            "max_ms": float(lat.max()) if len(lat) else None,
+            **pct,
+        }
+
+
+class MicroBatcher:
+    """Coalesce concurrent ``score`` calls into one vectorized model evaluation.
+
+    The loop takes the first waiting request, then keeps collecting for up to
+    ``max_wait_ms`` or until ``max_batch`` points are queued, scores the
+    concatenated rows with one matmul and hands each caller its slice. Under
+    load batches fill up without waiting; a lone request waits at most
+    ``max_wait_ms``.
+    """
+
+    def __init__(
+        self, handle: ModelHandle, stats: ServiceStats, max_batch: int = 4096, max_wait_ms: float = 1.0
+    ) -> None:
+        self.handle = handle
+        self.stats = stats
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1e3
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def score(self, X: np.ndarray, feature_cols: list[str]) -> tuple[np.ndarray, np.ndarray, LogitModel]:
+        """Score rows of ``X`` laid out in ``feature_cols`` (the bands of the model they were parsed for)."""
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((X, feature_cols, fut))
+        return await fut
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            n = len(items[0][0])
+            deadline = loop.time() + self.max_wait_s
+            while n < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                items.append(item)
+                n += len(item[0])
+            self._score(items)
+
+    def _score(self, items: list) -> None:
+        model = self.handle.current()
+        # rows parsed for a model with other bands (even the same number of them), reloaded since
+        stale = [it for it in items if it[1] != model.feature_cols]
+        for _, _, fut in stale:
+            if not fut.done():  # the caller may have gone away (cancelled)
+                fut.set_exception(ValueError(f"Model changed to version {model.version}; resend the request"))
+        items = [(x, fut) for x, cols, fut in items if cols == model.feature_cols]
+        if not items:
+            return
+        n = sum(len(x) for x, _ in items)
+        try:
+            X = np.concatenate([x for x, _ in items]) if len(items) > 1 else items[0][0]
+            score, prob = model.score(X)
+        except Exception as e:  # noqa: BLE001 - every waiting caller gets the error
+            for _, fut in items:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self.stats.batches += 1
+        self.stats.max_batch_points = max(self.stats.max_batch_points, n)
+        i = 0
+        for x, fut in items:
+            if not fut.done():
+                fut.set_result((score[i : i + len(x)], prob[i : i + len(x)], model))
+            i += len(x)
+
+
+def parse_rows(body: Any, feature_cols: list[str]) -> np.ndarray:
+    """(n, n_features) float64 from a /score request body.
+
+    Accepts ``{"X": [[...], ...]}`` (rows in the model's ``feature_cols`` order),
+    ``{"x": [...]}`` (one row) or ``{"rows": [{"A00": ..., ...}, ...]}`` (by band name).
+    """
+    if not isinstance(body, dict):
+        raise ValueError("Body must be a JSON object with 'X', 'x' or 'rows'")
+    if "rows" in body:
+        rows = body["rows"]
+        missing = sorted({c for r in rows for c in feature_cols if c not in r})
+        if missing:
+            raise ValueError(f"Rows are missing model bands: {missing[:5]} ... ({len(missing)} missing)")
+        X = np.array([[r[c] for c in feature_cols] for r in rows], dtype=np.float64)
+    elif "X" in body or "x" in body:
+        X = np.array(body["X"] if "X" in body else [body["x"]], dtype=np.float64)
+    else:
+        raise ValueError("Body must have 'X', 'x' or 'rows'")
+    if X.ndim != 2 or X.shape[1] != len(feature_cols):
+        raise ValueError(
+            f"Expected rows of {len(feature_cols)} values ({feature_cols[0]}..{feature_cols[-1]}), got shape {X.shape}"
+        )
+    return X
+
+
+class ScoringService:
+    """HTTP/1.1 JSON front end (stdlib asyncio, keep-alive) over a ``MicroBatcher``.
+
+    ``POST /score`` -> ``{"score": [...], "prob": [...], "model": {...}}``;
+    ``GET /stats`` -> ``ServiceStats`` plus the model in use; ``GET /healthz``.
+    """
+
+    def __init__(
+        self, weights: str | Path, max_batch: int = 4096, max_wait_ms: float = 1.0, reload_s: float = 1.0
+    ) -> None:
+        self.handle = ModelHandle(weights, check_s=reload_s)
+        self.stats = ServiceStats()
+        self.batcher = MicroBatcher(self.handle, self.stats, max_batch=max_batch, max_wait_ms=max_wait_ms)
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> int:
+        """Start listening; returns the bound port (pass 0 for any free port)."""
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle_conn, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    def _model_info(self, model: LogitModel) -> dict:
+        return {
+            "path": model.path,
+            "version": model.version,
+            "n_features": len(model.feature_cols),
+            "loaded_at": model.loaded_at,
+        }
+
+    async def _handle_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, version = line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+                status, payload = await self._route(method, target.split("?")[0], body)
+                data = json.dumps(payload).encode()
+                close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> tuple[str, Any]:
+        if method == "GET" and path == "/healthz":
+            return "200 OK", {"ok": True, "model_version": self.handle.model.version}
+        if method == "GET" and path == "/stats":
+            return "200 OK", {
+                **self.stats.to_dict(),
+                "model": self._model_info(self.handle.model),
+                "reload_error": self.handle.last_error,
+            }
+        if method == "POST" and path == "/score":
+            t0 = time.perf_counter()
+            try:
+                cols = self.handle.current().feature_cols
+                X = parse_rows(json.loads(body or b"null"), cols)
+                score, prob, model = await self.batcher.score(X, cols)
+            except (ValueError, TypeError, KeyError) as e:  # JSONDecodeError is a ValueError
+                self.stats.errors += 1
+                return "400 Bad Request", {"error": str(e)}
+            self.stats.record(len(X), time.perf_counter() - t0)
+            return "200 OK", {"score": score.tolist(), "prob": prob.tolist(), "model": self._model_info(model)}
+        return "404 Not Found", {"error": f"No route for {method} {path}"}
+
+
+async def serve(weights: str | Path, host: str, port: int, **kwargs: Any) -> None:
+    service = ScoringService(weights, **kwargs)
+    port = await service.start(host, port)
+    print(f"Scoring {weights} on http://{host}:{port} (POST /score, GET /stats)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Local HTTP/JSON scoring service for a logistic weights JSON.")
+    ap.add_argument("--weights", required=True, help="Weights JSON (save_logit_weights / scripts/train_logit.py)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--max_batch", type=int, default=4096, help="Most points scored in one batch")
+    ap.add_argument("--max_wait_ms", type=float, default=1.0, help="Longest a request waits for others to batch with")
+    ap.add_argument("--reload_s", type=float, default=1.0, help="How often the weights file is checked for changes")
+    args = ap.parse_args()
+
+    try:
+        asyncio.run(
+            serve(
+                args.weights,
+                args.host,
+                args.port,
+                max_batch=args.max_batch,
+                max_wait_ms=args.max_wait_ms,
+                reload_s=args.reload_s,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.modeling.geo import parse_point_geo
+from src.modeling.metrics import metrics_row
+from src.modeling.sample_store import SampleStore
+from src.modeling.train_logit import FEATURE_COLS, fit_logit
+
+
+DEG_PER_KM_LAT = 1.0 / 111.32
+
+
+def tile_xy(lon: np.ndarray, lat: np.ndarray, tile_km: float = 50.0) -> tuple[np.ndarray, np.ndarray]:
+    """Approximate ``tile_km`` grid cells anchored at (0, 0); lon cell width shrinks with cos(lat).
+
+    Rows without coordinates get tile (-2**62, -2**62).
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    tile_h = tile_km * DEG_PER_KM_LAT
+    tile_w = tile_h / np.cos(np.deg2rad(np.clip(lat, -89.9, 89.9)))
+    missing = np.isnan(lon) | np.isnan(lat)
+    with np.errstate(invalid="ignore"):
+        tx = np.floor(np.where(missing, 0.0, lon / tile_w))
+        ty = np.floor(np.where(missing, 0.0, lat / tile_h))
+    tx = tx.astype(np.int64)
+    ty = ty.astype(np.int64)
+    tx[missing] = ty[missing] = -(2**62)
+    return tx, ty
+
+
+def tile_groups(lon: np.ndarray, lat: np.ndarray, tile_km: float = 50.0) -> np.ndarray:
+    """Dense int64 tile index per row (equal for rows in the same tile, -1 without coordinates)."""
+    tx, ty = tile_xy(lon, lat, tile_km)
+    keys = np.stack([tx, ty], axis=1)
+    _, groups = np.unique(keys, axis=0, return_inverse=True)
+    groups = groups.ravel().astype(np.int64)
+    groups[np.isnan(np.asarray(lon, dtype=float)) | np.isnan(np.asarray(lat, dtype=float))] = -1
+    return groups
+
+
+def add_lonlat_and_tiles(df: pd.DataFrame, tile_km: float = 50.0) -> pd.DataFrame:
+    """Vectorized version of the notebook helper: adds lon, lat, tile_x, tile_y, tile_id."""
+    lon, lat = parse_point_geo(df[".geo"])
+    tx, ty = tile_xy(lon, lat, tile_km)
+    missing = np.isnan(lon) | np.isnan(lat)
+    df = df.copy()
+    df["lon"] = lon
+    df["lat"] = lat
+    df["tile_x"] = pd.array(np.where(missing, 0, tx), dtype="Int64")
+    df["tile_y"] = pd.array(np.where(missing, 0, ty), dtype="Int64")
+    df.loc[missing, ["tile_x", "tile_y"]] = pd.NA
+    df["tile_id"] = df["tile_x"].astype(str) + "_" + df["tile_y"].astype(str)
+    return df
+
+
+def group_kfold(groups: np.ndarray, n_folds: int = 5, seed: int = 42) -> np.ndarray:
+    """Fold id per row, with whole tiles assigned to folds at random (-1 rows stay out: fold -1)."""
+    groups = np.asarray(groups)
+    uniq, inv = np.unique(groups, return_inverse=True)
+    valid = uniq >= 0
+    if valid.sum() < n_folds:
+        raise ValueError(f"Need at least {n_folds} tiles for {n_folds} folds, got {int(valid.sum())}")
+    rng = np.random.default_rng(seed)
+    fold_of = np.full(len(uniq), -1, dtype=np.int64)
+    fold_of[valid] = rng.permutation(int(valid.sum())) % n_folds
+    return fold_of[inv.ravel()]
+
+
+def holdout_tiles(tile_ids: pd.Series, test_tile_frac: float = 0.25, seed: int = 42) -> set:
+    """The notebook's random tile holdout: same shuffle, so the same tiles for the same seed."""
+    rng = np.random.default_rng(seed)
+    tiles = np.asarray(tile_ids.dropna().unique(), dtype=object)
+    rng.shuffle(tiles)
+    n_test = max(1, int(len(tiles) * test_tile_frac))
+    return set(tiles[:n_test])
+
+
+def spatial_cv(
+    X: np.ndarray,
+    y: np.ndarray,
+    groups: np.ndarray,
+    n_folds: int = 5,
+    C: float = 1.0,
+    seed: int = 42,
+    eval_sets: Optional[Mapping[str, tuple[np.ndarray, np.ndarray]]] = None,
+    top_k_list: Sequence[int] = (1, 2, 5, 10),
+    n_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """Grouped K-fold by spatial tile, one row of metrics per fold.
+
+    Each fold's model is fit on the other folds' tiles and evaluated on its own
+    (``holdout_*`` columns) and on every ``eval_sets`` entry (e.g. the unbiased
+    forest sample, ``<name>_*`` columns). Folds run on a thread pool over the
+    one shared ``X``; numpy/scipy release the GIL in the lbfgs hot loop.
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    folds = group_kfold(groups, n_folds, seed)
+    eval_sets = dict(eval_sets or {})
+
+    def run_fold(k: int) -> dict:
+        test = folds == k
+        train = (folds >= 0) & ~test
+        model = fit_logit(X[train], y[train], C=C)
+        row = {
+            "fold": k,
+            "train_n": int(train.sum()),
+            "test_n": int(test.sum()),
+            "test_tiles": int(len(np.unique(groups[test]))),
+        }
+        row.update(metrics_row(y[test], model.predict_proba(X[test])[:, 1], "holdout", top_k_list))
+        for name, (Xe, ye) in eval_sets.items():
+            row.update(metrics_row(ye, model.predict_proba(Xe)[:, 1], name, top_k_list))
+        return row
+
+    n_workers = min(n_workers or os.cpu_count() or 1, n_folds)
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        rows = list(pool.map(run_fold, range(n_folds)))
+    return pd.DataFrame(rows)
+
+
+def spatial_holdout_metrics(
+    train_df: pd.DataFrame,
+    test_df: pd.DataFrame,
+    feature_cols: Sequence[str] = FEATURE_COLS,
+    tile_km: float = 50.0,
+    test_tile_frac: float = 0.25,
+    seed: int = 42,
+    name: str = "",
+    C: float = 1.0,
+    top_k_list: Sequence[int] = (1, 2, 5, 10),
+):
+    """``spatial_holdout_eval`` returning (model, holdout tiles, metrics dict) instead of printing.
+
+    Metric keys are ``<name>_holdout_*`` / ``<name>_unbiased_*`` (``holdout_*`` / ``unbiased_*`` without a name).
+    """
+    feature_cols = list(feature_cols)
+    tr = add_lonlat_and_tiles(train_df, tile_km=tile_km)
+    tiles = holdout_tiles(tr["tile_id"], test_tile_frac, seed)
+    out = tr["tile_id"].isin(tiles).to_numpy()
+
+    X = tr[feature_cols].to_numpy(np.float32)
+    y = tr["label"].to_numpy(np.int32)
+    model = fit_logit(X[~out], y[~out], C=C)
+
+    prefix = f"{name}_" if name else ""
+    metrics = {"tile_km": tile_km, "n_tiles": int(tr["tile_id"].nunique()), "holdout_tiles": len(tiles)}
+    metrics.update(metrics_row(y[out], model.predict_proba(X[out])[:, 1], f"{prefix}holdout", top_k_list))
+    Xt = test_df[feature_cols].to_numpy(np.float32)
+    yt = test_df["label"].to_numpy(np.int32)
+    metrics.update(metrics_row(yt, model.predict_proba(Xt)[:, 1], f"{prefix}unbiased", top_k_list))
+    return model, tiles, metrics
+
+
+def spatial_holdout_eval(
+    train_df: pd.DataFrame,
+    test_df: pd.DataFrame,
+    feature_cols: Sequence[str] = FEATURE_COLS,
+    tile_km: float = 50.0,
+    test_tile_frac: float = 0.25,
+    seed: int = 42,
+    name: str = "",
+):
+    """The notebook's single random tile holdout: prints both evaluations, returns (model, holdout tiles)."""
+    model, tiles, metrics = spatial_holdout_metrics(
+        train_df, test_df, feature_cols, tile_km=tile_km, test_tile_frac=test_tile_frac, seed=seed, name=name
+    )
+    prefix = f"{name}_" if name else ""
+    print(f"tile_km: {tile_km} unique tiles: {metrics['n_tiles']} holdout tiles: {metrics['holdout_tiles']}")
+    for part, title in (("holdout", "TRAIN-years spatial holdout tiles"), ("unbiased", "UNBIASED (forest-only)")):
+        m = {k[len(prefix) + len(part) + 1 :]: v for k, v in metrics.items() if k.startswith(f"{prefix}{part}_")}
+        print(f"\n=== {name} {title} ===")
+        print(f"n: {m['n']} pos rate: {m['pos_rate']:.4f}")
+        print(f"ROC-AUC: {m['roc_auc']:.4f} PR-AUC: {m['pr_auc']:.4f} LogLoss: {m['logloss']:.4f} Brier: {m['brier']:.4f}")
+    return model, tiles
+
+
+def _load_csv(path: str | Path, years: Optional[list[int]], with_geo: bool):
+    cols = FEATURE_COLS + ["label", "tYear"] + ([".geo"] if with_geo else [])
+    df = pd.read_csv(path, usecols=cols, dtype={c: np.float32 for c in FEATURE_COLS})
+    if years is not None:
+        df = df[df["tYear"].isin(years)]
+    X = df[FEATURE_COLS].to_numpy(np.float32)
+    y = df["label"].to_numpy(np.int32)
+    if not with_geo:
+        return X, y, None
+    return X, y, parse_point_geo(df[".geo"])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Grouped K-fold cross-validation by spatial tile.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--train_csv")
+    src.add_argument("--train_store", help="Sample store ingested from CSVs with a .geo column")
+    u_src = ap.add_mutually_exclusive_group()
+    u_src.add_argument("--unbiased_csv", default=None)
+    u_src.add_argument("--unbiased_store", default=None)
+    ap.add_argument("--train_years", default=None, help="Comma list (default: all years)")
+    ap.add_argument("--tile_km", type=float, default=50.0)
+    ap.add_argument("--folds", type=int, default=5)
+    ap.add_argument("--C", type=float, default=1.0)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--out_csv", default=None)
+    args = ap.parse_args()
+
+    years = [int(x) for x in args.train_years.split(",") if x.strip()] if args.train_years else None
+    if args.train_store:
+        store = SampleStore(args.train_store)
+        X, y = store.load_xy(years, feature_cols=FEATURE_COLS)
+        lon, lat = store.load_lonlat(years)
+    else:
+        X, y, (lon, lat) = _load_csv(args.train_csv, years, with_geo=True)
+
+    eval_sets = {}
+    if args.unbiased_store:
+        eval_sets["unbiased"] = SampleStore(args.unbiased_store).load_xy(feature_cols=FEATURE_COLS)
+    elif args.unbiased_csv:
+        Xu, yu, _ = _load_csv(args.unbiased_csv, None, with_geo=False)
+        eval_sets["unbiased"] = (Xu, yu)
+
+    groups = tile_groups(lon, lat, args.tile_km)
+    table = spatial_cv(
+        X, y, groups, n_folds=args.folds, C=args.C, seed=args.seed, eval_sets=eval_sets, n_workers=args.workers
+    )
+    print(f"tile_km={args.tile_km} tiles={len(np.unique(groups[groups >= 0]))} folds={args.folds}")
+    print(table.to_string(index=False))
+    print("Mean over folds:")
+    print(table.drop(columns=["fold"]).mean().to_string())
+    if args.out_csv:
+        Path(args.out_csv).parent.mkdir(parents=True, exist_ok=True)
+        table.to_csv(args.out_csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from src.modeling.metrics import metrics_row
+from src.modeling.sample_store import SampleStore
+from src.modeling.train_logit import FEATURE_COLS, RunningMoments
+
+
+EMBED_COLS = [c for c in FEATURE_COLS if c.startswith("A")]
+CTX_COLS = ["dist_to_nonforest_m", "dist_to_road_m"]
+
+# the notebook's ablations
+FEATURE_SETS = {
+    "all": FEATURE_COLS,
+    "embeddings": EMBED_COLS,
+    "context": CTX_COLS,
+}
+
+
+@dataclass(frozen=True)
+class Split:
+    train_years: tuple[int, ...]
+    test_year: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        train = "+".join(str(y) for y in self.train_years)
+        return train if self.test_year is None else f"{train}->{self.test_year}"
+
+
+def parse_splits(spec: str) -> list[Split]:
+    """``"2018,2019:2020;2018,2019,2020:2021"`` -> splits (``:test`` optional)."""
+    splits = []
+    for part in spec.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        train, _, test = part.partition(":")
+        years = tuple(int(y) for y in train.split(",") if y.strip())
+        if not years:
+            raise ValueError(f"Split without train years: {part!r}")
+        splits.append(Split(years, int(test) if test.strip() else None))
+    return splits
+
+
+def expanding_splits(years: Sequence[int], min_train: int = 1) -> list[Split]:
+    """Train on every earlier year, test on the next one: (y0)->y1, (y0, y1)->y2, ..."""
+    years = sorted(int(y) for y in years)
+    return [Split(tuple(years[:i]), years[i]) for i in range(min_train, len(years))]
+
+
+@dataclass
+class SweepTask:
+    store: str
+    split: Split
+    feature_set: str
+    feature_cols: list[str]
+    Cs: list[float]
+    eval_store: Optional[str] = None
+    eval_years: Optional[list[int]] = None
+    top_k_list: Sequence[int] = (1, 2, 5, 10)
+    max_iter: int = 5000
+    shared: Optional[str] = None  # directory of the split's standardized train matrix (``share_split``)
+
+
+def _union(column_sets: Sequence[Sequence[str]]) -> list[str]:
+    return list(dict.fromkeys(c for cols in column_sets for c in cols))
+
+
+def share_split(store: SampleStore, split: Split, feature_cols: Sequence[str], out_dir: str | Path) -> Path:
+    """Write the standardized train matrix of ``split`` once, for every worker to memory-map read-only.
+
+    ``<out_dir>/X.npy`` (float32, the columns of ``feature_cols``), ``y.npy``
+    and ``moments.npz`` (raw-space moments, for standardizing eval rows).
+    Standardization is per column, so a worker taking a subset of the columns
+    gets the same values ``load_standardized`` would give it.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    Xs, y, moments = store.load_standardized(split.train_years, feature_cols=feature_cols)
+    np.save(out_dir / "X.npy", Xs)
+    np.save(out_dir / "y.npy", y)
+    np.savez(out_dir / "moments.npz", count=moments.count, mean=moments.mean, m2=moments.m2)
+    (out_dir / "columns.txt").write_text("\n".join(feature_cols) + "\n")
+    return out_dir
+
+
+def _open_shared(shared: str | Path, feature_cols: Sequence[str]) -> tuple[np.ndarray, np.ndarray, RunningMoments]:
+    shared = Path(shared)
+    columns = (shared / "columns.txt").read_text().split()
+    X = np.load(shared / "X.npy", mmap_mode="r")
+    y = np.load(shared / "y.npy", mmap_mode="r")
+    with np.load(shared / "moments.npz") as m:
+        count, mean, m2 = int(m["count"]), m["mean"], m["m2"]
+    if list(feature_cols) == columns:
+        return X, y, RunningMoments(count, mean, m2)  # the shared pages themselves, no private copy
+    idx = [columns.index(c) for c in feature_cols]
+    return np.ascontiguousarray(X[:, idx]), y, RunningMoments(count, mean[idx], m2[idx])
+
+
+def _available_memory() -> Optional[int]:
+    """Free physical memory in bytes, or None where the platform does not report it."""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def run_task(task: SweepTask) -> list[dict]:
+    """Fit the C path of one (split, feature set) and evaluate every C.
+
+    The worker opens the store itself, so only the task description crosses the
+    process boundary. With ``task.shared`` the standardized train matrix is
+    memory-mapped read-only from ``share_split`` (only a column subset of it is
+    copied); otherwise it is projected from the partitions into one float32
+    copy and standardized in place (``SampleStore.load_standardized``). Cs are
+    fitted in ascending order, each lbfgs run warm-started from the previous solution.
+    """
+    store = SampleStore(task.store)
+    if task.shared is not None:
+        Xs, ytr, moments = _open_shared(task.shared, task.feature_cols)
+    else:
+        if store.n_rows(task.split.train_years) == 0:
+            raise ValueError(
+                f"No rows found for train_years={list(task.split.train_years)}. Available years: {store.years}"
+            )
+        Xs, ytr, moments = store.load_standardized(task.split.train_years, feature_cols=task.feature_cols)
+    scaler = moments.to_scaler()
+
+    def standardized(X: np.ndarray) -> np.ndarray:
+        out = np.array(X, dtype=np.float32)  # the memory-mapped rows stay untouched
+        out -= scaler.mean_.astype(np.float32)
+        out /= scaler.scale_.astype(np.float32)
+        return out
+
+    evals = []
+    if task.split.test_year is not None:
+        Xte, yte = store.load_xy([task.split.test_year], feature_cols=task.feature_cols)
+        if len(yte):
+            evals.append(("test", standardized(Xte), yte))
+    if task.eval_store is not None:
+        Xu, yu = SampleStore(task.eval_store).load_xy(task.eval_years, feature_cols=task.feature_cols)
+        evals.append(("unbiased", standardized(Xu), yu))
+
+    clf = LogisticRegression(solver="lbfgs", max_iter=task.max_iter, warm_start=True)
+    rows = []
+    for C in sorted(task.Cs):
+        clf.set_params(C=C)
+        t0 = time.perf_counter()
+        clf.fit(Xs, ytr)
+        row = {
+            "feature_set": task.feature_set,
+            "n_features": len(task.feature_cols),
+            "split": task.split.name,
+            "train_years": ",".join(str(y) for y in task.split.train_years),
+            "test_year": task.split.test_year,
+            "C": float(C),
+            "n_iter": int(clf.n_iter_[0]),
+            "fit_s": time.perf_counter() - t0,
+            "train_n": int(len(ytr)),
+            "train_pos_rate": float(ytr.mean()),
+        }
+        for prefix, X, y in evals:
+            row.update(metrics_row(y, clf.predict_proba(X)[:, 1], prefix, task.top_k_list))
+        rows.append(row)
+    return rows
+
+
+def run_sweep(
+    store: str | Path,
+    Cs: Sequence[float],
+    splits: Optional[Sequence[Split]] = None,
+    feature_sets: Optional[Mapping[str, Sequence[str]]] = None,
+    eval_store: Optional[str | Path] = None,
+    eval_years: Optional[Sequence[int]] = None,
+    top_k_list: Sequence[int] = (1, 2, 5, 10),
+    n_workers: Optional[int] = None,
+    scratch_dir: Optional[str | Path] = None,
+) -> pd.DataFrame:
+    """Grid of C x split x feature set over a sample store, one row per fitted model.
+
+    ``splits`` defaults to ``expanding_splits`` over the store's years and
+    ``feature_sets`` to ``FEATURE_SETS``. Each (split, feature set) is one
+    process-pool task that fits all Cs with warm starts; metric columns are
+    prefixed ``test_`` (the split's test year) and ``unbiased_`` (``eval_store``).
+
+    With several workers each split's train matrix is standardized once, over
+    the union of the feature sets' columns, into a temporary ``.npy`` under
+    ``scratch_dir`` (``share_split``) that the workers memory-map read-only:
+    the full matrix is held once in the page cache, not once per worker. A
+    worker still makes private float32 copies of its feature set's columns when
+    they are a subset, and of its eval rows; ``n_workers`` is capped so those
+    copies fit in the free physical memory.
+    """
+    st = SampleStore(store)
+    splits = list(splits) if splits is not None else expanding_splits(st.years)
+    if not splits:
+        raise ValueError(f"No splits to run (store years: {st.years})")
+    feature_sets = dict(feature_sets) if feature_sets is not None else dict(FEATURE_SETS)
+    if not Cs:
+        raise ValueError("Need at least one C")
+
+    tasks = [
+        SweepTask(
+            store=str(store),
+            split=split,
+            feature_set=name,
+            feature_cols=list(cols),
+            Cs=[float(c) for c in Cs],
+            eval_store=None if eval_store is None else str(eval_store),
+            eval_years=None if eval_years is None else [int(y) for y in eval_years],
+            top_k_list=tuple(top_k_list),
+        )
+        for split in splits
+        for name, cols in feature_sets.items()
+    ]
+
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tasks))
+    union = _union(list(feature_sets.values()))
+    free = _available_memory()
+    if n_workers > 1 and free is not None:
+        n_eval = 0 if eval_store is None else SampleStore(eval_store).n_rows(eval_years)
+
+        def private_bytes(t: SweepTask) -> int:
+            n_train = 0 if t.feature_cols == union else st.n_rows(t.split.train_years)
+            n_test = 0 if t.split.test_year is None else st.n_rows([t.split.test_year])
+            return 4 * len(t.feature_cols) * (n_train + n_test + n_eval)
+
+        n_workers = max(1, min(n_workers, free // max(max(private_bytes(t) for t in tasks), 1)))
+    if n_workers == 1:
+        results = [run_task(t) for t in tasks]
+    else:
+        with tempfile.TemporaryDirectory(prefix="sweep_", dir=scratch_dir) as tmp:
+            for i, split in enumerate(splits):
+                if st.n_rows(split.train_years) == 0:
+                    raise ValueError(
+                        f"No rows found for train_years={list(split.train_years)}. Available years: {st.years}"
+                    )
+                shared = str(share_split(st, split, union, Path(tmp) / f"split{i}"))
+                for t in tasks:
+                    if t.split == split:
+                        t.shared = shared
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                results = list(pool.map(run_task, tasks))
+    return pd.DataFrame([row for rows in results for row in rows])
+
+
+def best_by(table: pd.DataFrame, metric: str = "test_pr_auc", group=("feature_set",)) -> pd.DataFrame:
+    """Best C per group by the mean of ``metric`` across splits (higher is better)."""
+    group = list(group)
+    mean = table.groupby(group + ["C"], as_index=False)[metric].mean()
+    return mean.loc[mean.groupby(group)[metric].idxmax()].reset_index(drop=True)
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
 import numpy as np
 import pandas as pd
+from scipy.optimize import minimize
+from scipy.special import expit
 
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
+from sklearn.svm import l1_min_c
+
+from src.profiling import span
 
 
 FEATURE_COLS = [f"A{i:02d}" for i in range(64)] + ["dist_to_nonforest_m", "dist_to_road_m"]
@@ -18,6 +24,7 @@ class TrainResult:
     model: Pipeline
     w_raw: np.ndarray
     b_raw: float
+    feature_cols: list[str] = field(default_factory=lambda: list(FEATURE_COLS))  # bands w_raw applies to
 
 
 def load_xy(df: pd.DataFrame, feature_cols=FEATURE_COLS):
@@ -33,10 +40,170 @@ def fit_logit(Xtr, ytr, C: float = 1.0, max_iter: int = 5000) -> Pipeline:
             ("clf", LogisticRegression(solver="lbfgs", max_iter=max_iter, C=C)),
         ]
     )
-    model.fit(Xtr, ytr)
+    # same as model.fit, step by step so each stage shows up in profiles
+    with span("scale", rows=len(ytr)):
+        Xs = model.named_steps["scaler"].fit_transform(Xtr)
+    with span("lbfgs", rows=len(ytr), C=C) as sp:
+        model.named_steps["clf"].fit(Xs, ytr)
+        sp.set(n_iter=int(model.named_steps["clf"].n_iter_[0]))
     return model
 
 
+@dataclass
+class RunningMoments:
+    """Per-feature count / mean / M2, updated chunk by chunk (Welford, Chan et al. merge)."""
+
+    count: int = 0
+    mean: Optional[np.ndarray] = None
+    m2: Optional[np.ndarray] = None
+
+    def update(self, X) -> "RunningMoments":
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) == 0:
+            return self
+        mean = X.mean(axis=0)
+        m2 = ((X - mean) ** 2).sum(axis=0)
+        return self.merge(RunningMoments(len(X), mean, m2))
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean.copy(), other.m2.copy()
+            return self
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / n)
+        self.m2 = self.m2 + other.m2 + delta**2 * (self.count * other.count / n)
+        self.count = n
+        return self
+
+    @property
+    def var(self) -> np.ndarray:
+        return self.m2 / self.count
+
+    def to_scaler(self) -> StandardScaler:
+        """A fitted StandardScaler equivalent to ``StandardScaler().fit`` on all rows seen."""
+        scale = np.sqrt(self.var)
+        scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+        scaler = StandardScaler()
+        scaler.mean_ = self.mean.copy()
+        scaler.var_ = self.var.copy()
+        scaler.scale_ = scale
+        scaler.n_samples_seen_ = self.count
+        scaler.n_features_in_ = len(self.mean)
+        return scaler
+
+
+def fit_logit_streaming(
+    chunks: Callable[[], Iterable[tuple[np.ndarray, np.ndarray]]],
+    C: float = 1.0,
+    max_iter: int = 5000,
+    tol: float = 1e-8,
+) -> Pipeline:
+    """Out-of-core equivalent of ``fit_logit``.
+
+    ``chunks`` is called once per pass and must yield (X, y) row blocks. One pass
+    computes the scaler statistics (and checks both labels occur, before any
+    costly pass); every L-BFGS evaluation is then one more pass
+    accumulating the full-batch loss and gradient of the same objective sklearn
+    minimizes (``C * sum(logloss) + ||w||^2 / 2`` in scaled space), so memory is
+    bounded by the chunk size. Returns a Pipeline usable with ``raw_space_weights``.
+    """
+    moments = RunningMoments()
+    seen: set = set()
+    with span("moments_pass") as sp:
+        for X, y in chunks():
+            moments.update(X)
+            seen.update(np.unique(np.asarray(y)).tolist())
+        sp.set(rows=moments.count)
+    if moments.count == 0:
+        raise ValueError("No rows to train on")
+    if seen != {0, 1}:
+        raise ValueError(f"Need both classes (0/1) in labels, got {sorted(seen)}")
+    scaler = moments.to_scaler()
+    mean, scale = scaler.mean_, scaler.scale_
+    n, d = moments.count, len(mean)
+
+    def loss_grad(theta: np.ndarray) -> tuple[float, np.ndarray]:
+        w, b = theta[:d], theta[d]
+        loss = 0.0
+        grad = np.zeros(d + 1)
+        for X, y in chunks():
+            Xs = (np.asarray(X, dtype=np.float64) - mean) / scale
+            y = np.asarray(y, dtype=np.float64)
+            z = Xs @ w + b
+            loss += float(np.sum(np.logaddexp(0.0, z) - y * z))
+            r = expit(z) - y
+            grad[:d] += Xs.T @ r
+            grad[d] += r.sum()
+        # divide by n*C so the tolerance does not depend on the row count
+        loss = loss / n + 0.5 * float(w @ w) / (C * n)
+        grad /= n
+        grad[:d] += w / (C * n)
+        return loss, grad
+
+    with span("lbfgs_streaming", rows=n, C=C) as sp:
+        opt = minimize(
+            loss_grad,
+            np.zeros(d + 1),
+            jac=True,
+            method="L-BFGS-B",
+            options={"maxiter": max_iter, "gtol": tol, "ftol": 64 * np.finfo(float).eps},
+        )
+        sp.set(n_iter=int(opt.nit), passes=int(opt.nfev))
+
+    clf = LogisticRegression(solver="lbfgs", max_iter=max_iter, C=C)
+    clf.classes_ = np.array([0, 1])
+    clf.coef_ = opt.x[:d].reshape(1, -1)
+    clf.intercept_ = opt.x[d:].copy()
+    clf.n_features_in_ = d
+    clf.n_iter_ = np.array([opt.nit], dtype=np.int32)
+    return Pipeline([("scaler", scaler), ("clf", clf)])
+
+
+def standardize_inplace(X: np.ndarray, block_rows: int = 32_768) -> RunningMoments:
+    """Scale a writable float32 matrix to zero mean / unit variance in place; returns its moments.
+
+    Statistics are accumulated in float64 one row block at a time, so the only
+    extra memory is one float64 block, never a second copy of ``X``.
+    """
+    moments = RunningMoments()
+    for i in range(0, len(X), block_rows):
+        moments.update(X[i : i + block_rows])
+    scaler = moments.to_scaler()
+    mean = scaler.mean_.astype(X.dtype)
+    scale = scaler.scale_.astype(X.dtype)
+    for i in range(0, len(X), block_rows):
+        block = X[i : i + block_rows]
+        block -= mean
+        block /= scale
+    return moments
+
+
+def fit_logit_inplace(X: np.ndarray, y, C: float = 1.0, max_iter: int = 5000) -> Pipeline:
+    """``fit_logit`` that standardizes ``X`` in place and hands it to lbfgs as is.
+
+    ``X`` must be a writable, C-contiguous float32 matrix and is left
+    standardized. The returned Pipeline carries the equivalent fitted
+    StandardScaler, so it scores raw features exactly like ``fit_logit``.
+    """
+    if X.dtype != np.float32 or not X.flags.c_contiguous or not X.flags.writeable:
+        raise ValueError("fit_logit_inplace needs a writable C-contiguous float32 matrix")
+    with span("standardize_inplace", rows=len(X)):
+        moments = standardize_inplace(X)
+    return fit_logit_standardized(X, y, moments, C=C, max_iter=max_iter)
+
+
+def fit_logit_standardized(X: np.ndarray, y, moments: RunningMoments, C: float = 1.0, max_iter: int = 5000) -> Pipeline:
+    """lbfgs on rows already standardized with ``moments`` (their raw-space statistics)."""
+    clf = LogisticRegression(solver="lbfgs", max_iter=max_iter, C=C)
+    with span("lbfgs", rows=len(X), C=C) as sp:
+        clf.fit(X, y)
+        sp.set(n_iter=int(clf.n_iter_[0]))
+    return Pipeline([("scaler", moments.to_scaler()), ("clf", clf)])
+
+
 def raw_space_weights(model: Pipeline) -> tuple[np.ndarray, float]:
     """Convert (scaled-space) weights to raw feature space for Earth Engine."""
     scaler = model.named_steps["scaler"]
@@ -50,13 +217,118 @@ def raw_space_weights(model: Pipeline) -> tuple[np.ndarray, float]:
     return w_raw, b_raw
 
 
+def _penalized_logit(C: float, l1_ratio: float, max_iter: int) -> LogisticRegression:
+    kwargs = dict(solver="saga", C=C, l1_ratio=l1_ratio, max_iter=max_iter, tol=1e-4, warm_start=True)
+    if LogisticRegression().get_params()["penalty"] != "deprecated":  # sklearn < 1.8
+        kwargs["penalty"] = "elasticnet"
+    return LogisticRegression(**kwargs)
+
+
+def l1_path(
+    Xs: np.ndarray,
+    y: np.ndarray,
+    l1_ratio: float = 1.0,
+    n_Cs: int = 30,
+    max_features: Optional[int] = None,
+    max_iter: int = 2000,
+) -> list[tuple[float, np.ndarray]]:
+    """(C, active feature indices) along an L1 / elastic-net path on standardized ``Xs``.
+
+    Cs grow geometrically from the smallest C with any nonzero weight, each
+    saga fit warm-started from the previous one; the walk stops once more than
+    ``max_features`` bands are active, and the last grid step is then bisected
+    (in log C) towards the largest support within the budget.
+    """
+    c0 = l1_min_c(Xs, y, loss="log") / max(l1_ratio, 1e-3)
+    clf = _penalized_logit(c0, l1_ratio, max_iter)
+    path = []
+    for C in c0 * np.logspace(0, 4, n_Cs):
+        clf.set_params(C=float(C))
+        clf.fit(Xs, y)
+        active = np.flatnonzero(clf.coef_.ravel())
+        path.append((float(C), active))
+        if max_features is not None and len(active) > max_features:
+            break
+    else:
+        return path
+
+    if len(path) > 1:
+        lo, hi = path[-2][0], path[-1][0]
+        for _ in range(8):
+            mid = float(np.sqrt(lo * hi))
+            clf.set_params(C=mid)
+            clf.fit(Xs, y)
+            active = np.flatnonzero(clf.coef_.ravel())
+            path.append((mid, active))
+            if len(active) == max_features:
+                break
+            lo, hi = (mid, hi) if len(active) < max_features else (lo, mid)
+    return sorted(path, key=lambda p: p[0])
+
+
+def select_features(
+    Xtr,
+    ytr,
+    C: float = 1.0,
+    l1_ratio: float = 1.0,
+    max_features: Optional[int] = None,
+    max_iter: int = 2000,
+) -> np.ndarray:
+    """Column indices kept by an L1 / elastic-net logistic fit (on standardized features).
+
+    Without ``max_features`` this is the support of the penalized fit at ``C``.
+    With it, the largest support of at most ``max_features`` bands on the
+    regularization path (``l1_path``) is kept.
+    """
+    Xs = StandardScaler().fit_transform(Xtr)
+    if max_features is None:
+        with span("l1_fit", rows=len(ytr), C=C):
+            clf = _penalized_logit(C, l1_ratio, max_iter).fit(Xs, ytr)
+        active = np.flatnonzero(clf.coef_.ravel())
+    else:
+        if max_features < 1:
+            raise ValueError(f"max_features must be >= 1, got {max_features}")
+        with span("l1_path", rows=len(ytr), max_features=max_features) as sp:
+            path = l1_path(Xs, ytr, l1_ratio, max_features=max_features, max_iter=max_iter)
+            sp.set(n_Cs=len(path))
+        fits = [a for _, a in path if len(a) <= max_features]
+        active = fits[-1] if fits else np.empty(0, dtype=np.int64)
+    if len(active) == 0:
+        raise ValueError("The L1 fit kept no features; increase C or max_features")
+    return active
+
+
+def _fit_result(
+    Xtr,
+    ytr,
+    C: float,
+    feature_cols=FEATURE_COLS,
+    l1_ratio: Optional[float] = None,
+    max_features: Optional[int] = None,
+) -> TrainResult:
+    """Fit on all ``feature_cols``, or, with ``l1_ratio`` / ``max_features``, on the bands an
+    L1 / elastic-net fit keeps (refit with the usual L2 objective at ``C``)."""
+    feature_cols = list(feature_cols)
+    if l1_ratio is not None or max_features is not None:
+        active = select_features(Xtr, ytr, C, 1.0 if l1_ratio is None else l1_ratio, max_features)
+        Xtr = Xtr[:, active]
+        feature_cols = [feature_cols[i] for i in active]
+    model = fit_logit(Xtr, ytr, C=C)
+    w_raw, b_raw = raw_space_weights(model)
+    return TrainResult(model=model, w_raw=w_raw, b_raw=b_raw, feature_cols=feature_cols)
+
+
 def train_from_csv(
     train_csv: str | Path,
     train_years: list[int],
     test_year: int | None = None,
     C: float = 1.0,
+    l1_ratio: Optional[float] = None,
+    max_features: Optional[int] = None,
 ) -> tuple[TrainResult, dict]:
-    df = pd.read_csv(train_csv)
+    with span("read_csv") as sp:
+        df = pd.read_csv(train_csv)
+        sp.set(rows=len(df))
 
     # sanity checks
     missing = [c for c in FEATURE_COLS if c not in df.columns]
@@ -65,19 +337,344 @@ def train_from_csv(
     if "tYear" not in df.columns or "label" not in df.columns:
         raise ValueError("Train CSV must have columns: tYear, label")
 
-    train_df = df[df["tYear"].isin(train_years)].copy()
+    with span("filter_years") as sp:
+        train_df = df[df["tYear"].isin(train_years)].copy()
+        sp.set(rows=len(train_df))
     if len(train_df) == 0:
         raise ValueError(f"No rows found for train_years={train_years}. Available years: {sorted(df['tYear'].unique())}")
 
-    Xtr, ytr = load_xy(train_df)
-    model = fit_logit(Xtr, ytr, C=C)
+    with span("load_xy", rows=len(train_df)):
+        Xtr, ytr = load_xy(train_df)
+    res = _fit_result(Xtr, ytr, C, l1_ratio=l1_ratio, max_features=max_features)
+
+    info = {"train_n": int(len(ytr)), "train_pos_rate": float(ytr.mean())}
+    if test_year is not None:
+        test_df = df[df["tYear"].eq(test_year)].copy()
+        info["test_n"] = int(len(test_df))
+        info["test_year"] = int(test_year)
+    return res, info
+
+
+def iter_csv_chunks(
+    csv_path: str | Path,
+    years: Optional[list[int]] = None,
+    feature_cols=FEATURE_COLS,
+    chunk_rows: int = 200_000,
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Yield float32 (X, y) blocks of a CSV, parsing only the needed columns."""
+    cols = list(feature_cols) + ["label", "tYear"]
+    dtypes = {c: np.float32 for c in feature_cols}
+    for chunk in pd.read_csv(csv_path, usecols=cols, dtype=dtypes, chunksize=chunk_rows):
+        if years is not None:
+            chunk = chunk[chunk["tYear"].isin(years)]
+        if len(chunk):
+            yield load_xy(chunk, feature_cols)
+
+
+def train_streaming(
+    source: str | Path,
+    train_years: list[int],
+    test_year: int | None = None,
+    C: float = 1.0,
+    chunk_rows: int = 200_000,
+) -> tuple[TrainResult, dict]:
+    """Out-of-core training from a CSV or a sample store directory (bounded memory)."""
+    source = Path(source)
+    if source.is_dir():
+        from src.modeling.sample_store import SampleStore
+
+        store = SampleStore(source)
+        if store.n_rows(train_years) == 0:
+            raise ValueError(f"No rows found for train_years={train_years}. Available years: {store.years}")
+
+        def chunks():
+            return store.iter_chunks(train_years, chunk_rows=chunk_rows, feature_cols=FEATURE_COLS)
+
+        def count_year(year: int) -> int:
+            return store.n_rows([year])
+
+    else:
+        header = pd.read_csv(source, nrows=0).columns
+        missing = [c for c in FEATURE_COLS if c not in header]
+        if missing:
+            raise ValueError(f"Missing feature cols in train CSV: {missing[:5]} ... ({len(missing)} missing)")
+        if "tYear" not in header or "label" not in header:
+            raise ValueError("Train CSV must have columns: tYear, label")
+
+        def chunks():
+            return iter_csv_chunks(source, train_years, chunk_rows=chunk_rows)
+
+        def count_year(year: int) -> int:
+            return sum(
+                int(c["tYear"].eq(year).sum()) for c in pd.read_csv(source, usecols=["tYear"], chunksize=chunk_rows)
+            )
+
+    n = 0
+    n_pos = 0
+    for _, y in chunks():
+        n += len(y)
+        n_pos += int(y.sum())
+    if n == 0:
+        raise ValueError(f"No rows found for train_years={train_years}")
 
+    model = fit_logit_streaming(chunks, C=C)
     w_raw, b_raw = raw_space_weights(model)
     res = TrainResult(model=model, w_raw=w_raw, b_raw=b_raw)
 
+    info = {"train_n": n, "train_pos_rate": n_pos / n}
+    if test_year is not None:
+        info["test_n"] = count_year(test_year)
+        info["test_year"] = int(test_year)
+    return res, info
+
+
+def state_path_for(weights_json: str | Path) -> Path:
+    """Training state file kept next to a weights JSON: ``models/w.json`` -> ``models/w.state.npz``."""
+    weights_json = Path(weights_json)
+    return weights_json.with_name(weights_json.stem + ".state.npz")
+
+
+@dataclass
+class TrainState:
+    """What an incremental refit needs from the previous run.
+
+    ``moments`` are the scaler's sufficient statistics over all training rows so
+    far; ``w_raw``/``b_raw`` the previous solution in raw feature space (which,
+    unlike the scaled coefficients, does not move when the scaler is updated).
+    """
+
+    moments: RunningMoments
+    w_raw: np.ndarray
+    b_raw: float
+    C: float
+    years: list[int]
+    feature_cols: list[str]
+
+    @classmethod
+    def from_result(cls, res: TrainResult, years, C: float, feature_cols=FEATURE_COLS) -> "TrainState":
+        scaler = res.model.named_steps["scaler"]
+        n = int(np.asarray(scaler.n_samples_seen_).max())
+        moments = RunningMoments(n, scaler.mean_.astype(np.float64), scaler.var_.astype(np.float64) * n)
+        return cls(moments, np.asarray(res.w_raw, np.float64), float(res.b_raw), float(C), sorted(int(y) for y in years), list(feature_cols))
+
+    def save(self, path: str | Path) -> None:
+        np.savez(
+            path,
+            count=self.moments.count,
+            mean=self.moments.mean,
+            m2=self.moments.m2,
+            w_raw=self.w_raw,
+            b_raw=self.b_raw,
+            C=self.C,
+            years=np.asarray(self.years, dtype=np.int64),
+            feature_cols=np.asarray(self.feature_cols),
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "TrainState":
+        with np.load(path) as z:
+            moments = RunningMoments(int(z["count"]), z["mean"].copy(), z["m2"].copy())
+            return cls(moments, z["w_raw"].copy(), float(z["b_raw"]), float(z["C"]), z["years"].tolist(), z["feature_cols"].tolist())
+
+
+def fit_logit_warm(
+    Xtr,
+    ytr,
+    moments: RunningMoments,
+    w_raw: np.ndarray,
+    b_raw: float,
+    C: float = 1.0,
+    max_iter: int = 5000,
+) -> Pipeline:
+    """``fit_logit`` with a given scaler (from ``moments``) and lbfgs started at a previous raw-space solution.
+
+    The raw solution is mapped into the new scaled space (w * scale, b + w . mean),
+    so the start point is the old model exactly and lbfgs only has to account
+    for what the new rows changed.
+    """
+    scaler = moments.to_scaler()
+    with span("scale", rows=len(ytr)):
+        Xs = scaler.transform(Xtr)
+    clf = LogisticRegression(solver="lbfgs", max_iter=max_iter, C=C, warm_start=True)
+    clf.coef_ = (np.asarray(w_raw, np.float64) * scaler.scale_).reshape(1, -1)
+    clf.intercept_ = np.array([float(b_raw) + float(np.dot(w_raw, scaler.mean_))])
+    with span("lbfgs_warm", rows=len(ytr), C=C) as sp:
+        clf.fit(Xs, ytr)
+        sp.set(n_iter=int(clf.n_iter_[0]))
+    return Pipeline([("scaler", scaler), ("clf", clf)])
+
+
+def train_incremental(
+    store_path: str | Path,
+    state: TrainState,
+    new_years: list[int],
+    test_year: int | None = None,
+    C: float | None = None,
+) -> tuple[TrainResult, dict, TrainState]:
+    """Refit after adding ``new_years`` to the training set, reusing ``state`` from the last run.
+
+    Only the new partitions are scanned for scaler statistics (merged into the
+    stored moments); the fit runs over all years from the memory-mapped store,
+    warm-started from the previous weights, so it needs a few lbfgs iterations
+    instead of a cold solve. Returns the new result, info and the state to save.
+    """
+    from src.modeling.sample_store import SampleStore
+
+    store = SampleStore(store_path)
+    new_years = [int(y) for y in new_years if int(y) not in state.years]
+    if not new_years:
+        raise ValueError(f"No new years to add; state already has {state.years}")
+    if store.n_rows(new_years) == 0:
+        raise ValueError(f"No rows found for new_years={new_years}. Available years: {store.years}")
+    if store.n_rows(state.years) != state.moments.count:
+        raise ValueError(
+            f"State covers {state.moments.count} rows of {state.years} but the store has "
+            f"{store.n_rows(state.years)}; retrain from scratch"
+        )
+    C = state.C if C is None else float(C)
+    years = sorted(state.years + new_years)
+
+    moments = RunningMoments(state.moments.count, state.moments.mean.copy(), state.moments.m2.copy())
+    with span("moments_new_years", years=new_years):
+        for X, _ in store.iter_chunks(new_years, feature_cols=state.feature_cols):
+            moments.update(X)
+
+    with span("load_store", years=years) as sp:
+        Xtr, ytr = store.load_xy(years, feature_cols=state.feature_cols)
+        sp.set(rows=len(ytr))
+    model = fit_logit_warm(Xtr, ytr, moments, state.w_raw, state.b_raw, C=C)
+    w_raw, b_raw = raw_space_weights(model)
+    res = TrainResult(model=model, w_raw=w_raw, b_raw=b_raw, feature_cols=list(state.feature_cols))
+
+    info = {
+        "train_n": int(len(ytr)),
+        "train_pos_rate": float(ytr.mean()),
+        "train_years": years,
+        "n_iter": int(model.named_steps["clf"].n_iter_[0]),
+    }
+    if test_year is not None:
+        info["test_n"] = store.n_rows([test_year])
+        info["test_year"] = int(test_year)
+    return res, info, TrainState(moments, w_raw, b_raw, C, years, list(state.feature_cols))
+
+
+def read_csv_matrix(
+    csv_path: str | Path,
+    years: Optional[list[int]] = None,
+    feature_cols=FEATURE_COLS,
+    chunk_rows: int = 200_000,
+) -> tuple[np.ndarray, np.ndarray, dict[int, int]]:
+    """(X float32, y int32) of the selected years in one contiguous matrix, from a single parse.
+
+    Rows are parsed ``chunk_rows`` at a time as float32 (no float64 DataFrame,
+    no filtered copy), then moved into the output one chunk at a time, each
+    chunk freed right after its copy. The output's pages are only committed as
+    they are written, so the peak stays near the matrix plus one chunk. Also
+    returns the row count of every tYear in the file.
+    """
+    cols = list(feature_cols) + ["label", "tYear"]
+    dtypes = {c: np.float32 for c in feature_cols}
+    year_counts: dict[int, int] = {}
+    chunks = []
+    for chunk in pd.read_csv(csv_path, usecols=cols, dtype=dtypes, chunksize=chunk_rows):
+        for year, count in chunk["tYear"].value_counts().items():
+            year_counts[int(year)] = year_counts.get(int(year), 0) + int(count)
+        if years is not None:
+            chunk = chunk[chunk["tYear"].isin(years)]
+        if len(chunk):
+            chunks.append(load_xy(chunk, feature_cols))
+        del chunk
+
+    n = sum(len(yc) for _, yc in chunks)
+    X = np.empty((n, len(feature_cols)), dtype=np.float32)
+    y = np.empty(n, dtype=np.int32)
+    i = 0
+    chunks.reverse()
+    while chunks:
+        Xc, yc = chunks.pop()
+        X[i : i + len(yc)] = Xc
+        y[i : i + len(yc)] = yc
+        i += len(yc)
+        del Xc, yc
+    return X, y, year_counts
+
+
+def train_lean(
+    source: str | Path,
+    train_years: list[int],
+    test_year: int | None = None,
+    C: float = 1.0,
+    chunk_rows: int = 200_000,
+) -> tuple[TrainResult, dict]:
+    """Same model as ``train_from_csv``/``train_from_store`` with one float32 copy of the train rows.
+
+    ``source`` is a CSV or a sample store directory. The rows are gathered into
+    a single contiguous float32 matrix, standardized in place and fitted
+    directly (``fit_logit_inplace``): peak memory is about n x 66 x 4 bytes
+    instead of several times that.
+    """
+    source = Path(source)
+    if source.is_dir():
+        from src.modeling.sample_store import SampleStore
+
+        store = SampleStore(source)
+        if store.n_rows(train_years) == 0:
+            raise ValueError(f"No rows found for train_years={train_years}. Available years: {store.years}")
+        with span("load_standardized", years=train_years, quantized=store.quantizer is not None) as sp:
+            Xtr, ytr, moments = store.load_standardized(train_years, feature_cols=FEATURE_COLS)
+            sp.set(rows=len(ytr))
+        test_n = store.n_rows([test_year]) if test_year is not None else None
+    else:
+        header = pd.read_csv(source, nrows=0).columns
+        missing = [c for c in FEATURE_COLS if c not in header]
+        if missing:
+            raise ValueError(f"Missing feature cols in train CSV: {missing[:5]} ... ({len(missing)} missing)")
+        if "tYear" not in header or "label" not in header:
+            raise ValueError("Train CSV must have columns: tYear, label")
+        with span("read_csv_matrix") as sp:
+            Xtr, ytr, year_counts = read_csv_matrix(source, train_years, chunk_rows=chunk_rows)
+            sp.set(rows=len(ytr))
+        if len(ytr) == 0:
+            raise ValueError(f"No rows found for train_years={train_years}. Available years: {sorted(year_counts)}")
+        test_n = year_counts.get(test_year, 0) if test_year is not None else None
+
+    info = {"train_n": int(len(ytr)), "train_pos_rate": float(ytr.mean())}
+    if source.is_dir():
+        model = fit_logit_standardized(Xtr, ytr, moments, C=C)
+    else:
+        model = fit_logit_inplace(Xtr, ytr, C=C)
+    del Xtr
+    w_raw, b_raw = raw_space_weights(model)
+    res = TrainResult(model=model, w_raw=w_raw, b_raw=b_raw)
+
+    if test_year is not None:
+        info["test_n"] = int(test_n)
+        info["test_year"] = int(test_year)
+    return res, info
+
+
+def train_from_store(
+    store_path: str | Path,
+    train_years: list[int],
+    test_year: int | None = None,
+    C: float = 1.0,
+    l1_ratio: Optional[float] = None,
+    max_features: Optional[int] = None,
+) -> tuple[TrainResult, dict]:
+    """Same as ``train_from_csv`` but reads only the train-year partitions of a sample store."""
+    from src.modeling.sample_store import SampleStore
+
+    store = SampleStore(store_path)
+    if store.n_rows(train_years) == 0:
+        raise ValueError(f"No rows found for train_years={train_years}. Available years: {store.years}")
+
+    with span("load_store", years=train_years) as sp:
+        Xtr, ytr = store.load_xy(train_years, feature_cols=FEATURE_COLS)
+        sp.set(rows=len(ytr))
+    res = _fit_result(Xtr, ytr, C, l1_ratio=l1_ratio, max_features=max_features)
+
     info = {"train_n": int(len(ytr)), "train_pos_rate": float(ytr.mean())}
     if test_year is not None:
-        test_df = df[df["tYear"].eq(test_year)].copy()
-        info["test_n"] = int(len(test_df))
+        info["test_n"] = store.n_rows([test_year])
         info["test_year"] = int(test_year)
     return res, info
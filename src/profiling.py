@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Process peak resident set size so far (MB), or None where unavailable."""
+    if resource is None:
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024 / (1024 if sys.platform == "darwin" else 1)  # macOS reports bytes
+
+
+class Span:
+    """Handle for an open span; attach row counts, iteration counts, etc. with ``set``."""
+
+    __slots__ = ("name", "args")
+
+    def __init__(self, name: str, args: dict) -> None:
+        self.name = name
+        self.args = args
+
+    def set(self, **args: Any) -> "Span":
+        self.args.update(args)
+        return self
+
+
+class _NullSpan(Span):
+    def set(self, **args: Any) -> "Span":
+        return self
+
+
+_NULL_SPAN = _NullSpan("", {})
+
+
+class Profiler:
+    """Records nested timing spans: wall time, process CPU time and peak RSS per stage.
+
+    ``save`` writes Chrome trace format (load it in chrome://tracing or
+    https://ui.perfetto.dev); ``summary`` prints a per-stage table.
+    """
+
+    def __init__(self) -> None:
+        self.t0 = time.perf_counter()
+        self.events: list[dict] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> list[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[Span]:
+        sp = Span(name, dict(args))
+        stack = self._stack()
+        depth = len(stack)
+        stack.append(name)
+        path = "/".join(stack)
+        start = time.perf_counter()
+        cpu0 = time.process_time()
+        try:
+            yield sp
+        finally:
+            stack.pop()
+            end = time.perf_counter()
+            event = {
+                "name": name,
+                "path": path,
+                "ts": (start - self.t0) * 1e6,
+                "dur": (end - start) * 1e6,
+                "tid": threading.get_ident(),
+                "depth": depth,
+                "cpu_s": time.process_time() - cpu0,
+                "peak_rss_mb": peak_rss_mb(),
+                "args": sp.args,
+            }
+            with self._lock:
+                self.events.append(event)
+
+    def to_chrome_trace(self) -> dict:
+        pid = os.getpid()
+        trace = []
+        for e in sorted(self.events, key=lambda e: e["ts"]):
+            args = {"cpu_s": round(e["cpu_s"], 6), **e["args"]}
+            if e["peak_rss_mb"] is not None:
+                args["peak_rss_mb"] = round(e["peak_rss_mb"], 1)
+            trace.append({"name": e["name"], "ph": "X", "ts": e["ts"], "dur": e["dur"], "pid": pid, "tid": e["tid"], "args": args})
+            if e["peak_rss_mb"] is not None:
+                trace.append(
+                    {"name": "peak_rss_mb", "ph": "C", "ts": e["ts"] + e["dur"], "pid": pid, "args": {"value": round(e["peak_rss_mb"], 1)}}
+                )
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_chrome_trace(), default=str) + "\n")
+
+    def summary(self) -> str:
+        """Per-stage table; repeated stages (same nesting path) are summed into one row."""
+        rows: dict[str, dict] = {}
+        for e in sorted(self.events, key=lambda e: e["ts"]):
+            row = rows.setdefault(e["path"], {"event": e, "calls": 0, "dur": 0.0, "cpu_s": 0.0})
+            row["calls"] += 1
+            row["dur"] += e["dur"]
+            row["cpu_s"] += e["cpu_s"]
+            row["peak_rss_mb"] = e["peak_rss_mb"]  # non-decreasing, so the last is the max
+        lines = [f"{'stage':<40} {'calls':>6} {'wall s':>9} {'cpu s':>9} {'peak MB':>9}  details"]
+        for row in rows.values():
+            e = row["event"]
+            name = "  " * e["depth"] + e["name"]
+            rss = "" if row["peak_rss_mb"] is None else f"{row['peak_rss_mb']:.0f}"
+            details = " ".join(f"{k}={v}" for k, v in e["args"].items()) if row["calls"] == 1 else ""
+            lines.append(f"{name:<40} {row['calls']:>6} {row['dur'] / 1e6:9.3f} {row['cpu_s']:9.3f} {rss:>9}  {details}")
+        return "\n".join(lines)
+
+
+_active: Optional[Profiler] = None
+
+
+def enable() -> Profiler:
+    """Start recording spans process-wide; returns the active profiler."""
+    global _active
+    _active = Profiler()
+    return _active
+
+
+def disable() -> Optional[Profiler]:
+    """Stop recording; returns the profiler that was active."""
+    global _active
+    prof, _active = _active, None
+    return prof
+
+
+def active() -> Optional[Profiler]:
+    return _active
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[Span]:
+    """Time a stage under the active profiler; a no-op when profiling is off."""
+    prof = _active
+    if prof is None:
+        yield _NULL_SPAN
+        return
+    with prof.span(name, **args) as sp:
+        yield sp
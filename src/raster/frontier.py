@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+from scipy.ndimage import distance_transform_edt
+
+from src.raster.io import RasterWriter, open_stack
+
+
+FRONTIER_BANDS = ["dist_to_nonforest_m", "dist_to_road_m"]
+FOREST_CLASSES = (1, 2, 3, 4, 5)  # strict IGBP forest, as in is_forest_igbp
+LC_CLASSES = range(1, 18)  # valid MODIS LC_Type1 values; anything else (255 fill) is nodata
+
+# EE fastDistanceTransform(256) only looks 256 px out; beyond that the distance is unknown
+NF_NEIGHBORHOOD_PX = 256
+
+
+@dataclass(frozen=True)
+class GridTransform:
+    """North-up pixel grid in a projected CRS: (x0, y0) is the top-left corner, ``pixel_m`` the pixel size."""
+
+    x0: float
+    y0: float
+    pixel_m: float
+
+    def to_pixel(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Fractional (row, col) of projected coordinates."""
+        return (self.y0 - y) / self.pixel_m, (x - self.x0) / self.pixel_m
+
+
+def load_road_segments(path: str | Path) -> np.ndarray:
+    """(n, 4) float64 [x0, y0, x1, y1] segments from a GeoJSON of (Multi)LineStrings.
+
+    Coordinates must already be in the raster's projected CRS (metres), e.g.
+    GRIP4 reprojected with ``ogr2ogr -t_srs``.
+    """
+    data = json.loads(Path(path).read_text())
+    feats = data.get("features", [data])
+    parts: list[np.ndarray] = []
+    for f in feats:
+        geom = f.get("geometry", f)
+        if geom is None:
+            continue
+        if geom["type"] == "LineString":
+            lines = [geom["coordinates"]]
+        elif geom["type"] == "MultiLineString":
+            lines = geom["coordinates"]
+        else:
+            raise ValueError(f"Unsupported road geometry type: {geom['type']}")
+        for line in lines:
+            xy = np.asarray(line, dtype=np.float64)[:, :2]
+            if len(xy) >= 2:
+                parts.append(np.hstack([xy[:-1], xy[1:]]))
+    if not parts:
+        return np.empty((0, 4), dtype=np.float64)
+    return np.vstack(parts)
+
+
+class SegmentGrid:
+    """Uniform-grid spatial index over road segments (cells of ``cell_px`` pixels)."""
+
+    def __init__(self, segments: np.ndarray, transform: GridTransform, cell_px: int) -> None:
+        self.segments = segments
+        self.cell_px = cell_px
+        self.cells: dict[tuple[int, int], np.ndarray] = {}
+        if not len(segments):
+            return
+        r_a, c_a = transform.to_pixel(segments[:, 0], segments[:, 1])
+        r_b, c_b = transform.to_pixel(segments[:, 2], segments[:, 3])
+        r_lo = np.floor(np.minimum(r_a, r_b) / cell_px).astype(np.int64)
+        r_hi = np.floor(np.maximum(r_a, r_b) / cell_px).astype(np.int64)
+        c_lo = np.floor(np.minimum(c_a, c_b) / cell_px).astype(np.int64)
+        c_hi = np.floor(np.maximum(c_a, c_b) / cell_px).astype(np.int64)
+        buckets: dict[tuple[int, int], list[int]] = {}
+        for i in range(len(segments)):
+            for cr in range(r_lo[i], r_hi[i] + 1):
+                for cc in range(c_lo[i], c_hi[i] + 1):
+                    buckets.setdefault((cr, cc), []).append(i)
+        self.cells = {k: np.asarray(v, dtype=np.int64) for k, v in buckets.items()}
+
+    def query(self, r0: int, r1: int, c0: int, c1: int) -> np.ndarray:
+        """Segments whose bounding box touches pixel window [r0, r1) x [c0, c1)."""
+        k = self.cell_px
+        hits = [
+            self.cells[(cr, cc)]
+            for cr in range(math.floor(r0 / k), math.floor((r1 - 1) / k) + 1)
+            for cc in range(math.floor(c0 / k), math.floor((c1 - 1) / k) + 1)
+            if (cr, cc) in self.cells
+        ]
+        if not hits:
+            return self.segments[:0]
+        return self.segments[np.unique(np.concatenate(hits))]
+
+
+def rasterize_segments(
+    segments: np.ndarray, transform: GridTransform, r0: int, c0: int, shape: tuple[int, int]
+) -> np.ndarray:
+    """Boolean (h, w) window with every pixel a segment passes through set (half-pixel sampling)."""
+    h, w = shape
+    out = np.zeros((h, w), dtype=bool)
+    if not len(segments):
+        return out
+    length = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+    n_pts = np.ceil(length / (0.5 * transform.pixel_m)).astype(np.int64) + 1
+    seg = np.repeat(np.arange(len(segments)), n_pts)
+    starts = np.cumsum(n_pts) - n_pts
+    t = (np.arange(n_pts.sum()) - np.repeat(starts, n_pts)) / np.repeat(np.maximum(n_pts - 1, 1), n_pts)
+    x = segments[seg, 0] + t * (segments[seg, 2] - segments[seg, 0])
+    y = segments[seg, 1] + t * (segments[seg, 3] - segments[seg, 1])
+    r, c = transform.to_pixel(x, y)
+    r = np.floor(r).astype(np.int64) - r0
+    c = np.floor(c).astype(np.int64) - c0
+    keep = (r >= 0) & (r < h) & (c >= 0) & (c < w)
+    out[r[keep], c[keep]] = True
+    return out
+
+
+def _distance_px(sources: np.ndarray) -> np.ndarray:
+    """Euclidean distance (pixels) to the nearest True pixel; inf when there is none."""
+    if not sources.any():
+        return np.full(sources.shape, np.inf)
+    return distance_transform_edt(~sources)
+
+
+@dataclass(frozen=True)
+class _TileTask:
+    lc_path: str
+    r0: int
+    r1: int
+    c0: int
+    c1: int
+    halo_nf: int
+    halo_rd: int
+    pixel_m: float
+    nf_max_m: Optional[float]
+    road_radius_m: float
+    roads: Optional[np.ndarray]
+    transform: Optional[GridTransform]
+
+
+def _frontier_tile(task: _TileTask) -> tuple[int, int, np.ndarray]:
+    """Both frontier bands for one tile, from a window padded by the halo."""
+    lc_stack = open_stack(task.lc_path)
+    rows, cols = lc_stack.shape
+    h, w = task.r1 - task.r0, task.c1 - task.c0
+    out = np.full((2, h, w), np.nan, dtype=np.float32)
+
+    # distance to non-forest: exact inside the tile as long as the halo covers the search distance
+    wr0, wr1 = max(task.r0 - task.halo_nf, 0), min(task.r1 + task.halo_nf, rows)
+    wc0, wc1 = max(task.c0 - task.halo_nf, 0), min(task.c1 + task.halo_nf, cols)
+    lc = lc_stack.read([0], wr0, wr1, wc0, wc1)[0]
+    valid = np.isin(lc, LC_CLASSES)
+    forest = np.isin(lc, FOREST_CLASSES)
+    d_px = _distance_px(valid & ~forest)
+    inner = (slice(task.r0 - wr0, task.r0 - wr0 + h), slice(task.c0 - wc0, task.c0 - wc0 + w))
+    d_px, forest = d_px[inner], forest[inner]
+    d_nf = d_px * task.pixel_m
+    if task.nf_max_m is None or task.nf_max_m > task.halo_nf * task.pixel_m:
+        d_nf[d_px > task.halo_nf] = np.nan
+    if task.nf_max_m is not None:
+        np.minimum(d_nf, task.nf_max_m, out=d_nf)
+    d_nf[~forest] = np.nan
+    out[0] = d_nf
+
+    # distance to road: rasterized segments, masked beyond the search radius
+    if task.roads is not None:
+        wr0, wr1 = task.r0 - task.halo_rd, task.r1 + task.halo_rd
+        wc0, wc1 = task.c0 - task.halo_rd, task.c1 + task.halo_rd
+        roads = rasterize_segments(task.roads, task.transform, wr0, wc0, (wr1 - wr0, wc1 - wc0))
+        d_rd = _distance_px(roads)[task.halo_rd : task.halo_rd + h, task.halo_rd : task.halo_rd + w] * task.pixel_m
+        d_rd[d_rd > task.road_radius_m] = np.nan
+        out[1] = d_rd
+    return task.r0, task.c0, out
+
+
+def frontier_features(
+    lc_path: str | Path,
+    out: str | Path,
+    pixel_m: Optional[float] = None,
+    roads: Optional[str | Path | np.ndarray] = None,
+    transform: Optional[Sequence[float]] = None,
+    road_search_radius_m: float = 100_000,
+    nf_max_km: Optional[float] = None,
+    tile: int = 1024,
+    n_workers: Optional[int] = None,
+) -> dict:
+    """Offline ``frontier_features_for_year`` over a local MODIS LC_Type1 raster.
+
+    Writes a 2-band float32 raster [dist_to_nonforest_m, dist_to_road_m] with
+    the same grid as ``lc_path`` (.npy or GeoTIFF), ready to stack with AEF bands.
+
+    - ``dist_to_nonforest_m``: Euclidean distance from forest pixels (IGBP
+      1..5) to the nearest valid non-forest pixel, NaN off forest. As with
+      ``fastDistanceTransform(256)``, distances beyond 256 px are unknown (NaN);
+      with ``nf_max_km`` they are clamped, and the halo shrinks to the cap.
+    - ``dist_to_road_m``: distance to the nearest road segment, NaN beyond
+      ``road_search_radius_m`` (EE ``FeatureCollection.distance``). Roads are
+      rasterized at pixel resolution, so values are within about half a pixel
+      of the vector distance. Without ``roads`` the band is all NaN.
+
+    The grid is cut into ``tile`` x ``tile`` tiles, each computed from a window
+    padded by a halo as wide as the search distance, so results are identical
+    to a whole-raster transform. Tiles run on a process pool; only the road
+    segments near a tile (found via ``SegmentGrid``) are sent to its worker.
+
+    ``transform`` is (x0, y0, pixel_m) of the top-left corner in the roads'
+    projected CRS; GeoTIFF inputs provide it themselves.
+    """
+    lc_stack = open_stack(lc_path)
+    rows, cols = lc_stack.shape
+    if transform is None and hasattr(lc_stack, "transform"):
+        transform = lc_stack.transform
+    grid = GridTransform(*transform) if transform is not None else None
+    if pixel_m is None:
+        if grid is None:
+            raise ValueError("pixel_m (or a transform) is required for .npy land-cover rasters")
+        pixel_m = grid.pixel_m
+
+    nf_max_m = None if nf_max_km is None else float(nf_max_km) * 1000.0
+    halo_nf = NF_NEIGHBORHOOD_PX
+    if nf_max_m is not None:
+        halo_nf = min(halo_nf, math.ceil(nf_max_m / pixel_m) + 1)
+    halo_rd = math.ceil(road_search_radius_m / pixel_m) + 1
+
+    index = None
+    if roads is not None:
+        if grid is None:
+            raise ValueError("Road distances need the raster transform (x0, y0, pixel_m)")
+        segments = load_road_segments(roads) if not isinstance(roads, np.ndarray) else roads
+        index = SegmentGrid(segments, grid, cell_px=tile)
+
+    tasks = []
+    for r0 in range(0, rows, tile):
+        for c0 in range(0, cols, tile):
+            r1, c1 = min(r0 + tile, rows), min(c0 + tile, cols)
+            tile_roads = None
+            if index is not None:
+                tile_roads = index.query(r0 - halo_rd, r1 + halo_rd, c0 - halo_rd, c1 + halo_rd)
+            tasks.append(
+                _TileTask(
+                    str(lc_path), r0, r1, c0, c1, halo_nf, halo_rd, float(pixel_m),
+                    nf_max_m, float(road_search_radius_m), tile_roads, grid,
+                )
+            )
+
+    writer = RasterWriter(out, 2, (rows, cols), np.float32, band_names=FRONTIER_BANDS, like=lc_stack)
+    n_workers = n_workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+    if n_workers == 1 or len(tasks) == 1:
+        for task in tasks:
+            r0, c0, block = _frontier_tile(task)
+            writer.write(r0, block, c0=c0)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            for r0, c0, block in pool.map(_frontier_tile, tasks):
+                writer.write(r0, block, c0=c0)
+    writer.close()
+
+    return {
+        "rows": rows,
+        "cols": cols,
+        "tiles": len(tasks),
+        "halo_nonforest_px": halo_nf,
+        "halo_road_px": halo_rd if index is not None else 0,
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compute dist_to_nonforest_m / dist_to_road_m from local rasters.")
+    ap.add_argument("--lc", required=True, help="MODIS LC_Type1 raster (.npy or GeoTIFF) for tYear")
+    ap.add_argument("--roads", default=None, help="GeoJSON (Multi)LineStrings in the raster CRS (e.g. GRIP4)")
+    ap.add_argument("--out", required=True, help="Output 2-band .npy/.tif")
+    ap.add_argument("--transform", default=None, help="x0,y0,pixel_m of the top-left corner (needed for .npy + roads)")
+    ap.add_argument("--pixel_m", type=float, default=None, help="Pixel size in metres (default: from transform)")
+    ap.add_argument("--road_search_radius_m", type=float, default=100_000)
+    ap.add_argument("--nf_max_km", type=float, default=None)
+    ap.add_argument("--tile", type=int, default=1024)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    transform = [float(v) for v in args.transform.split(",")] if args.transform else None
+    stats = frontier_features(
+        args.lc,
+        args.out,
+        pixel_m=args.pixel_m,
+        roads=args.roads,
+        transform=transform,
+        road_search_radius_m=args.road_search_radius_m,
+        nf_max_km=args.nf_max_km,
+        tile=args.tile,
+        n_workers=args.workers,
+    )
+    print(
+        f"Frontier features for {stats['rows']}x{stats['cols']} px in {stats['tiles']} tiles "
+        f"({stats['seconds']:.1f}s) -> {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+def _band_sidecar(path: Path) -> Path:
+    return path.with_name(path.name + ".bands.json")
+
+
+class NpyStack:
+    """A (bands, rows, cols) .npy raster, opened memory-mapped.
+
+    Band names come from ``band_names``, else a ``<file>.bands.json`` sidecar
+    (a JSON list) written next to the array, else they are unknown (None).
+    """
+
+    def __init__(self, path: str | Path, band_names: Optional[Sequence[str]] = None) -> None:
+        self.path = Path(path)
+        arr = np.load(self.path, mmap_mode="r")
+        if arr.ndim == 2:
+            arr = arr[None]
+        if arr.ndim != 3:
+            raise ValueError(f"Expected a (bands, rows, cols) array in {self.path}, got shape {arr.shape}")
+        self.arr = arr
+        if band_names is None and _band_sidecar(self.path).exists():
+            band_names = json.loads(_band_sidecar(self.path).read_text())
+        self.band_names = list(band_names) if band_names is not None else None
+        if self.band_names is not None and len(self.band_names) != arr.shape[0]:
+            raise ValueError(f"{len(self.band_names)} band names for {arr.shape[0]} bands in {self.path}")
+
+    @property
+    def n_bands(self) -> int:
+        return int(self.arr.shape[0])
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return int(self.arr.shape[1]), int(self.arr.shape[2])
+
+    def read(self, bands: Sequence[int], r0: int, r1: int, c0: int = 0, c1: Optional[int] = None) -> np.ndarray:
+        return np.asarray(self.arr[list(bands), r0:r1, c0:c1])
+
+
+class GeoTiffStack:
+    """Multi-band GeoTIFF read window by window (needs ``rasterio``)."""
+
+    def __init__(self, path: str | Path, band_names: Optional[Sequence[str]] = None) -> None:
+        rasterio = _rasterio()
+        self.path = Path(path)
+        self.ds = rasterio.open(self.path)
+        self._lock = threading.Lock()
+        if band_names is None and all(self.ds.descriptions):
+            band_names = list(self.ds.descriptions)
+        self.band_names = list(band_names) if band_names is not None else None
+
+    @property
+    def n_bands(self) -> int:
+        return int(self.ds.count)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return int(self.ds.height), int(self.ds.width)
+
+    def read(self, bands: Sequence[int], r0: int, r1: int, c0: int = 0, c1: Optional[int] = None) -> np.ndarray:
+        from rasterio.windows import Window
+
+        c1 = self.ds.width if c1 is None else c1
+        with self._lock:  # GDAL dataset handles are not thread-safe
+            return self.ds.read([b + 1 for b in bands], window=Window(c0, r0, c1 - c0, r1 - r0))
+
+    @property
+    def transform(self) -> tuple[float, float, float]:
+        """(x0, y0, pixel size) of a north-up raster."""
+        t = self.ds.transform
+        return float(t.c), float(t.f), float(t.a)
+
+
+def _rasterio():
+    try:
+        import rasterio
+    except ImportError:
+        raise ImportError("GeoTIFF input/output needs rasterio (pip install rasterio); .npy stacks work without it") from None
+    return rasterio
+
+
+def open_stack(path: str | Path, band_names: Optional[Sequence[str]] = None):
+    path = Path(path)
+    if path.suffix.lower() in (".tif", ".tiff"):
+        return GeoTiffStack(path, band_names)
+    return NpyStack(path, band_names)
+
+
+class RasterWriter:
+    """Chunked (bands, rows, cols) output: .npy via open_memmap, or GeoTIFF via rasterio."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        n_bands: int,
+        shape: tuple[int, int],
+        dtype=np.float32,
+        band_names: Optional[Sequence[str]] = None,
+        like=None,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        rows, cols = shape
+        self._tif = self.path.suffix.lower() in (".tif", ".tiff")
+        if self._tif:
+            rasterio = _rasterio()
+            profile = dict(like.ds.profile) if isinstance(like, GeoTiffStack) else {"driver": "GTiff"}
+            profile.update(count=n_bands, height=rows, width=cols, dtype=np.dtype(dtype).name)
+            profile["nodata"] = np.nan if np.issubdtype(dtype, np.floating) else None
+            profile.setdefault("tiled", True)
+            self.ds = rasterio.open(self.path, "w", **profile)
+            if band_names:
+                for i, name in enumerate(band_names, start=1):
+                    self.ds.set_band_description(i, name)
+        else:
+            self.arr = np.lib.format.open_memmap(self.path, mode="w+", dtype=dtype, shape=(n_bands, rows, cols))
+            if band_names:
+                _band_sidecar(self.path).write_text(json.dumps(list(band_names)) + "\n")
+
+    def write(self, r0: int, block: np.ndarray, c0: int = 0) -> None:
+        """Write a (bands, h, w) block with its top-left corner at (r0, c0)."""
+        h, w = block.shape[1], block.shape[2]
+        if self._tif:
+            from rasterio.windows import Window
+
+            with self._lock:
+                self.ds.write(block, window=Window(c0, r0, w, h))
+        else:
+            # disjoint windows of a memmap: safe without the lock
+            self.arr[:, r0 : r0 + h, c0 : c0 + w] = block
+
+    def close(self) -> None:
+        if self._tif:
+            self.ds.close()
+        else:
+            self.arr.flush()
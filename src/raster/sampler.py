@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.modeling.train_logit import FEATURE_COLS
+from src.raster.io import open_stack
+from src.raster.score import band_indices
+
+_MASK64 = (1 << 64) - 1
+UNBIASED_SEED_OFFSET = 999  # unbiased_forest_samples draws with seed + 999 (not + t_year)
+
+
+def _splitmix64(z: np.ndarray) -> np.ndarray:
+    z = z ^ (z >> np.uint64(30))
+    z = z * np.uint64(0xBF58476D1CE4E5B9)
+    z = z ^ (z >> np.uint64(27))
+    z = z * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def pixel_keys(seed: int, flat_idx: np.ndarray) -> np.ndarray:
+    """Uniform [0, 1) priority key per pixel, a pure function of (seed, pixel index).
+
+    Keys do not depend on how the raster is cut into blocks or on the order
+    blocks finish, so a sample is reproducible for any ``block_rows`` / workers.
+    """
+    base = np.uint64((int(seed) * 0x9E3779B97F4A7C15) & _MASK64)
+    z = _splitmix64(np.asarray(flat_idx, dtype=np.uint64) + base)
+    return (z >> np.uint64(11)).astype(np.float64) * 2.0**-53
+
+
+class Reservoir:
+    """Bottom-k priority sample: the ``k`` offered items with the smallest keys.
+
+    With i.i.d. uniform keys this is a uniform sample without replacement, and
+    two reservoirs over disjoint inputs ``merge`` into the reservoir of their
+    union, so blocks can be sampled independently and combined in any order.
+    """
+
+    def __init__(self, k: int, n_cols: int) -> None:
+        self.k = int(k)
+        self.keys = np.empty(0, dtype=np.float64)
+        self.index = np.empty(0, dtype=np.int64)
+        self.rows = np.empty((0, n_cols), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def offer(self, keys: np.ndarray, index: np.ndarray, rows: np.ndarray) -> "Reservoir":
+        if self.k <= 0 or len(keys) == 0:
+            return self
+        keys = np.concatenate([self.keys, keys])
+        index = np.concatenate([self.index, index])
+        rows = np.concatenate([self.rows, rows])
+        if len(keys) > self.k:
+            keep = np.argpartition(keys, self.k - 1)[: self.k]
+            keys, index, rows = keys[keep], index[keep], rows[keep]
+        self.keys, self.index, self.rows = keys, index, rows
+        return self
+
+    def merge(self, other: "Reservoir") -> "Reservoir":
+        return self.offer(other.keys, other.index, other.rows)
+
+
+@dataclass
+class SampleResult:
+    """Sampled rows in the CSV export layout, indexed by flat pixel index (row * cols + col)."""
+
+    train: pd.DataFrame
+    unbiased: Optional[pd.DataFrame]
+    stats: dict
+
+
+def _offer_top(res: Reservoir, keys: np.ndarray, pix: np.ndarray, X: np.ndarray, where: np.ndarray) -> Reservoir:
+    """Offer the pixels in ``where`` (block-local positions), gathering rows only for the block's top k."""
+    if res.k <= 0 or len(where) == 0:
+        return res
+    if len(where) > res.k:
+        where = where[np.argpartition(keys[where], res.k - 1)[: res.k]]
+    return res.offer(keys[where], pix[where], np.ascontiguousarray(X[:, where].T))
+
+
+def _frame(res: Reservoir, feature_cols: Sequence[str], extra: dict) -> pd.DataFrame:
+    order = np.argsort(res.index, kind="stable")
+    df = pd.DataFrame(res.rows[order], columns=list(feature_cols), index=pd.Index(res.index[order], name="pixel"))
+    for col, val in extra.items():
+        df[col] = val[order] if isinstance(val, np.ndarray) else val
+    return df
+
+
+def stratified_sample_stack(
+    features: str | Path,
+    labels: str | Path,
+    t_year: int,
+    n_neg: int,
+    n_pos: int,
+    seed: int,
+    mask: Optional[str | Path] = None,
+    n_unbiased: int = 0,
+    feature_cols: Sequence[str] = FEATURE_COLS,
+    band_names: Optional[Sequence[str]] = None,
+    block_rows: int = 256,
+    n_workers: Optional[int] = None,
+) -> SampleResult:
+    """Local counterpart of ``stratified_samples_for_year`` + ``unbiased_forest_samples``.
+
+    One pass over a (bands, rows, cols) feature stack (.npy memory-mapped, or
+    GeoTIFF) and a ``labels`` raster (1=loss, 0=no loss, other=nodata) fills a
+    fixed-size reservoir per class (``n_neg`` / ``n_pos``, seeded ``seed + t_year``)
+    and, with ``n_unbiased`` and a forest ``mask`` (1=forest), a forest-only
+    reservoir (seeded ``seed + 999``) of any-label pixels. As with ``dropNulls``
+    on Earth Engine, pixels with a NaN feature or a nodata label are skipped.
+
+    Blocks run on a thread pool with at most ``2 * n_workers`` in flight; each
+    keeps only its own top-k per reservoir before merging, so memory is bounded
+    by the sample sizes, not the region. Seeded keys are per pixel, so the
+    sample does not depend on ``block_rows`` or ``n_workers``. (It is not the
+    same pixel set Earth Engine would draw, only the same distribution.)
+    """
+    if n_unbiased and mask is None:
+        raise ValueError("n_unbiased needs a forest mask")
+    feature_cols = list(feature_cols)
+    stack = open_stack(features, band_names)
+    idx = band_indices(stack, feature_cols)
+    rows, cols = stack.shape
+
+    aux = {"labels": open_stack(labels)}
+    if mask is not None:
+        aux["mask"] = open_stack(mask)
+    for name, st in aux.items():
+        if st.shape != (rows, cols):
+            raise ValueError(f"{name} shape {st.shape} != feature stack shape {(rows, cols)}")
+
+    n_feat = len(feature_cols)
+    classes = {0: Reservoir(n_neg, n_feat), 1: Reservoir(n_pos, n_feat)}
+    unbiased = Reservoir(n_unbiased, n_feat + 1)  # features + label
+    lock = threading.Lock()
+    train_seed, unbiased_seed = seed + t_year, seed + UNBIASED_SEED_OFFSET
+
+    def run_block(r0: int) -> int:
+        r1 = min(r0 + block_rows, rows)
+        X = stack.read(idx, r0, r1).astype(np.float32, copy=False).reshape(n_feat, -1)
+        y = aux["labels"].read([0], r0, r1).reshape(-1)
+        pix = np.arange(r0 * cols, r1 * cols, dtype=np.int64)
+        valid = ~np.isnan(X).any(axis=0) & ((y == 0) | (y == 1))
+
+        keys = pixel_keys(train_seed, pix)
+        parts = {
+            c: _offer_top(Reservoir(res.k, n_feat), keys, pix, X, np.flatnonzero(valid & (y == c)))
+            for c, res in classes.items()
+        }
+        part_u = Reservoir(unbiased.k, n_feat + 1)
+        if unbiased.k:
+            forest = np.flatnonzero(valid & (aux["mask"].read([0], r0, r1).reshape(-1) > 0))
+            Xy = np.vstack([X, y.astype(np.float32)[None]])
+            _offer_top(part_u, pixel_keys(unbiased_seed, pix), pix, Xy, forest)
+        with lock:
+            for c, part in parts.items():
+                classes[c].merge(part)
+            unbiased.merge(part_u)
+        return int(valid.sum())
+
+    n_workers = n_workers or os.cpu_count() or 1
+    n_valid = 0
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        in_flight = set()
+        for r0 in range(0, rows, block_rows):
+            if len(in_flight) >= 2 * n_workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                n_valid += sum(f.result() for f in done)
+            in_flight.add(pool.submit(run_block, r0))
+        n_valid += sum(f.result() for f in in_flight)
+
+    train = pd.concat(
+        [_frame(classes[c], feature_cols, {"label": np.int8(c), "tYear": t_year}) for c in (0, 1)]
+    ).sort_index(kind="stable")
+    train["label"] = train["label"].astype(np.int8)
+    unb = None
+    if n_unbiased:
+        unb = _frame(unbiased, feature_cols + ["label"], {"tYear": t_year, "unbiased": 1})
+        unb["label"] = unb["label"].astype(np.int8)
+
+    stats = {
+        "rows": rows,
+        "cols": cols,
+        "n_valid": n_valid,
+        "n_neg": len(classes[0]),
+        "n_pos": len(classes[1]),
+        "n_unbiased": len(unbiased),
+        "seconds": time.perf_counter() - t0,
+    }
+    return SampleResult(train=train, unbiased=unb, stats=stats)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Stratified / unbiased samples from a local feature + label stack.")
+    ap.add_argument("--features", required=True, help="(bands, rows, cols) .npy or GeoTIFF feature stack for tYear")
+    ap.add_argument("--labels", required=True, help="Label raster (1=loss, 0=no loss, other=nodata)")
+    ap.add_argument("--mask", default=None, help="Forest mask (1=forest); needed for --n_unbiased")
+    ap.add_argument("--t_year", type=int, required=True)
+    ap.add_argument("--n_pos", type=int, default=5000)
+    ap.add_argument("--n_neg", type=int, default=5000)
+    ap.add_argument("--n_unbiased", type=int, default=0)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out_train", required=True, help="Train CSV (feature_cols, label, tYear)")
+    ap.add_argument("--out_unbiased", default=None, help="Unbiased CSV (feature_cols, label, tYear, unbiased)")
+    ap.add_argument("--block_rows", type=int, default=256)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    if args.n_unbiased and not args.out_unbiased:
+        ap.error("--n_unbiased needs --out_unbiased")
+    res = stratified_sample_stack(
+        args.features,
+        args.labels,
+        args.t_year,
+        n_neg=args.n_neg,
+        n_pos=args.n_pos,
+        seed=args.seed,
+        mask=args.mask,
+        n_unbiased=args.n_unbiased,
+        block_rows=args.block_rows,
+        n_workers=args.workers,
+    )
+    for df, out in ((res.train, args.out_train), (res.unbiased, args.out_unbiased)):
+        if df is not None:
+            Path(out).parent.mkdir(parents=True, exist_ok=True)
+            df.to_csv(out, index=False)
+    s = res.stats
+    print(
+        f"Sampled {s['n_neg']} neg / {s['n_pos']} pos / {s['n_unbiased']} unbiased of {s['n_valid']} valid px "
+        f"({s['rows']}x{s['cols']}) in {s['seconds']:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
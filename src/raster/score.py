@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from src.modeling.export_weights import load_logit_model
+from src.modeling.metrics import MetricsAccumulator
+from src.modeling.quantize import NODATA_CODE, load_stack_quantizer
+from src.modeling.train_logit import FEATURE_COLS
+from src.raster.io import RasterWriter, open_stack
+
+
+def sigmoid_inplace(score: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """out = 1 / (1 + exp(-score)) without extra temporaries (float32 in, float32 out)."""
+    np.negative(score, out=out)
+    with np.errstate(over="ignore"):  # exp overflow -> inf -> prob 0, as intended
+        np.exp(out, out=out)
+    out += 1.0
+    np.reciprocal(out, out=out)
+    return out
+
+
+def band_indices(stack, feature_cols: Sequence[str]) -> list[int]:
+    """Positions of ``feature_cols`` in the stack; unnamed 66-band stacks are taken as FEATURE_COLS."""
+    stack_bands = stack.band_names
+    if stack_bands is None:
+        if stack.n_bands != len(FEATURE_COLS):
+            raise ValueError(f"Feature stack has {stack.n_bands} unnamed bands; pass band_names")
+        stack_bands = FEATURE_COLS
+    missing = [c for c in feature_cols if c not in stack_bands]
+    if missing:
+        raise ValueError(f"Feature stack is missing bands: {missing[:5]} ... ({len(missing)} missing)")
+    return [list(stack_bands).index(c) for c in feature_cols]
+
+
+def load_weight_matrix(paths: Sequence[str | Path]) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """Stack N weights JSONs into (W float32 [n_features, N], b float32 [N], feature_cols).
+
+    ``feature_cols`` is the union of the models' bands (first-seen order); a model
+    gets zero weight on bands it does not use.
+    """
+    models = [load_logit_model(p) for p in paths]
+    feature_cols: list[str] = []
+    for _, _, cols in models:
+        feature_cols.extend(c for c in cols if c not in feature_cols)
+
+    W = np.zeros((len(feature_cols), len(models)), dtype=np.float32)
+    b = np.zeros(len(models), dtype=np.float32)
+    for j, (w, b_j, cols) in enumerate(models):
+        W[[feature_cols.index(c) for c in cols], j] = w
+        b[j] = 0.0 if b_j is None else b_j
+    return W, b, feature_cols
+
+
+def output_paths(weights: Sequence[str | Path], out_dir: str | Path, ext: str = ".npy") -> list[Path]:
+    """One ``<stem>_risk<ext>`` per weights file under ``out_dir``, unique even when stems collide.
+
+    Colliding stems (e.g. several ``models/<run>/logit_weights.json``) get their
+    parent directory's name prepended, then their position if that still collides.
+    """
+    weights = [Path(w) for w in weights]
+    stems = [w.stem for w in weights]
+    names = [f"{w.parent.name}_{w.stem}" if stems.count(w.stem) > 1 else w.stem for w in weights]
+    names = [f"{n}_{j}" if names.count(n) > 1 else n for j, n in enumerate(names)]
+    return [Path(out_dir) / f"{n}_risk{ext}" for n in names]
+
+
+def score_models(
+    weights: Sequence[str | Path],
+    features: str | Path,
+    outs: Sequence[str | Path],
+    mask: Optional[str | Path] = None,
+    labels: Optional[str | Path] = None,
+    band_names: Optional[Sequence[str]] = None,
+    top_k_list=(1, 2, 5, 10),
+    block_rows: int = 256,
+    n_workers: Optional[int] = None,
+) -> dict:
+    """Score N models in one pass over a local feature stack.
+
+    ``features`` is a (bands, rows, cols) .npy (memory-mapped) or GeoTIFF with
+    the union of the models' ``feature_cols`` (band names from ``band_names``,
+    the stack's metadata, or the 66 training features in order). Each block is
+    read once and scored for every model with a single float32 matmul
+    (W^T @ X), so I/O is paid once however many models are compared.
+
+    Each ``outs[j]`` receives a 2-band float32 raster [score, prob]; pixels
+    outside ``mask`` (1=forest) or with a NaN in one of model j's own bands
+    (nonzero weight) are NaN, so co-scored models do not mask each other. Per-model
+    top-K% thresholds come from a ``MetricsAccumulator`` (approximate, bounded
+    memory); with a ``labels`` raster (1=loss, 0=no loss, other=nodata) the
+    summary also has capture/precision and ``eval_probs``-style metrics.
+
+    An int8 stack written by ``src.modeling.quantize.quantize_stack`` is scored
+    on its codes: the per-band scale / offset are folded into W and b once, so
+    blocks are read at a quarter of the float32 I/O and never dequantized.
+
+    Blocks are scored on a thread pool (NumPy releases the GIL in matmul/exp),
+    with at most ``2 * n_workers`` blocks in flight, so memory stays bounded.
+    """
+    if len(weights) != len(outs):
+        raise ValueError(f"{len(weights)} weights files but {len(outs)} outputs")
+    resolved = [Path(o).resolve() for o in outs]
+    if len(set(resolved)) != len(resolved):
+        dupes = sorted({str(o) for o in resolved if resolved.count(o) > 1})
+        raise ValueError(f"Several models would write the same output: {dupes}")
+    W, b, feature_cols = load_weight_matrix(weights)
+    stack = open_stack(features, band_names)
+    idx = band_indices(stack, feature_cols)
+    rows, cols = stack.shape
+
+    quant = load_stack_quantizer(features)
+    if quant is not None:
+        quant = quant.subset([c for c in feature_cols if c in quant.bands])
+        W, b = quant.fold(W, b, feature_cols)
+        W, b = W.astype(np.float32), b.astype(np.float32)
+        qrows = [i for i, c in enumerate(feature_cols) if c in quant.bands]
+    WT = np.ascontiguousarray(W.T)
+    uses = (WT != 0).astype(np.float32)  # (n_models, n_features): the bands each model depends on
+    n_models = WT.shape[0]
+
+    aux = {}
+    for name, path in (("mask", mask), ("labels", labels)):
+        if path is not None:
+            aux[name] = open_stack(path)
+            if aux[name].shape != (rows, cols):
+                raise ValueError(f"{name} shape {aux[name].shape} != feature stack shape {(rows, cols)}")
+
+    accs = [MetricsAccumulator() for _ in range(n_models)]
+    acc_lock = threading.Lock()
+
+    def run_block(r0: int) -> np.ndarray:
+        r1 = min(r0 + block_rows, rows)
+        X = stack.read(idx, r0, r1).astype(np.float32, copy=False).reshape(len(idx), -1)
+        if quant is not None:
+            codes = X[qrows]
+            codes[codes == NODATA_CODE] = np.nan
+            X[qrows] = codes
+        nan = np.isnan(X)
+        if nan.any():
+            # a NaN only invalidates the models that weight its band; zero-fill so it
+            # does not leak into the others through their zero weights (0 * NaN = NaN)
+            valid = (uses @ nan.astype(np.float32)) == 0
+            X[nan] = 0.0
+        else:
+            valid = np.ones((n_models, X.shape[1]), dtype=bool)
+        scores = WT @ X
+        scores += b[:, None]
+        if "mask" in aux:
+            valid &= aux["mask"].read([0], r0, r1).reshape(1, -1) > 0
+        scores[~valid] = np.nan
+        probs = sigmoid_inplace(scores, np.empty_like(scores))
+
+        y = aux["labels"].read([0], r0, r1).reshape(-1) if "labels" in aux else None
+        block_accs = []
+        for j in range(n_models):
+            if y is None:
+                keep = valid[j]
+                y_j = np.zeros(int(keep.sum()), dtype=np.int8)
+            else:
+                keep = valid[j] & ((y == 0) | (y == 1))
+                y_j = y[keep]
+            block_accs.append(MetricsAccumulator().update(y_j, probs[j, keep]))
+        with acc_lock:
+            for acc, part in zip(accs, block_accs):
+                acc.merge(part)
+
+        h = r1 - r0
+        for j, writer in enumerate(writers):
+            writer.write(r0, np.stack([scores[j], probs[j]]).reshape(2, h, cols))
+        return np.append(valid.sum(axis=1), valid.any(axis=0).sum())
+
+    n_workers = n_workers or os.cpu_count() or 1
+    counts = np.zeros(n_models + 1, dtype=np.int64)  # per model, then pixels scored by any model
+    t0 = time.perf_counter()
+    writers: list[RasterWriter] = []
+    try:
+        for o in outs:
+            writers.append(RasterWriter(o, 2, (rows, cols), np.float32, band_names=["score", "prob"], like=stack))
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            in_flight = set()
+            for r0 in range(0, rows, block_rows):
+                if len(in_flight) >= 2 * n_workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    counts += sum(f.result() for f in done)
+                in_flight.add(pool.submit(run_block, r0))
+            counts += sum(f.result() for f in in_flight)
+    finally:
+        # a failed block must not leave .npy memmaps unflushed or GeoTIFF handles open
+        for writer in writers:
+            writer.close()
+
+    models = []
+    for j, (path, out, acc) in enumerate(zip(weights, outs, accs)):
+        topk = acc.topk_report(top_k_list)
+        entry = {"weights": str(path), "out": str(out), "n_scored": int(counts[j])}
+        if "labels" in aux:
+            entry["eval"] = acc.eval_probs(name=Path(path).stem)
+            entry["topk"] = topk
+        else:
+            entry["topk"] = [{"top_k_pct": t["top_k_pct"], "thr": t["thr"]} for t in topk]
+        models.append(entry)
+
+    return {
+        "rows": rows,
+        "cols": cols,
+        "n_scored": int(counts[-1]),
+        "seconds": time.perf_counter() - t0,
+        "models": models,
+    }
+
+
+def score_raster(
+    weights: str | Path,
+    features: str | Path,
+    out: str | Path,
+    mask: Optional[str | Path] = None,
+    band_names: Optional[Sequence[str]] = None,
+    block_rows: int = 256,
+    n_workers: Optional[int] = None,
+) -> dict:
+    """Single-model ``score_models``: write [score, prob] for one weights JSON to ``out``."""
+    stats = score_models(
+        [weights],
+        features,
+        [out],
+        mask=mask,
+        band_names=band_names,
+        block_rows=block_rows,
+        n_workers=n_workers,
+    )
+    stats["out"] = str(out)
+    return stats
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Score a local feature stack with one or more exported logistic weights.")
+    ap.add_argument("--weights", nargs="+", required=True, help="Weights JSON(s) (save_logit_weights / scripts/train_logit.py)")
+    ap.add_argument("--features", required=True, help="(bands, rows, cols) .npy or GeoTIFF feature stack")
+    ap.add_argument("--mask", default=None, help="Optional forest mask (.npy or GeoTIFF, 1=forest)")
+    ap.add_argument("--labels", default=None, help="Optional label raster (1=loss, 0=no loss) for capture/precision")
+    ap.add_argument("--out", required=True, help="Output .npy/.tif for one model; output directory for several")
+    ap.add_argument("--ext", default=".npy", choices=[".npy", ".tif"], help="Output format in multi-model mode")
+    ap.add_argument("--summary_json", default=None, help="Write per-model top-K summaries here")
+    ap.add_argument("--block_rows", type=int, default=256)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    if len(args.weights) == 1:
+        outs = [Path(args.out)]
+    else:
+        outs = output_paths(args.weights, args.out, args.ext)
+
+    stats = score_models(
+        args.weights,
+        args.features,
+        outs,
+        mask=args.mask,
+        labels=args.labels,
+        block_rows=args.block_rows,
+        n_workers=args.workers,
+    )
+    mpix = stats["rows"] * stats["cols"] / 1e6
+    print(f"Scored {len(outs)} model(s) on {mpix:.1f} Mpx ({stats['n_scored']} valid) in {stats['seconds']:.1f}s")
+    for m in stats["models"]:
+        print(f"  {m['weights']} -> {m['out']} | top-K: {m['topk']}")
+
+    if args.summary_json:
+        Path(args.summary_json).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.summary_json).write_text(json.dumps(stats, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
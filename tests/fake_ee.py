@@ -0,0 +1,140 @@
+"""Offline stand-in for the ``ee`` module.
+
+Every constructor / method call returns a new ``Node`` that remembers its
+operation and arguments, so tests can count how many expression nodes a helper
+builds and how large the resulting graph is, without Earth Engine access.
+``serializer.encode`` / ``Node.serialize`` produce the Cloud API expression
+format (``{"result": ..., "values": ...}``, equal subexpressions hash-consed).
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict
+
+nodes_built = 0
+
+AEF_BANDS = [f"A{i:02d}" for i in range(64)]
+
+
+def reset() -> None:
+    global nodes_built
+    nodes_built = 0
+
+
+class Node:
+    def __init__(self, op: str, args: tuple = (), kwargs: Dict[str, Any] | None = None) -> None:
+        global nodes_built
+        nodes_built += 1
+        self.op = op
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def method(*args: Any, **kwargs: Any) -> Node:
+            return Node(name, (self,) + args, kwargs)
+
+        return method
+
+    def map(self, fn) -> Node:
+        # EE traces the mapped function once with a placeholder argument.
+        return Node("map", (self, fn(Node("Feature.var"))))
+
+    def getInfo(self) -> Any:
+        if self.op == "bandNames":
+            return list(AEF_BANDS)
+        return None
+
+    def children(self) -> list[Node]:
+        out: list[Node] = []
+        for v in list(self.args) + list(self.kwargs.values()):
+            if isinstance(v, (list, tuple)):
+                out.extend(x for x in v if isinstance(x, Node))
+            elif isinstance(v, Node):
+                out.append(v)
+        return out
+
+    def serialize(self, for_cloud_api: bool = True) -> str:
+        return json.dumps(serializer.encode(self), sort_keys=True)
+
+    def __repr__(self) -> str:
+        return f"Node({self.op})"
+
+
+class _Serializer:
+    def encode(self, obj: Any, is_compound: bool = True, for_cloud_api: bool = True) -> dict:
+        values: Dict[str, dict] = {}
+        ids: Dict[str, str] = {}
+        memo: Dict[int, dict] = {}
+
+        def enc(v: Any) -> dict:
+            if isinstance(v, Node):
+                if id(v) not in memo:
+                    args = {f"arg{i}": enc(a) for i, a in enumerate(v.args)}
+                    args.update({k: enc(a) for k, a in v.kwargs.items()})
+                    value = {"functionInvocationValue": {"functionName": v.op, "arguments": args}}
+                    key = json.dumps(value, sort_keys=True)
+                    if key not in ids:
+                        ids[key] = str(len(ids))
+                        values[ids[key]] = value
+                    memo[id(v)] = {"valueReference": ids[key]}
+                return memo[id(v)]
+            if isinstance(v, (list, tuple)):
+                return {"arrayValue": {"values": [enc(x) for x in v]}}
+            if isinstance(v, dict):
+                return {"dictionaryValue": {"values": {str(k): enc(x) for k, x in v.items()}}}
+            return {"constantValue": v}
+
+        root = enc(obj)
+        if "valueReference" not in root:
+            return {"result": "r", "values": {"r": root}}
+        return {"result": root["valueReference"], "values": values}
+
+
+serializer = _Serializer()
+
+
+class _Namespace:
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Node:
+        return Node(self._name, args, kwargs)
+
+    def __getattr__(self, attr: str) -> _Namespace:
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return _Namespace(f"{self._name}.{attr}")
+
+
+def graph_size(obj: Node) -> int:
+    """Distinct nodes reachable from ``obj`` (shared subgraphs counted once)."""
+    seen: set[int] = set()
+    stack = [obj]
+    while stack:
+        n = stack.pop()
+        if id(n) in seen:
+            continue
+        seen.add(id(n))
+        stack.extend(n.children())
+    return len(seen)
+
+
+def Initialize(*args: Any, **kwargs: Any) -> None:
+    return None
+
+
+Image = _Namespace("Image")
+ImageCollection = _Namespace("ImageCollection")
+Feature = _Namespace("Feature")
+FeatureCollection = _Namespace("FeatureCollection")
+Geometry = _Namespace("Geometry")
+Date = _Namespace("Date")
+Filter = _Namespace("Filter")
+Number = _Namespace("Number")
+List = _Namespace("List")
+Array = _Namespace("Array")
+Reducer = _Namespace("Reducer")
+batch = _Namespace("batch")
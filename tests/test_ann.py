@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.modeling.ann import IVFIndex
+from src.modeling.metrics import RankedScores
+
+
+def make_embeddings(n=20_000, n_centers=60, seed=0):
+    """Clustered 64-D embeddings; cluster risk drives the labels."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_centers, 64)).astype(np.float32)
+    risk = rng.uniform(0.02, 0.9, size=n_centers)
+    c = rng.integers(0, n_centers, size=n)
+    X = centers[c] + 0.6 * rng.normal(size=(n, 64)).astype(np.float32)
+    y = (rng.random(n) < risk[c]).astype(np.int8)
+    return X, y, risk[c]
+
+
+def test_search_recall_and_knn_risk():
+    X, y, true_risk = make_embeddings()
+    index = IVFIndex.build(X[:15_000], labels=y[:15_000], ids=np.arange(15_000) + 100, seed=1)
+    assert index.n_lists == round(np.sqrt(15_000))
+    assert np.all(np.diff(index.offsets) >= 0) and index.offsets[-1] == index.n
+
+    Q = X[15_000:]
+    sims, pos = index.search(Q[:500], k=10, n_probe=8)
+    ex_sims, ex_pos = index.search_exact(Q[:500], k=10)
+    assert np.all(np.diff(sims, axis=1) <= 0)
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(pos, ex_pos)])
+    assert recall > 0.9
+    Qn = Q[:500] / np.linalg.norm(Q[:500], axis=1, keepdims=True)
+    np.testing.assert_allclose(ex_sims[:, 0], (index.vectors[ex_pos[:, 0]] * Qn).sum(1), rtol=1e-5)
+    assert set(index.ids[pos[0]]) <= set(range(100, 15_100))
+
+    p = index.knn_risk(Q, k=20)
+    assert p.shape == (len(Q),) and np.all((p >= 0) & (p <= 1))
+    ranked = RankedScores(y[15_000:], p)
+    oracle = RankedScores(y[15_000:], true_risk[15_000:]).roc_auc()
+    assert ranked.eval_probs(name="knn")["roc_auc"] > 0.97 * oracle
+    top = ranked.topk_report()
+    assert top[0]["precision"] > ranked.eval_probs()["pos_rate"]
+
+
+def test_save_load_mmap_and_small_index(tmp_path: Path):
+    X, y, _ = make_embeddings(n=3000)
+    index = IVFIndex.build(X, labels=y, n_lists=16)
+    index.save(tmp_path / "ivf")
+    loaded = IVFIndex.load(tmp_path / "ivf")
+    assert isinstance(loaded.vectors, np.memmap) and loaded.n == 3000
+
+    a = index.search(X[:50], k=5, n_probe=3)
+    b = loaded.search(X[:50], k=5, n_probe=3)
+    np.testing.assert_array_equal(a[1], b[1])
+    np.testing.assert_array_equal(loaded.ids[b[1][:, 0]], np.arange(50))  # each row finds itself
+
+    tiny = IVFIndex.build(X[:3], labels=y[:3], n_lists=2)
+    sims, pos = tiny.search(X[:2], k=5, n_probe=2)
+    assert (pos[:, 3:] == -1).all() and np.isneginf(sims[:, 3:]).all()
+    assert np.isfinite(tiny.knn_risk(X[:2], k=5)).all()
+
+
+def test_positives_only_index_scores_by_analog_similarity():
+    X, y, true_risk = make_embeddings()
+    train = np.arange(15_000)
+    pos_rows = train[y[train] == 1]
+    index = IVFIndex.build(X[pos_rows], labels=y[pos_rows], ids=pos_rows, seed=2)
+    Q, yq = X[15_000:], y[15_000:]
+
+    with pytest.raises(ValueError, match="analog_score"):
+        index.knn_risk(Q[:10])
+    s = index.analog_score(Q, k=300)
+    assert s.shape == (len(Q),) and np.all((s >= 0) & (s <= 1))
+    assert len(np.unique(s)) > len(Q) // 2  # not a constant score
+    oracle = RankedScores(yq, true_risk[15_000:]).roc_auc()
+    assert RankedScores(yq, s).roc_auc() > 0.9 * oracle
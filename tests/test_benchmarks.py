@@ -0,0 +1,22 @@
+from pathlib import Path
+
+from benchmarks.bench import compare, parse_size, run
+
+
+def test_parse_size():
+    assert [parse_size(s) for s in ("10k", "1M", "2500")] == [10_000, 1_000_000, 2500]
+
+
+def test_run_and_compare(tmp_path: Path):
+    results = run([500], ["metrics.evaluate", "export.*"], repeat=1, root=tmp_path, log=lambda m: None)
+    assert {(r["name"], r["rows"]) for r in results} == {
+        ("metrics.evaluate", 500),
+        ("export.weights_csv", None),
+        ("export.gee_fragment", None),
+    }
+    assert compare(results, results) == []
+
+    slower = [dict(r, seconds_median=r["seconds_median"] * 2 + 0.01, peak_mb=r["peak_mb"]) for r in results]
+    flagged = compare(slower, results, tolerance=1.5)
+    assert {f["name"] for f in flagged} == {r["name"] for r in results}
+    assert all(f["metric"] == "seconds_median" for f in flagged)
@@ -0,0 +1,95 @@
+import importlib
+import sys
+
+import pytest
+
+import fake_ee
+from src.gee.export_cache import DATASET_VERSIONS, ExportCacheIndex, ExportUnit, assemble, plan_units
+
+BBOX = [-63.5, -10.5, -61.5, -8.5]
+
+
+def units(train_years=(2018, 2019), unbiased_years=(2022,), grid=(2, 1), **kw):
+    params = dict(scale=500, seed=42, use_stable_label=False, n_pos=100, n_neg=100, n_unbiased=300)
+    params.update(kw)
+    return plan_units(BBOX, grid, train_years, unbiased_years, **params)
+
+
+def test_unit_keys_are_content_addressed():
+    base = units()
+    assert len(base) == 2 * 3 and len({u.key for u in base}) == 6
+    assert [u.key for u in base] == [u.key for u in units()]
+    assert base[0].key.startswith("train_2018_x0y0_")
+    assert base[0].sizes == {"n_pos": 50, "n_neg": 50} and base[2].sizes == {"n_pixels": 150}
+    assert ExportUnit.from_dict(base[0].to_dict()).key == base[0].key
+
+    keys = {u.key for u in base}
+    for changed in (
+        units(scale=250),
+        units(seed=7),
+        units(use_stable_label=True),
+        units(n_pos=200),
+        units(grid=(1, 1)),
+    ):
+        assert not keys & {u.key for u in changed if u.kind == "train"}
+    # unbiased sizes do not touch train shards, and vice versa
+    assert {u.key for u in units(n_unbiased=900) if u.kind == "train"} <= keys
+    assert {u.key for u in units(n_neg=10) if u.kind == "unbiased"} <= keys
+
+    bumped = ExportUnit(**{**base[0].__dict__, "datasets": {**DATASET_VERSIONS, "samples_recipe": 2}})
+    assert bumped.key != base[0].key
+
+
+def test_frontier_source_is_part_of_the_key(monkeypatch):
+    computed = units()
+    from_assets = units(frontier_assets="projects/p/assets/frontier/")
+    assert not {u.key for u in computed} & {u.key for u in from_assets}
+    assert {u.frontier for u in computed} == {"computed"}
+
+    monkeypatch.setitem(sys.modules, "ee", fake_ee)
+    import src.gee.frontier_cache as frontier_cache
+
+    frontier_cache = importlib.reload(frontier_cache)
+    assets = frontier_cache.FrontierAssetCache(BBOX, frontier_cache.LocalAssetStore("projects/p/assets/frontier"))
+    for u in from_assets:
+        assert u.frontier == assets.asset_id(u.year, 500)
+
+
+def test_index_submits_only_new_units_and_assembles(tmp_path):
+    path = tmp_path / "index.json"
+    shards = tmp_path / "shards"
+    shards.mkdir()
+    index = ExportCacheIndex.load(path)
+    header = "A00,label,tYear\n"
+    for u in units():
+        index.record(u, f"run1_{u.key}", task_id="T")
+        rows = "".join(f"{u.tile.ix}.5,{i % 2},{u.year}\n" for i in range(3))
+        (shards / f"run1_{u.key}.csv").write_text(header + rows)
+    index.save()
+
+    # one more train year (another run, another prefix) -> only its two tiles are missing
+    index = ExportCacheIndex.load(path)
+    more = units(train_years=(2018, 2019, 2020))
+    todo = index.missing(more)
+    assert sorted((u.kind, u.year, u.tile.name) for u in todo) == [("train", 2020, "x0y0"), ("train", 2020, "x1y0")]
+    for u in todo:
+        index.record(u, f"run2_{u.key}")
+        (shards / f"run2_{u.key}.csv").write_text(header)  # header-only shard: nothing sampled
+    index.save()
+    assert ExportCacheIndex.load(path).missing(more) == []
+
+    train = [u for u in more if u.kind == "train"]
+    out = tmp_path / "train.csv"
+    assert assemble(index, train, shards, out) == 12
+    lines = out.read_text().splitlines()
+    assert lines[0] == header.strip() and len(lines) == 13
+    assert {line.split(",")[2] for line in lines[1:]} == {"2018", "2019"}
+
+    (shards / f"run1_{train[0].key}.csv").write_text("A00,label\n1,0\n")
+    with pytest.raises(ValueError, match="columns"):
+        assemble(index, train, shards, out)
+    (shards / f"run1_{train[0].key}.csv").unlink()
+    with pytest.raises(ValueError, match="missing"):
+        assemble(index, train, shards, out)
+    with pytest.raises(ValueError, match="not been exported"):
+        assemble(index, units(train_years=(2021,), unbiased_years=()), shards, out)
@@ -1,4 +1,18 @@
-from src.modeling.export_weights import weights_csv, gee_fragment
+import json
+
+import numpy as np
+import pytest
+
+from src.modeling.export_weights import (
+    decode_weights,
+    encode_weights,
+    gee_fragment,
+    load_logit_weights,
+    save_logit_weights,
+    weights_csv,
+    weights_roundtrip_error,
+)
+from src.modeling.train_logit import FEATURE_COLS
 
 
 def test_weights_csv_basic():
@@ -33,3 +47,41 @@ def test_gee_fragment_contains_required_fields():
 
     # your fragments end with a trailing ;
     assert frag.endswith(";")
+
+
+def test_gee_fragment_frontier_asset_is_optional():
+    assert "frontierAsset" not in gee_fragment(w=[0.1] * 66, b=None)
+    frag = gee_fragment(w=[0.1] * 66, b=None, frontierAsset="projects/p/assets/frontier/frontier_2022_s500")
+    assert "frontierAsset=projects%2Fp%2Fassets%2Ffrontier%2Ffrontier_2022_s500;" in frag
+
+
+def test_gee_fragment_lists_bands_of_pruned_models():
+    assert "bands=" not in gee_fragment(w=[0.1] * 66, b=None, bands=FEATURE_COLS)
+    frag = gee_fragment(w=[0.5, -0.25], b=None, bands=["A03", "dist_to_road_m"])
+    assert "bands=A03,dist_to_road_m;" in frag and frag.endswith("w=0.5,-0.25;")
+
+
+def test_compact_weight_encodings_roundtrip(tmp_path):
+    w = list(np.random.default_rng(0).normal(scale=10, size=66)) + [-2.46e-5, 0.0]
+    assert np.array_equal(decode_weights(encode_weights(w, "f32")), np.float32(w).astype(np.float64))
+    f16 = decode_weights(encode_weights(w, "f16"))
+    assert f16[-1] == 0.0 and abs(f16[-2] + 2.46e-5) < 1e-3 * 2.46e-5  # scaled: small weights keep precision
+    assert np.abs(f16 - w).max() <= 1e-3 * np.abs(w).max()
+    assert list(decode_weights(encode_weights([0.0, 0.0], "f16"))) == [0.0, 0.0]
+
+    r32, r16 = weights_roundtrip_error(w, "f32"), weights_roundtrip_error(w, "f16")
+    assert r32["max_rel_err"] < 1e-7 and r16["max_rel_err"] < 1e-3
+    assert r16["chars"] < r32["chars"] < r32["text_chars"] / 2
+
+    save_logit_weights(w, -1.5, tmp_path / "w.json", encoding="f16")
+    w2, b2 = load_logit_weights(tmp_path / "w.json")
+    assert b2 == -1.5 and np.allclose(w2, f16)
+
+    frag = gee_fragment(w=w, b=-1.5, encoding="f32")
+    assert ";wz=F" in frag and ";w=" not in frag
+    with pytest.raises(ValueError):
+        encode_weights(w, "f8")
+
+    (tmp_path / "empty.json").write_text(json.dumps({"b": 0.5}))
+    with pytest.raises(ValueError, match="'w' or 'wz'"):
+        load_logit_weights(tmp_path / "empty.json")
@@ -0,0 +1,76 @@
+import importlib
+import sys
+
+import pytest
+
+import fake_ee
+
+BBOX = [-63.5, -10.5, -61.5, -8.5]
+
+
+@pytest.fixture
+def modules(monkeypatch):
+    monkeypatch.setitem(sys.modules, "ee", fake_ee)
+    import src.gee.frontier_cache as frontier_cache
+    import src.gee.sampling as sampling
+
+    sampling = importlib.reload(sampling)
+    return importlib.reload(frontier_cache), sampling
+
+
+def test_asset_name_is_deterministic(modules):
+    fc, _ = modules
+    a = fc.frontier_asset_name(2020, BBOX, 500, 100_000, None)
+    assert a == fc.frontier_asset_name(2020, [float(v) for v in BBOX], 500.0, 100000.0, None)
+    assert a.startswith("frontier_2020_s500_r100000_nfnone_")
+    assert all(ch.isalnum() or ch in "_-" for ch in a)
+
+    others = {
+        fc.frontier_asset_name(2021, BBOX, 500),
+        fc.frontier_asset_name(2020, BBOX, 250),
+        fc.frontier_asset_name(2020, BBOX, 500, 50_000),
+        fc.frontier_asset_name(2020, BBOX, 500, 100_000, 2.5),
+        fc.frontier_asset_name(2020, [-63.5, -10.5, -61.5, -8.4], 500),
+    }
+    assert a not in others and len(others) == 5
+    assert "nf2p5" in fc.frontier_asset_name(2020, BBOX, 500, 100_000, 2.5)
+
+
+def test_sampling_reads_exported_asset(modules):
+    fc, sampling = modules
+    assets = fc.FrontierAssetCache(BBOX, fc.LocalAssetStore("projects/p/assets/frontier"))
+    region = fake_ee.Geometry.Rectangle(BBOX)
+
+    assert assets.missing([2019, 2020, 2019], 500) == [2019, 2020]
+    tasks = assets.export_missing([2019], 500)
+    assert list(tasks) == [2019]
+    assert assets.missing([2019, 2020], 500) == [2020]
+
+    cache = sampling.ImageCache(assets=assets)
+    img = sampling.sampling_image_for_year(2019, region, 500, use_stable_label=False, cache=cache)
+    assert assets.hits == 1
+
+    asset_id = assets.asset_id(2019, 500)
+    graph = fake_ee.serializer.encode(img)
+    ops = [v["functionInvocationValue"]["functionName"] for v in graph["values"].values()]
+    assert "fastDistanceTransform" not in ops and "distance" not in ops
+    assert {"constantValue": asset_id} in [
+        v["functionInvocationValue"]["arguments"].get("arg0") for v in graph["values"].values()
+    ]
+
+    # No asset for 2020 with these parameters: computed as before.
+    img = sampling.sampling_image_for_year(2020, region, 500, use_stable_label=False, cache=cache)
+    ops = [v["functionInvocationValue"]["functionName"] for v in fake_ee.serializer.encode(img)["values"].values()]
+    assert "fastDistanceTransform" in ops and assets.misses == 1
+
+
+def test_asset_parameters_must_match(modules):
+    fc, sampling = modules
+    assets = fc.FrontierAssetCache(BBOX, fc.LocalAssetStore())
+    assets.export(2019, 500, nf_max_km=5)
+    region = fake_ee.Geometry.Rectangle(BBOX)
+
+    sampling.frontier_features_for_year(2019, region, 500, cache=sampling.ImageCache(assets=assets))
+    assert assets.hits == 0
+    sampling.frontier_features_for_year(2019, region, 500, nf_max_km=5, cache=sampling.ImageCache(assets=assets))
+    assert assets.hits == 1
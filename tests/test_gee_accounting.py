@@ -0,0 +1,69 @@
+import importlib
+import sys
+
+import pytest
+
+import fake_ee
+
+# Distinct invocations / serialized bytes for one year's sampling image (cached or not,
+# the serializer hash-conses equal subexpressions). Raise deliberately, not by drift.
+SAMPLING_GRAPH_BUDGET = {
+    True: {"nodes": 96, "bytes": 13_000},  # stable label
+    False: {"nodes": 72, "bytes": 10_000},  # basic label
+}
+
+
+@pytest.fixture
+def ee_modules(monkeypatch):
+    monkeypatch.setitem(sys.modules, "ee", fake_ee)
+    import src.gee.accounting as accounting
+    import src.gee.sampling as sampling
+
+    return importlib.reload(accounting), importlib.reload(sampling)
+
+
+@pytest.mark.parametrize("stable", [True, False])
+def test_sampling_image_graph_budget(ee_modules, stable):
+    accounting, sampling = ee_modules
+    region = fake_ee.Geometry.Rectangle([-63.5, -10.5, -61.5, -8.5])
+    budget = SAMPLING_GRAPH_BUDGET[stable]
+
+    for cache in (None, sampling.ImageCache()):
+        img = sampling.sampling_image_for_year(2019, region, 500, use_stable_label=stable, cache=cache)
+        stats = accounting.graph_stats(img)
+        assert stats.nodes <= budget["nodes"]
+        assert stats.bytes <= budget["bytes"]
+        assert stats.expanded_nodes >= stats.nodes
+
+
+def test_graph_stats_flags_outermost_duplicate(ee_modules):
+    accounting, _ = ee_modules
+    region = fake_ee.Geometry.Rectangle([0, 0, 1, 1])
+    # Built twice as separate objects: the serialized graph still shares one copy.
+    a = fake_ee.Image("x").unmask(0).clip(region)
+    b = fake_ee.Image("x").unmask(0).clip(region)
+    stats = accounting.graph_stats(a.add(b))
+
+    assert [(d.function, d.refs) for d in stats.duplicates] == [("clip", 2)]
+    assert stats.expanded_nodes > stats.nodes
+
+
+def test_request_accounting_counts_and_reports(ee_modules):
+    accounting, sampling = ee_modules
+    region = fake_ee.Geometry.Rectangle([-63.5, -10.5, -61.5, -8.5])
+    acct = accounting.RequestAccounting()
+
+    bands = acct.get_info(sampling.aef_for_year(2019, region).bandNames(), "bandNames")
+    assert bands == fake_ee.AEF_BANDS
+    fc = sampling.stratified_samples_for_year(2019, region, 10, 10, 500, 42, True)
+    acct.call("start", "train_2019", lambda: "task", obj=fc)
+
+    assert acct.count("getInfo") == 1 and acct.count("start") == 1
+    assert all(r.seconds is not None and r.graph.bytes > 0 for r in acct.records)
+    summary = acct.to_dict()
+    assert summary["calls"] == {"getInfo": 1, "start": 1}
+    assert "DUPLICATE train_2019" in acct.report()
+
+    lean = accounting.RequestAccounting(analyze=False)
+    lean.get_info(sampling.aef_for_year(2019, region).bandNames(), "bandNames")
+    assert lean.records[0].graph is None
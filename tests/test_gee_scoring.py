@@ -0,0 +1,78 @@
+import importlib
+import json
+import sys
+
+import pytest
+
+import fake_ee
+from src.modeling.train_logit import FEATURE_COLS
+
+REGION = [-63.5, -10.5, -61.5, -8.5]
+
+
+@pytest.fixture
+def modules(monkeypatch):
+    monkeypatch.setitem(sys.modules, "ee", fake_ee)
+    import src.gee.accounting as accounting
+    import src.gee.sampling as sampling
+    import src.gee.scoring as scoring
+
+    importlib.reload(sampling)
+    return importlib.reload(scoring), importlib.reload(accounting)
+
+
+def _ops(img):
+    values = fake_ee.serializer.encode(img)["values"].values()
+    return [v["functionInvocationValue"] for v in values]
+
+
+def _write(tmp_path, w, b, feature_cols=None):
+    obj = {"w": w, "b": b}
+    if feature_cols is not None:
+        obj["feature_cols"] = feature_cols
+    path = tmp_path / "w.json"
+    path.write_text(json.dumps(obj))
+    return path
+
+
+def test_score_image_for_year_dot_product_and_mask(modules, tmp_path):
+    scoring, _ = modules
+    w = [0.01 * i for i in range(len(FEATURE_COLS))]
+    path = _write(tmp_path, w, -1.5)
+    img = scoring.score_image_for_year(path, 2022, fake_ee.Geometry.Rectangle(REGION))
+    unmasked = scoring.score_image_for_year(path, 2022, fake_ee.Geometry.Rectangle(REGION), forest_only=False)
+
+    calls = _ops(img)
+    names = [c["functionName"] for c in calls]
+    assert names.count("arrayDotProduct") == 1
+    assert names.count("updateMask") == [c["functionName"] for c in _ops(unmasked)].count("updateMask") + 1
+    assert "reduce" not in names  # no per-band multiply + sum
+    const = next(c for c in calls if c["functionName"] == "Image.constant")
+    assert [v["constantValue"] for v in const["arguments"]["arg0"]["arrayValue"]["values"]] == w
+    selects = [c["arguments"]["arg1"] for c in calls if c["functionName"] == "select"]
+    assert {"arrayValue": {"values": [{"constantValue": c} for c in FEATURE_COLS]}} in selects
+    renames = {c["arguments"]["arg1"]["constantValue"] for c in calls if c["functionName"] == "rename"}
+    assert {"score", "prob"} <= renames
+
+
+def test_embedding_only_model_skips_frontier(modules, tmp_path):
+    scoring, _ = modules
+    cols = FEATURE_COLS[:64]
+    path = _write(tmp_path, [0.1] * 64, None, cols)
+    img = scoring.score_image_for_year(path, 2022, fake_ee.Geometry.Rectangle(REGION), forest_only=False)
+
+    names = [c["functionName"] for c in _ops(img)]
+    assert "fastDistanceTransform" not in names and "distance" not in names
+    assert "updateMask" not in names and "add" in names  # sigmoid only; no intercept
+
+
+def test_score_graph_no_larger_than_js_formulation(modules):
+    scoring, accounting = modules
+    w = [0.1] * 66
+    X = fake_ee.Image("X").select(FEATURE_COLS)
+    # the map loader's formulation, with the same output bands
+    js = X.multiply(fake_ee.Image.constant(w).rename(FEATURE_COLS)).reduce(fake_ee.Reducer.sum()).add(-1.0)
+    js = js.rename("score")
+    js = js.addBands(js.multiply(-1).exp().add(1).pow(-1).rename("prob")).toFloat()
+    ours = scoring.score_image(X, w, -1.0)
+    assert accounting.graph_stats(ours).nodes <= accounting.graph_stats(js).nodes
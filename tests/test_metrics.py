@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from src.modeling.metrics import MetricsAccumulator, RankedScores, eval_probs, evaluate, summarize_at_threshold, topk_report
+
+
+def make_scores(n=5000, pos_rate=0.05, seed=0, ties=False):
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n) < pos_rate).astype(int)
+    p = 1 / (1 + np.exp(-(rng.normal(size=n) + 1.5 * y - 3)))
+    if ties:
+        p = np.round(p, 2)
+        p[:50] = 0.0  # below the 1e-6 clip
+    return y, p
+
+
+def assert_dicts_close(a, b):
+    assert a.keys() == b.keys()
+    for k in a:
+        if isinstance(a[k], float):
+            assert a[k] == pytest.approx(b[k], rel=1e-10, abs=1e-12, nan_ok=True), k
+        else:
+            assert a[k] == b[k], k
+
+
+@pytest.mark.parametrize("ties", [False, True])
+def test_ranked_scores_match_reference_metrics(ties):
+    y, p = make_scores(ties=ties)
+    r = RankedScores(y, p)
+
+    assert_dicts_close(r.eval_probs(name="x"), eval_probs(y, p, name="x"))
+
+    for thr in (0.01, 0.05, 0.2, 0.5):
+        assert_dicts_close(r.summarize_at_threshold(thr, name="x"), summarize_at_threshold(y, p, thr, name="x"))
+
+    ks = (1, 2, 5, 10, 33)
+    for got, ref in zip(r.topk_report(ks), topk_report(y, p, ks)):
+        assert got == ref
+
+
+def test_threshold_sweep_and_evaluate_bundle():
+    y, p = make_scores(n=2000, seed=3)
+    thrs = np.linspace(0, 1, 11)
+    sweep = RankedScores(y, p).threshold_sweep(thrs)
+    assert [s["thr"] for s in sweep] == pytest.approx(list(thrs))
+    assert all(s["tn"] + s["fp"] + s["fn"] + s["tp"] == len(y) for s in sweep)
+
+    out = evaluate(y, p, name="u", thresholds=[0.5], top_k_list=(1, 5))
+    assert out["probs"]["name"] == "u"
+    assert len(out["thresholds"]) == 1 and len(out["topk"]) == 2
+
+
+def test_ranked_scores_single_class_auc_is_nan():
+    y = np.zeros(10, dtype=int)
+    p = np.linspace(0.1, 0.9, 10)
+    out = RankedScores(y, p).eval_probs()
+    assert np.isnan(out["roc_auc"]) and np.isnan(out["pr_auc"])
+
+
+def test_metrics_accumulator_within_bounds_and_mergeable():
+    y, p = make_scores(n=40_000, seed=5)
+    exact = RankedScores(y, p)
+    ref = exact.eval_probs()
+
+    parts = []
+    for i in range(4):
+        sl = slice(i * 10_000, (i + 1) * 10_000)
+        parts.append(MetricsAccumulator().update(y[sl], p[sl]))
+    acc = parts[0]
+    for other in parts[1:]:
+        acc.merge(other)
+
+    out = acc.eval_probs()
+    assert out["n"] == ref["n"]
+    assert out["pos_rate"] == pytest.approx(ref["pos_rate"])
+    assert out["logloss"] == pytest.approx(ref["logloss"])
+    assert out["brier"] == pytest.approx(ref["brier"])
+    assert abs(out["roc_auc"] - ref["roc_auc"]) <= out["roc_auc_err"] + 1e-12
+    assert out["roc_auc_err"] < 1e-3
+    assert out["pr_auc_lo"] - 1e-12 <= ref["pr_auc"] <= out["pr_auc_hi"] + 1e-12
+
+    for got, want in zip(acc.topk_report((1, 5, 10)), exact.topk_report((1, 5, 10))):
+        assert got["capture_lo"] - 1e-3 <= want["capture"] <= got["capture_hi"] + 1e-3
+        assert got["thr"] == pytest.approx(want["thr"], rel=0.02)
+
+    calib = acc.calibration()
+    assert sum(c["n"] for c in calib) == len(y)
+
+    one_shot = MetricsAccumulator().update(y, p)
+    np.testing.assert_array_equal(one_shot.pos, acc.pos)
+    np.testing.assert_array_equal(one_shot.neg, acc.neg)
+
+
+def test_metrics_accumulator_topk_budget_matches_exact_selection_on_small_samples():
+    # few rows: the exact report keeps p >= np.quantile(p, 1 - k/100), which is
+    # more than k% of n; the accumulator sizes its budget the same way
+    for seed in range(20):
+        y, p = make_scores(n=37, seed=seed)
+        acc = MetricsAccumulator().update(y, p)
+        for got, want in zip(acc.topk_report((1, 5, 10, 20)), RankedScores(y, p).topk_report((1, 5, 10, 20))):
+            assert got["capture_lo"] - 1e-9 <= want["capture"] <= got["capture_hi"] + 1e-9
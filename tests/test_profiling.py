@@ -0,0 +1,60 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src import profiling
+from src.modeling.train_logit import train_from_csv
+
+from test_train_logit import make_df
+
+
+@pytest.fixture
+def prof():
+    p = profiling.enable()
+    yield p
+    profiling.disable()
+
+
+def test_span_is_noop_when_disabled():
+    assert profiling.active() is None
+    with profiling.span("x", rows=1) as sp:
+        sp.set(n_iter=3)
+    assert profiling.active() is None
+
+
+def test_nested_spans_and_chrome_trace(prof, tmp_path: Path):
+    with profiling.span("outer"):
+        for _ in range(3):
+            with profiling.span("inner", rows=10) as sp:
+                sp.set(n_iter=2)
+
+    by_name = {e["name"]: e for e in prof.events}
+    assert by_name["outer"]["depth"] == 0 and by_name["inner"]["depth"] == 1
+    assert by_name["inner"]["path"] == "outer/inner"
+    assert by_name["inner"]["args"] == {"rows": 10, "n_iter": 2}
+
+    out = tmp_path / "trace.json"
+    prof.save(out)
+    trace = json.loads(out.read_text())
+    spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [e["name"] for e in spans] == ["outer", "inner", "inner", "inner"]
+    outer = spans[0]
+    for e in spans[1:]:
+        assert outer["ts"] <= e["ts"] and e["ts"] + e["dur"] <= outer["ts"] + outer["dur"]
+        assert "cpu_s" in e["args"]
+
+    lines = prof.summary().splitlines()
+    inner = next(line for line in lines if line.strip().startswith("inner"))
+    assert inner.split()[1] == "3"  # three calls summed into one row
+
+
+def test_train_from_csv_records_stages(prof, tmp_path: Path):
+    csv = tmp_path / "train.csv"
+    make_df(n=300, pos_rate=0.35).to_csv(csv, index=False)
+    train_from_csv(train_csv=csv, train_years=[2018, 2019], test_year=2020)
+
+    names = {e["name"]: e for e in prof.events}
+    for stage in ("read_csv", "filter_years", "load_xy", "scale", "lbfgs"):
+        assert stage in names
+    assert names["lbfgs"]["args"]["n_iter"] > 0
@@ -0,0 +1,126 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.modeling.export_weights import save_logit_weights
+from src.modeling.metrics import eval_probs
+from src.modeling.quantize import AEF_BANDS, BandQuantizer, quantize_stack
+from src.modeling.sample_store import ingest_csv
+from src.modeling.train_logit import FEATURE_COLS, RunningMoments, standardize_inplace, train_from_store, train_lean
+from src.raster.score import score_raster
+
+
+def make_samples(n=6000, seed=0) -> pd.DataFrame:
+    """Unit-norm-ish embeddings and km-scale distances with a planted logistic signal."""
+    rng = np.random.default_rng(seed)
+    A = rng.normal(size=(n, 64))
+    A /= np.linalg.norm(A, axis=1, keepdims=True)
+    D = rng.uniform(0, 50_000, size=(n, 2))
+    w = rng.normal(size=64) * 6
+    z = A @ w - D @ np.array([2e-5, 1e-5]) + 0.3
+    df = pd.DataFrame(np.column_stack([A, D]).astype(np.float32), columns=FEATURE_COLS)
+    df["label"] = (rng.random(n) < 1 / (1 + np.exp(-z))).astype(int)
+    df["tYear"] = rng.choice([2018, 2019, 2020], size=n)
+    return df
+
+
+@pytest.fixture
+def stores(tmp_path: Path):
+    df = make_samples()
+    df.to_csv(tmp_path / "s.csv", index=False)
+    f = ingest_csv(tmp_path / "s.csv", tmp_path / "f32", chunksize=1000)
+    q = ingest_csv(tmp_path / "s.csv", tmp_path / "q8", chunksize=1000, quantize=True)
+    return df, f, q
+
+
+def test_codes_roundtrip_and_fold():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(500, 3)).astype(np.float32) * [1, 10, 0]
+    X[3, 1] = np.nan
+    q = BandQuantizer.fit(X, ["a", "b", "c"])
+    Q = q.encode(X)
+    assert Q.dtype == np.int8 and Q[3, 1] == -128 and np.abs(Q).max() <= 127
+    D = q.decode(Q)
+    assert np.isnan(D[3, 1])
+    ok = ~np.isnan(X)
+    assert np.all(np.abs(D - X)[ok] <= q.max_error()[np.nonzero(ok)[1]] * 1.0001)
+
+    Qv = np.delete(Q, 3, axis=0)
+    m = q.code_moments(Qv)
+    ref = RunningMoments().update(q.decode(Qv))
+    np.testing.assert_allclose(m.mean, ref.mean, atol=1e-6)
+    np.testing.assert_allclose(m.m2, ref.m2, rtol=1e-6)
+
+    w = np.array([0.5, -0.2, 3.0])
+    wq, bq = q.fold(w, 1.5, ["a", "b", "c"])
+    np.testing.assert_allclose(Qv @ wq + bq, q.decode(Qv).astype(np.float64) @ w + 1.5, atol=1e-5)
+
+
+def test_quantized_store_layout_and_reads(stores):
+    df, f, q = stores
+    assert q.quantizer.bands == AEF_BANDS and f.quantizer is None
+    Q, F, _ = q.partition_codes(2019)
+    assert Q.dtype == np.int8 and Q.shape[1] == 64 and F.dtype == np.float32 and F.shape[1] == 2
+
+    size = lambda s: sum(p.stat().st_size for p in s.path.rglob("X*.npy"))  # noqa: E731
+    assert size(f) > 3.5 * size(q)
+
+    Xf, yf = f.load_xy([2018, 2020])
+    Xq, yq = q.load_xy([2018, 2020])
+    np.testing.assert_array_equal(yf, yq)
+    np.testing.assert_array_equal(Xq[:, 64:], Xf[:, 64:])  # distances stay float32
+    assert np.abs(Xq[:, :64] - Xf[:, :64]).max() <= q.quantizer.max_error().max() * 1.0001
+
+    cols = ["dist_to_road_m", "A05", "A01"]
+    np.testing.assert_array_equal(q.load_xy([2019], feature_cols=cols)[0], q.load_xy([2019])[0][:, [65, 5, 1]])
+    chunks = list(q.iter_chunks([2018, 2020], chunk_rows=700, feature_cols=cols))
+    np.testing.assert_array_equal(np.concatenate([c[0] for c in chunks]), Xq[:, [65, 5, 1]])
+
+    # fused decode + standardize == decode, then standardize
+    Xs, ys, moments = q.load_standardized([2018, 2020])
+    ref = Xq.copy()
+    ref_m = standardize_inplace(ref)
+    np.testing.assert_allclose(moments.mean, ref_m.mean, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(Xs, ref, atol=2e-5)
+    np.testing.assert_array_equal(ys, yq)
+
+
+def test_quantized_training_metrics_unchanged(stores):
+    df, f, q = stores
+    ev = df[df["tYear"] == 2020]
+    X_ev, y_ev = ev[FEATURE_COLS].to_numpy(np.float32), ev["label"].to_numpy()
+
+    metrics = {}
+    for name, store in (("f32", f), ("q8", q)):
+        res, _ = train_from_store(store.path, [2018, 2019], test_year=2020)
+        lean, _ = train_lean(store.path, [2018, 2019], test_year=2020)
+        np.testing.assert_allclose(lean.w_raw, res.w_raw, rtol=1e-3, atol=1e-3 * np.abs(res.w_raw).max())
+        metrics[name] = eval_probs(y_ev, res.model.predict_proba(X_ev)[:, 1])
+
+    assert metrics["f32"]["roc_auc"] > 0.8
+    for k in ("roc_auc", "pr_auc", "logloss", "brier"):
+        assert abs(metrics["q8"][k] - metrics["f32"][k]) < 1e-3, k
+
+
+def test_score_raster_on_quantized_stack(tmp_path: Path):
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(len(FEATURE_COLS), 29, 17)).astype(np.float32)
+    X[-2:] = rng.uniform(0, 30_000, size=(2, 29, 17))
+    X[4, 3, 3] = np.nan
+    np.save(tmp_path / "stack.npy", X)
+    w = rng.normal(size=len(FEATURE_COLS)) * 0.1
+    w[-2:] = [-1e-4, -2e-5]
+    save_logit_weights(w, -0.7, tmp_path / "w.json", feature_cols=FEATURE_COLS)
+
+    qz = quantize_stack(tmp_path / "stack.npy", tmp_path / "stack_q8.npy")
+    assert np.load(tmp_path / "stack_q8.npy").dtype == np.int8
+    score_raster(tmp_path / "w.json", tmp_path / "stack.npy", tmp_path / "ref.npy", block_rows=8)
+    score_raster(tmp_path / "w.json", tmp_path / "stack_q8.npy", tmp_path / "q.npy", block_rows=8)
+    ref, out = np.load(tmp_path / "ref.npy"), np.load(tmp_path / "q.npy")
+
+    assert np.isnan(out[0, 3, 3]) and np.isnan(ref[0, 3, 3])
+    bound = float(np.abs(w) @ qz.max_error()) * 1.01
+    np.testing.assert_allclose(out[0], ref[0], atol=bound, equal_nan=True)
+    assert np.nanmax(np.abs(out[1] - ref[1])) < 0.01
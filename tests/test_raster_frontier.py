@@ -0,0 +1,82 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.raster.frontier import frontier_features, load_road_segments
+
+
+PIX = 500.0
+
+
+def make_lc(tmp_path: Path, rows=53, cols=41, seed=0):
+    rng = np.random.default_rng(seed)
+    lc = np.full((rows, cols), 2, dtype=np.uint8)  # evergreen broadleaf
+    blobs = rng.random((rows, cols)) > 0.985
+    lc[blobs] = 12  # cropland
+    lc[:3, :5] = 255  # fill value
+    np.save(tmp_path / "lc.npy", lc)
+    return lc
+
+
+def brute_nonforest(lc, max_px=None):
+    rows, cols = lc.shape
+    src = np.argwhere((lc >= 1) & (lc <= 17) & (lc > 5)).astype(float)
+    rr, cc = np.mgrid[:rows, :cols]
+    d = np.sqrt(((rr[..., None] - src[:, 0]) ** 2 + (cc[..., None] - src[:, 1]) ** 2).min(axis=-1))
+    if max_px is not None:
+        d[d > max_px] = np.nan
+    d = d * PIX
+    d[(lc < 1) | (lc > 5)] = np.nan
+    return d
+
+
+@pytest.mark.parametrize("tile,workers", [(16, 2), (1000, 1)])
+def test_tiled_distance_to_nonforest_matches_brute_force(tmp_path: Path, tile, workers):
+    lc = make_lc(tmp_path)
+    frontier_features(tmp_path / "lc.npy", tmp_path / "f.npy", pixel_m=PIX, tile=tile, n_workers=workers)
+    out = np.load(tmp_path / "f.npy")
+
+    assert out.shape == (2,) + lc.shape and out.dtype == np.float32
+    np.testing.assert_allclose(out[0], brute_nonforest(lc), rtol=1e-6)
+    assert np.isnan(out[1]).all()  # no roads given
+
+    frontier_features(tmp_path / "lc.npy", tmp_path / "c.npy", pixel_m=PIX, nf_max_km=2.0, tile=tile, n_workers=workers)
+    capped = np.load(tmp_path / "c.npy")[0]
+    np.testing.assert_allclose(capped, np.minimum(brute_nonforest(lc), 2000.0), rtol=1e-6)
+
+
+def test_distance_to_road_honours_search_radius(tmp_path: Path):
+    make_lc(tmp_path, rows=40, cols=30)
+    x0, y0 = 100_000.0, 9_000_000.0
+    # a horizontal road through the middle of row 10, and one that starts off-raster to the left
+    roads = {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "LineString", "coordinates": [[x0 - 5000, y0 - 10.5 * PIX], [x0 + 40 * PIX, y0 - 10.5 * PIX]]}},
+            {"type": "Feature", "geometry": {"type": "MultiLineString", "coordinates": [[[x0 - 3000, y0 - 35.5 * PIX], [x0 - 1000, y0 - 35.5 * PIX]]]}},
+        ],
+    }
+    (tmp_path / "roads.geojson").write_text(json.dumps(roads))
+    assert load_road_segments(tmp_path / "roads.geojson").shape == (2, 4)
+
+    for tile in (7, 100):
+        frontier_features(
+            tmp_path / "lc.npy",
+            tmp_path / f"f{tile}.npy",
+            roads=tmp_path / "roads.geojson",
+            transform=(x0, y0, PIX),
+            road_search_radius_m=6000,
+            tile=tile,
+            n_workers=1,
+        )
+    d = np.load(tmp_path / "f7.npy")[1]
+    np.testing.assert_array_equal(d, np.load(tmp_path / "f100.npy")[1])
+
+    rr, cc = np.mgrid[:40, :30]
+    to_main = np.abs(rr - 10) * PIX
+    to_side = np.hypot(rr - 35, cc + 2) * PIX  # off-raster road ends two pixels left of column 0
+    expected = np.minimum(to_main, to_side)
+    expected[expected > 6000] = np.nan
+    np.testing.assert_allclose(d, expected, rtol=1e-6)
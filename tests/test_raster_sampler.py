@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.modeling.sample_store import ingest_csv
+from src.modeling.train_logit import FEATURE_COLS
+from src.raster.sampler import Reservoir, pixel_keys, stratified_sample_stack
+
+
+def make_stack(tmp_path: Path, rows=60, cols=41, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(len(FEATURE_COLS), rows, cols)).astype(np.float32)
+    X[7, :2] = np.nan
+    y = (rng.random((rows, cols)) < 0.05).astype(np.uint8)
+    y[rng.random((rows, cols)) < 0.1] = 255  # nodata
+    forest = (rng.random((rows, cols)) < 0.6).astype(np.uint8)
+    np.save(tmp_path / "stack.npy", X)
+    np.save(tmp_path / "labels.npy", y)
+    np.save(tmp_path / "forest.npy", forest)
+    return X, y, forest
+
+
+def run(tmp_path, **kw):
+    args = dict(n_neg=300, n_pos=500, seed=42, mask=tmp_path / "forest.npy", n_unbiased=200)
+    args.update(kw)
+    return stratified_sample_stack(tmp_path / "stack.npy", tmp_path / "labels.npy", 2020, **args)
+
+
+def test_sample_matches_export_layout_and_stack(tmp_path: Path):
+    X, y, forest = make_stack(tmp_path)
+    res = run(tmp_path, block_rows=7, n_workers=3)
+    train, unb = res.train, res.unbiased
+    flat_X = X.reshape(len(FEATURE_COLS), -1).T
+    flat_y = y.reshape(-1)
+    valid = ~np.isnan(flat_X).any(axis=1) & (flat_y <= 1)
+
+    assert list(train.columns) == FEATURE_COLS + ["label", "tYear"]
+    assert list(unb.columns) == FEATURE_COLS + ["label", "tYear", "unbiased"]
+    assert (train["label"] == 0).sum() == 300
+    assert (train["label"] == 1).sum() == int((valid & (flat_y == 1)).sum())  # fewer positives than asked: all
+    assert len(unb) == 200 and (unb["unbiased"] == 1).all() and (train["tYear"] == 2020).all()
+
+    for df in (train, unb):
+        pix = df.index.to_numpy()
+        assert valid[pix].all() and len(set(pix)) == len(pix)
+        np.testing.assert_array_equal(df[FEATURE_COLS].to_numpy(), flat_X[pix])
+        np.testing.assert_array_equal(df["label"].to_numpy(), flat_y[pix])
+    assert forest.reshape(-1)[unb.index.to_numpy()].all()
+
+    # the CSV ingests like an Earth Engine export
+    train.to_csv(tmp_path / "train.csv", index=False)
+    store = ingest_csv([tmp_path / "train.csv"], tmp_path / "store")
+    assert store.years == [2020] and store.n_rows() == len(train)
+
+
+def test_sample_is_independent_of_blocking_and_seeded(tmp_path: Path):
+    make_stack(tmp_path)
+    a = run(tmp_path, block_rows=5, n_workers=4)
+    b = run(tmp_path, block_rows=1000, n_workers=1)
+    pd.testing.assert_frame_equal(a.train, b.train)
+    pd.testing.assert_frame_equal(a.unbiased, b.unbiased)
+
+    c = run(tmp_path, seed=43)
+    neg = lambda r: set(r.train.index[r.train["label"] == 0])  # noqa: E731
+    assert neg(a) != neg(c)
+    assert set(a.unbiased.index) != set(c.unbiased.index)
+
+    with pytest.raises(ValueError, match="forest mask"):
+        run(tmp_path, mask=None)
+
+
+def test_reservoir_merge_is_uniform_bottom_k():
+    n, k = 20_000, 500
+    idx = np.arange(n)
+    keys = pixel_keys(7, idx)
+    rows = idx[:, None].astype(np.float32)
+
+    whole = Reservoir(k, 1).offer(keys, idx, rows)
+    parts = [Reservoir(k, 1).offer(keys[s], idx[s], rows[s]) for s in np.array_split(idx, 9)]
+    merged = Reservoir(k, 1)
+    for part in reversed(parts):
+        merged.merge(part)
+    assert set(merged.index) == set(whole.index) == set(np.argsort(keys)[:k])
+
+    # uniform keys: the sampled indices look like a uniform draw
+    assert abs(whole.index.mean() / n - 0.5) < 0.05
+    assert abs(keys.mean() - 0.5) < 0.01
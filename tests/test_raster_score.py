@@ -0,0 +1,158 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.modeling.export_weights import save_logit_weights
+from src.modeling.metrics import RankedScores
+from src.modeling.train_logit import FEATURE_COLS
+import src.raster.score as score_mod
+from src.raster.score import output_paths, score_models, score_raster
+
+
+def make_stack(tmp_path: Path, rows=37, cols=23, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(len(FEATURE_COLS), rows, cols)).astype(np.float32)
+    X[-2:] = rng.uniform(0, 30_000, size=(2, rows, cols))
+    X[5, 0, 0] = np.nan
+    mask = (rng.random((rows, cols)) > 0.3).astype(np.uint8)
+    np.save(tmp_path / "stack.npy", X)
+    np.save(tmp_path / "forest.npy", mask)
+    w = rng.normal(size=len(FEATURE_COLS)) * 0.1
+    w[-2:] = [-1e-4, -2e-5]
+    save_logit_weights(w, -0.7, tmp_path / "w.json", feature_cols=FEATURE_COLS)
+    return X, mask, w
+
+
+@pytest.mark.parametrize("block_rows,workers", [(5, 3), (1000, 1)])
+def test_score_raster_matches_dense_formula(tmp_path: Path, block_rows, workers):
+    X, mask, w = make_stack(tmp_path)
+    stats = score_raster(
+        tmp_path / "w.json",
+        tmp_path / "stack.npy",
+        tmp_path / "risk.npy",
+        mask=tmp_path / "forest.npy",
+        block_rows=block_rows,
+        n_workers=workers,
+    )
+
+    out = np.load(tmp_path / "risk.npy")
+    assert out.shape == (2,) + mask.shape and out.dtype == np.float32
+
+    ref = np.tensordot(w, X.astype(np.float64), axes=1) - 0.7
+    ref[mask == 0] = np.nan
+    np.testing.assert_allclose(out[0], ref, rtol=1e-4, atol=1e-4, equal_nan=True)
+    np.testing.assert_allclose(out[1], 1 / (1 + np.exp(-ref)), atol=1e-5, equal_nan=True)
+    assert np.isnan(out[0, 0, 0])
+    assert stats["n_scored"] == int(np.count_nonzero(~np.isnan(ref)))
+
+
+def test_score_raster_selects_named_bands(tmp_path: Path):
+    X, mask, w = make_stack(tmp_path)
+    cols = ["A03", "dist_to_road_m"]
+    save_logit_weights([0.5, -1e-4], 0.1, tmp_path / "small.json", feature_cols=cols)
+
+    score_raster(tmp_path / "small.json", tmp_path / "stack.npy", tmp_path / "small.npy")
+    out = np.load(tmp_path / "small.npy")
+    ref = 0.5 * X[3] - 1e-4 * X[-1] + 0.1
+    np.testing.assert_allclose(out[0], ref, rtol=1e-5, atol=1e-5)
+
+    save_logit_weights([1.0], None, tmp_path / "bad.json", feature_cols=["nope"])
+    with pytest.raises(ValueError, match="missing bands"):
+        score_raster(tmp_path / "bad.json", tmp_path / "stack.npy", tmp_path / "bad.npy")
+
+
+def test_score_models_single_pass_matches_individual_runs(tmp_path: Path):
+    X, mask, w = make_stack(tmp_path)
+    rng = np.random.default_rng(1)
+    paths = [tmp_path / "w.json"]
+    for j in range(2):
+        p = tmp_path / f"w{j}.json"
+        wj = rng.normal(size=len(FEATURE_COLS)) * 0.1
+        wj[-2:] = [-5e-5, 1e-5]
+        save_logit_weights(wj, 0.2 * j, p, feature_cols=FEATURE_COLS)
+        paths.append(p)
+    labels = (rng.random(mask.shape) < 0.2).astype(np.uint8)
+    np.save(tmp_path / "labels.npy", labels)
+
+    outs = [tmp_path / "multi" / f"m{j}.npy" for j in range(len(paths))]
+    stats = score_models(
+        paths, tmp_path / "stack.npy", outs, mask=tmp_path / "forest.npy", labels=tmp_path / "labels.npy", block_rows=8
+    )
+
+    for j, p in enumerate(paths):
+        score_raster(p, tmp_path / "stack.npy", tmp_path / f"single{j}.npy", mask=tmp_path / "forest.npy")
+        np.testing.assert_allclose(
+            np.load(outs[j]), np.load(tmp_path / f"single{j}.npy"), rtol=1e-5, atol=1e-5, equal_nan=True
+        )
+
+        prob = np.load(outs[j])[1]
+        ok = ~np.isnan(prob)
+        exact = RankedScores(labels[ok], prob[ok]).topk_report((1, 2, 5, 10))
+        summary = stats["models"][j]
+        assert summary["eval"]["n"] == int(ok.sum())
+        for got, want in zip(summary["topk"], exact):
+            assert got["capture_lo"] - 1e-9 <= want["capture"] <= got["capture_hi"] + 1e-9
+
+
+def test_score_models_nan_in_one_models_band_leaves_others_scored(tmp_path: Path):
+    X, mask, _ = make_stack(tmp_path)
+    X[1, 2:6, 3] = np.nan  # A01: only the second model uses it
+    np.save(tmp_path / "stack.npy", X)
+    save_logit_weights([0.8], 0.1, tmp_path / "a00.json", feature_cols=["A00"])
+    save_logit_weights([0.5, -1e-4], -0.2, tmp_path / "a01.json", feature_cols=["A01", "dist_to_road_m"])
+    labels = (np.random.default_rng(2).random(mask.shape) < 0.3).astype(np.uint8)
+    np.save(tmp_path / "labels.npy", labels)
+
+    paths = [tmp_path / "a00.json", tmp_path / "a01.json"]
+    outs = [tmp_path / "pair_a00.npy", tmp_path / "pair_a01.npy"]
+    stats = score_models(paths, tmp_path / "stack.npy", outs, labels=tmp_path / "labels.npy", block_rows=4)
+    for p, out, summary in zip(paths, outs, stats["models"]):
+        alone = score_models([p], tmp_path / "stack.npy", [tmp_path / "alone.npy"], labels=tmp_path / "labels.npy")
+        np.testing.assert_allclose(np.load(out), np.load(tmp_path / "alone.npy"), rtol=1e-6, equal_nan=True)
+        assert summary["n_scored"] == alone["models"][0]["n_scored"]
+        assert summary["eval"] == pytest.approx(alone["models"][0]["eval"])
+
+    assert not np.isnan(np.load(outs[0])[0, 2:6, 3]).any()
+    assert np.isnan(np.load(outs[1])[0, 2:6, 3]).all()
+    assert stats["models"][0]["n_scored"] == mask.size
+    assert stats["models"][1]["n_scored"] == mask.size - 4 == stats["n_scored"] - 4
+
+
+def test_score_models_closes_writers_when_a_block_fails(tmp_path: Path, monkeypatch):
+    make_stack(tmp_path)
+    closed = []
+
+    class FailingWriter(score_mod.RasterWriter):
+        def write(self, r0, block):
+            raise RuntimeError("disk full")
+
+        def close(self):
+            closed.append(self)
+            super().close()
+
+    monkeypatch.setattr(score_mod, "RasterWriter", FailingWriter)
+    outs = [tmp_path / "a.npy", tmp_path / "b.npy"]
+    with pytest.raises(RuntimeError, match="disk full"):
+        score_models([tmp_path / "w.json"] * 2, tmp_path / "stack.npy", outs, block_rows=8, n_workers=2)
+    assert len(closed) == 2
+
+
+def test_models_with_the_same_stem_get_distinct_outputs(tmp_path: Path):
+    make_stack(tmp_path)
+    weights = []
+    for run, bias in (("run_a", 0.0), ("run_b", 1.0)):
+        (tmp_path / run).mkdir()
+        save_logit_weights([0.5], bias, tmp_path / run / "logit_weights.json", feature_cols=["A00"])
+        weights.append(tmp_path / run / "logit_weights.json")
+
+    outs = output_paths(weights, tmp_path / "out")
+    assert [o.name for o in outs] == ["run_a_logit_weights_risk.npy", "run_b_logit_weights_risk.npy"]
+    assert len(set(output_paths([weights[0], weights[0], weights[1]], tmp_path / "out"))) == 3
+
+    score_models(weights, tmp_path / "stack.npy", outs)
+    a, b = np.load(outs[0]), np.load(outs[1])
+    np.testing.assert_allclose(b[0] - a[0], 1.0, rtol=1e-6)
+
+    with pytest.raises(ValueError, match="same output"):
+        score_models(weights, tmp_path / "stack.npy", [tmp_path / "x.npy", tmp_path / "." / "x.npy"])
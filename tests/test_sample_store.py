@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.modeling.sample_store import SampleStore, ingest_csv
+from src.modeling.train_logit import FEATURE_COLS, train_from_csv, train_from_store
+
+from test_train_logit import make_df
+
+
+def write_shards(tmp_path: Path, n=400, n_shards=2):
+    df = make_df(n=n, years=(2018, 2019, 2020), pos_rate=0.3)
+    df[".geo"] = '{"type":"Point","coordinates":[-62.1,-9.3]}'
+    df["system:index"] = [f"0_{i}" for i in range(n)]
+    paths = []
+    bounds = np.linspace(0, n, n_shards + 1).astype(int)
+    for i in range(n_shards):
+        p = tmp_path / f"shard_{i}.csv"
+        df.iloc[bounds[i] : bounds[i + 1]].to_csv(p, index=False)
+        paths.append(p)
+    return df, paths
+
+
+def test_ingest_roundtrip_and_partition_pruning(tmp_path: Path):
+    df, paths = write_shards(tmp_path)
+    store = ingest_csv(paths, tmp_path / "store", chunksize=64)
+
+    assert store.years == [2018, 2019, 2020]
+    assert store.n_rows() == len(df)
+
+    X, y = store.load_xy([2019])
+    ref = df[df["tYear"] == 2019]
+    assert X.dtype == np.float32 and X.shape == (len(ref), len(FEATURE_COLS))
+    np.testing.assert_array_equal(X, ref[FEATURE_COLS].to_numpy(np.float32))
+    np.testing.assert_array_equal(y, ref["label"].to_numpy())
+
+    X2, _ = store.load_xy([2018, 2020], feature_cols=["A03", "dist_to_road_m"])
+    ref2 = df[df["tYear"].isin([2018, 2020])].sort_values("tYear", kind="stable")
+    np.testing.assert_array_equal(X2, ref2[["A03", "dist_to_road_m"]].to_numpy(np.float32))
+
+    chunks = list(store.iter_chunks([2018, 2019], chunk_rows=50))
+    assert sum(len(c[1]) for c in chunks) == store.n_rows([2018, 2019])
+    assert max(len(c[1]) for c in chunks) <= 50
+
+
+def test_ingest_replaces_store_and_cleans_up_failed_runs(tmp_path: Path):
+    df, paths = write_shards(tmp_path)
+    ingest_csv(paths, tmp_path / "store", chunksize=64)
+
+    only_2019 = tmp_path / "only_2019.csv"
+    df[df["tYear"] == 2019].to_csv(only_2019, index=False)
+    store = ingest_csv([only_2019], tmp_path / "store")
+    assert store.years == [2019]
+    assert sorted(d.name for d in (tmp_path / "store").glob("tYear=*")) == ["tYear=2019"]
+
+    broken = tmp_path / "broken.csv"
+    bad = df.copy()
+    bad["A07"] = bad["A07"].astype(object)
+    bad.loc[bad.index[300], "A07"] = "oops"  # fails in a later chunk, after buffers were written
+    bad.to_csv(broken, index=False)
+    with pytest.raises(ValueError):
+        ingest_csv([broken], tmp_path / "store", chunksize=64)
+    assert not list((tmp_path / "store").rglob("*.tmp"))
+    assert SampleStore(tmp_path / "store").years == [2019]
+
+
+def test_train_from_store_matches_csv(tmp_path: Path):
+    df, paths = write_shards(tmp_path, n_shards=1)
+    ingest_csv(paths, tmp_path / "store")
+
+    res_csv, info_csv = train_from_csv(paths[0], train_years=[2018, 2019], test_year=2020)
+    res_st, info_st = train_from_store(tmp_path / "store", train_years=[2018, 2019], test_year=2020)
+
+    assert info_st == info_csv
+    np.testing.assert_allclose(res_st.w_raw, res_csv.w_raw, rtol=1e-4, atol=1e-6)
+    assert res_st.b_raw == pytest.approx(res_csv.b_raw, rel=1e-4, abs=1e-6)
+
+
+def test_store_rejects_missing_columns(tmp_path: Path):
+    df = make_df(n=20).drop(columns=["A05"])
+    p = tmp_path / "bad.csv"
+    df.to_csv(p, index=False)
+    with pytest.raises(ValueError, match="Missing cols"):
+        ingest_csv(p, tmp_path / "store")
+    with pytest.raises(ValueError, match="Not a sample store"):
+        SampleStore(tmp_path / "nowhere")
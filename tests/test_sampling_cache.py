@@ -0,0 +1,69 @@
+import importlib
+import sys
+
+import pytest
+
+import fake_ee
+
+
+@pytest.fixture
+def sampling(monkeypatch):
+    monkeypatch.setitem(sys.modules, "ee", fake_ee)
+    import src.gee.sampling as sampling
+
+    fake_ee.reset()
+    return importlib.reload(sampling)
+
+
+def _build_run(sampling, cache, years=(2018, 2019, 2020), unbiased_year=2020, stable=True):
+    region = fake_ee.Geometry.Rectangle([-63.5, -10.5, -61.5, -8.5])
+    fcs = [
+        sampling.stratified_samples_for_year(
+            y, region, n_neg=10, n_pos=10, scale=500, seed=42, use_stable_label=stable, cache=cache
+        )
+        for y in years
+    ]
+    fcs.append(
+        sampling.unbiased_forest_samples(
+            unbiased_year, region, n_pixels=100, scale=500, seed=42, use_stable_label=stable, cache=cache
+        )
+    )
+    return fcs
+
+
+def test_image_cache_reduces_nodes_built(sampling):
+    fake_ee.reset()
+    _build_run(sampling, cache=None)
+    uncached = fake_ee.nodes_built
+
+    fake_ee.reset()
+    cache = sampling.ImageCache()
+    _build_run(sampling, cache=cache)
+    cached = fake_ee.nodes_built
+
+    assert cached < uncached
+    assert cache.hits > 0
+
+
+def test_image_cache_shrinks_sampling_graph(sampling):
+    region = fake_ee.Geometry.Rectangle([-63.5, -10.5, -61.5, -8.5])
+
+    plain = sampling.sampling_image_for_year(2019, region, 500, use_stable_label=True)
+    cached = sampling.sampling_image_for_year(2019, region, 500, use_stable_label=True, cache=sampling.ImageCache())
+
+    assert fake_ee.graph_size(cached) < fake_ee.graph_size(plain)
+
+
+def test_image_cache_keys_on_year_region_and_params(sampling):
+    cache = sampling.ImageCache()
+    r1 = fake_ee.Geometry.Rectangle([0, 0, 1, 1])
+    r2 = fake_ee.Geometry.Rectangle([1, 1, 2, 2])
+
+    assert sampling.modis_lc_for_year(2019, r1, cache) is sampling.modis_lc_for_year(2019, r1, cache)
+    assert sampling.modis_lc_for_year(2019, r1, cache) is not sampling.modis_lc_for_year(2020, r1, cache)
+    assert sampling.modis_lc_for_year(2019, r1, cache) is not sampling.modis_lc_for_year(2019, r2, cache)
+
+    f_a = sampling.frontier_features_for_year(2019, r1, 500, nf_max_km=5, cache=cache)
+    f_b = sampling.frontier_features_for_year(2019, r1, 500, nf_max_km=30, cache=cache)
+    assert f_a is not f_b
+    assert f_a is sampling.frontier_features_for_year(2019, r1, 500, nf_max_km=5, cache=cache)
@@ -0,0 +1,112 @@
+from pathlib import Path
+
+import pytest
+
+from src.gee.scheduler import (
+    COMPLETED,
+    FAILED,
+    ExportJob,
+    ExportManifest,
+    ExportScheduler,
+    SchedulerConfig,
+    split_bbox,
+)
+
+
+class FakeTaskBackend:
+    """Local task backend: each task runs for `run_polls` polls, then completes or fails as scripted."""
+
+    def __init__(self, failures=None, run_polls=2):
+        self.failures = dict(failures or {})  # key -> list of error messages, one per failing attempt
+        self.run_polls = run_polls
+        self.tasks = {}
+        self.started = []
+        self.max_running = 0
+
+    def start(self, job):
+        task_id = f"T{len(self.started)}"
+        errors = self.failures.get(job.key, [])
+        error = errors.pop(0) if errors else None
+        self.tasks[task_id] = {"job": job.key, "polls": 0, "error": error, "tile_scale": job.tile_scale}
+        self.started.append((job.key, job.tile_scale))
+        self.max_running = max(self.max_running, self._running())
+        return task_id
+
+    def status(self, task_id):
+        t = self.tasks[task_id]
+        t["polls"] += 1
+        if t["polls"] < self.run_polls:
+            return {"state": "RUNNING"}
+        if t["error"]:
+            return {"state": "FAILED", "error_message": t["error"]}
+        return {"state": COMPLETED}
+
+    def _running(self):
+        return sum(1 for t in self.tasks.values() if t["polls"] < self.run_polls)
+
+
+def make_jobs(n_tiles=(3, 2), years=(2018, 2019)):
+    tiles = split_bbox([-64, -11, -58, -7], *n_tiles)
+    return [
+        ExportJob(key=f"train_{y}_{t.name}", kind="train", year=y, tile=t, tile_scale=2)
+        for t in tiles
+        for y in years
+    ]
+
+
+def run(backend, manifest_path, jobs, **cfg):
+    sched = ExportScheduler(
+        backend, ExportManifest.load(manifest_path), SchedulerConfig(**cfg), sleep=lambda s: None, log=lambda m: None
+    )
+    return sched.run(jobs)
+
+
+def test_split_bbox_covers_bbox():
+    tiles = split_bbox([-64, -11, -58, -7], 3, 2)
+    assert len(tiles) == 6
+    assert {t.name for t in tiles} == {f"x{i}y{j}" for i in range(3) for j in range(2)}
+    assert min(t.xmin for t in tiles) == -64 and max(t.xmax for t in tiles) == -58
+    assert min(t.ymin for t in tiles) == -11 and max(t.ymax for t in tiles) == -7
+    assert sum((t.xmax - t.xmin) * (t.ymax - t.ymin) for t in tiles) == pytest.approx(24.0)
+
+
+def test_scheduler_respects_concurrency_cap(tmp_path: Path):
+    backend = FakeTaskBackend(run_polls=3)
+    manifest = run(backend, tmp_path / "m.json", make_jobs(), max_concurrent=3)
+
+    assert backend.max_running <= 3
+    assert len(backend.started) == 12
+    assert all(j.state == COMPLETED for j in manifest.jobs.values())
+
+
+def test_scheduler_retries_timeouts_with_higher_tile_scale(tmp_path: Path):
+    backend = FakeTaskBackend(
+        failures={
+            "train_2018_x0y0": ["Computation timed out.", "User memory limit exceeded."],
+            "train_2019_x1y1": ["Computation timed out."] * 5,
+        }
+    )
+    manifest = run(backend, tmp_path / "m.json", make_jobs(), max_retries=2, max_tile_scale=16)
+
+    scales = [s for k, s in backend.started if k == "train_2018_x0y0"]
+    assert scales == [2, 4, 8]
+    assert manifest.jobs["train_2018_x0y0"].state == COMPLETED
+
+    hopeless = manifest.jobs["train_2019_x1y1"]
+    assert hopeless.state == FAILED
+    assert hopeless.attempts == 3
+    assert "timed out" in hopeless.error
+
+
+def test_scheduler_resumes_from_manifest(tmp_path: Path):
+    path = tmp_path / "m.json"
+    jobs = make_jobs()
+    run(FakeTaskBackend(), path, jobs[:4])
+
+    reloaded = ExportManifest.load(path)
+    assert sum(j.state == COMPLETED for j in reloaded.jobs.values()) == 4
+
+    backend = FakeTaskBackend()
+    manifest = run(backend, path, make_jobs())
+    assert len(backend.started) == len(jobs) - 4
+    assert all(j.state == COMPLETED for j in manifest.jobs.values())
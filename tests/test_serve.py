@@ -0,0 +1,128 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from src.modeling.export_weights import save_logit_weights
+from src.modeling.serve import ScoringService
+from src.modeling.train_logit import FEATURE_COLS
+
+
+async def request(port: int, method: str, path: str, body=None) -> tuple[int, dict]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = b"" if body is None else json.dumps(body).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def test_concurrent_requests_are_batched_and_match_formula(tmp_path: Path):
+    rng = np.random.default_rng(0)
+    w = rng.normal(size=len(FEATURE_COLS)) * 0.1
+    save_logit_weights(w, -0.5, tmp_path / "w.json", feature_cols=FEATURE_COLS)
+    X = rng.normal(size=(200, len(FEATURE_COLS)))
+
+    async def run():
+        service = ScoringService(tmp_path / "w.json", max_wait_ms=20)
+        port = await service.start(port=0)
+        try:
+            results = await asyncio.gather(*[request(port, "POST", "/score", {"x": list(x)}) for x in X[:100]])
+            many = await request(port, "POST", "/score", {"X": X[100:].tolist()})
+            named = await request(port, "POST", "/score", {"rows": [dict(zip(FEATURE_COLS, X[0]))]})
+            bad = await request(port, "POST", "/score", {"x": [1.0, 2.0]})
+            malformed = [
+                await request(port, "POST", "/score", body)
+                for body in ({"rows": [1, 2]}, {"X": [[{}] * len(FEATURE_COLS)]}, [1, 2])
+            ]
+            stats = await request(port, "GET", "/stats")
+        finally:
+            await service.stop()
+        return results, many, named, bad, malformed, stats
+
+    results, many, named, bad, malformed, stats = asyncio.run(run())
+    z = X @ w - 0.5
+    assert all(status == 200 for status, _ in results)
+    np.testing.assert_allclose([r["score"][0] for _, r in results], z[:100])
+    np.testing.assert_allclose(many[1]["prob"], 1 / (1 + np.exp(-z[100:])))
+    np.testing.assert_allclose(named[1]["score"], results[0][1]["score"])
+    assert bad[0] == 400 and "66 values" in bad[1]["error"]
+    assert [status for status, _ in malformed] == [400, 400, 400]
+
+    s = stats[1]
+    assert s["requests"] == 102 and s["points"] == 201 and s["errors"] == 4
+    assert s["batches"] < 50  # concurrent single-point requests were coalesced
+    assert s["p99_ms"] is not None and s["model"]["version"] == 1
+
+
+def test_hot_reload_on_file_change(tmp_path: Path):
+    path = tmp_path / "w.json"
+    save_logit_weights([1.0, 2.0], 0.0, path, feature_cols=["A00", "A01"])
+
+    async def run():
+        service = ScoringService(path, reload_s=0.0)
+        port = await service.start(port=0)
+        try:
+            first = await request(port, "POST", "/score", {"x": [1.0, 1.0]})
+            save_logit_weights([0.5, 0.5, 0.5], 1.0, path, feature_cols=["A00", "A01", "A02"])
+            st = os.stat(path)
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+            second = await request(port, "POST", "/score", {"rows": [{"A00": 1.0, "A01": 1.0, "A02": 2.0}]})
+            path.write_text("{not json")
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+            third = await request(port, "POST", "/score", {"x": [0.0, 0.0, 0.0]})
+            stats = await request(port, "GET", "/stats")
+        finally:
+            await service.stop()
+        return first, second, third, stats
+
+    first, second, third, stats = asyncio.run(run())
+    assert first[1]["score"] == [3.0] and first[1]["model"]["version"] == 1
+    assert second[1]["score"] == [3.0] and second[1]["model"]["version"] == 2
+    assert third[1]["score"] == [1.0] and third[1]["model"]["version"] == 2  # broken file: previous model kept
+    assert stats[1]["reload_error"].startswith("JSONDecodeError")
+
+
+def test_stale_batch_skips_cancelled_waiters(tmp_path: Path):
+    save_logit_weights([1.0, 2.0], 0.0, tmp_path / "w.json", feature_cols=["A00", "A01"])
+
+    async def run():
+        service = ScoringService(tmp_path / "w.json")
+        loop = asyncio.get_running_loop()
+        gone, waiting, ok = loop.create_future(), loop.create_future(), loop.create_future()
+        gone.cancel()
+        three = np.zeros((1, 3))  # parsed for a 3-band model that has since been replaced
+        old = ["A00", "A01", "A02"]
+        service.batcher._score([(three, old, gone), (three, old, waiting), (np.ones((1, 2)), ["A00", "A01"], ok)])
+        return waiting, ok
+
+    waiting, ok = asyncio.run(run())
+    assert "resend" in str(waiting.exception())
+    np.testing.assert_allclose(ok.result()[0], [3.0])
+
+
+def test_rows_parsed_for_a_replaced_model_with_other_bands_are_rejected(tmp_path: Path):
+    path = tmp_path / "w.json"
+    save_logit_weights([1.0, 2.0], 0.0, path, feature_cols=["A00", "A01"])
+
+    async def run():
+        service = ScoringService(path, reload_s=0.0)
+        loop = asyncio.get_running_loop()
+        X = np.array([[1.0, 10.0]])
+        old_cols = service.handle.current().feature_cols
+        # a pruned model with the same band count but other bands replaces it before the batch runs
+        save_logit_weights([1.0, 2.0], 0.0, path, feature_cols=["A00", "A05"])
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        stale, fresh = loop.create_future(), loop.create_future()
+        service.batcher._score([(X, old_cols, stale), (X, ["A00", "A05"], fresh)])
+        return stale, fresh, service.handle.current().version
+
+    stale, fresh, version = asyncio.run(run())
+    assert version == 2
+    assert isinstance(stale.exception(), ValueError) and "resend" in str(stale.exception())
+    np.testing.assert_allclose(fresh.result()[0], [21.0])
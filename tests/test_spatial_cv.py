@@ -0,0 +1,122 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.modeling.sample_store import ingest_csv
+from src.modeling.spatial_cv import (
+    add_lonlat_and_tiles,
+    group_kfold,
+    parse_point_geo,
+    spatial_cv,
+    spatial_holdout_eval,
+    spatial_holdout_metrics,
+    tile_groups,
+)
+from src.modeling.train_logit import FEATURE_COLS
+
+from test_train_logit import make_signal_df
+
+
+def with_geo(df: pd.DataFrame, seed=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    lon = rng.uniform(-64, -58, len(df))
+    lat = rng.uniform(-11, -7, len(df))
+    df = df.copy()
+    df[".geo"] = [json.dumps({"type": "Point", "coordinates": [float(x), float(y)]}) for x, y in zip(lon, lat)]
+    df.loc[df.index[3], ".geo"] = np.nan
+    return df
+
+
+def notebook_tiles(df: pd.DataFrame, tile_km: float) -> pd.DataFrame:
+    """The row-by-row implementation from the notebook, as the reference."""
+
+    def parse_pt(g):
+        if pd.isna(g):
+            return np.nan, np.nan
+        lon, lat = json.loads(g)["coordinates"]
+        return lon, lat
+
+    coords = df[".geo"].apply(parse_pt)
+    df = df.copy()
+    df["lon"] = coords.apply(lambda t: t[0])
+    df["lat"] = coords.apply(lambda t: t[1])
+    deg_per_km_lat = 1.0 / 111.32
+    deg_per_km_lon = deg_per_km_lat / np.cos(np.deg2rad(df["lat"].clip(-89.9, 89.9)))
+    df["tile_x"] = np.floor(df["lon"] / (tile_km * deg_per_km_lon)).astype("Int64")
+    df["tile_y"] = np.floor(df["lat"] / (tile_km * deg_per_km_lat)).astype("Int64")
+    df["tile_id"] = df["tile_x"].astype(str) + "_" + df["tile_y"].astype(str)
+    return df
+
+
+def test_vectorized_tiles_match_notebook():
+    df = with_geo(make_signal_df(n=500))
+    ref = notebook_tiles(df, tile_km=50.0)
+    got = add_lonlat_and_tiles(df, tile_km=50.0)
+
+    np.testing.assert_array_equal(got["lon"].to_numpy(), ref["lon"].to_numpy())
+    np.testing.assert_array_equal(got["lat"].to_numpy(), ref["lat"].to_numpy())
+    assert got["tile_id"].tolist() == ref["tile_id"].tolist()
+
+    lon, lat = parse_point_geo(df[".geo"])
+    groups = tile_groups(lon, lat, 50.0)
+    assert groups[3] == -1
+    # same tile id <=> same group
+    codes = pd.factorize(ref["tile_id"])[0]
+    valid = groups >= 0
+    assert len(set(zip(groups[valid], codes[valid]))) == len(set(codes[valid]))
+
+
+def test_group_kfold_keeps_tiles_whole():
+    groups = np.repeat(np.arange(12), 7)
+    groups[:3] = -1
+    folds = group_kfold(groups, n_folds=4, seed=1)
+    assert set(folds[:3]) == {-1}
+    for g in range(1, 12):
+        assert len(set(folds[groups == g])) == 1
+    assert set(folds[3:]) == {0, 1, 2, 3}
+    with pytest.raises(ValueError, match="at least 5 tiles"):
+        group_kfold(np.arange(4), n_folds=5)
+
+
+def test_spatial_cv_from_store(tmp_path: Path):
+    df = with_geo(make_signal_df(n=800))
+    df.to_csv(tmp_path / "train.csv", index=False)
+    store = ingest_csv(tmp_path / "train.csv", tmp_path / "store", chunksize=300)
+    assert store.has_lonlat
+
+    X, y = store.load_xy([2018, 2019])
+    lon, lat = store.load_lonlat([2018, 2019])
+    sub = df[df["tYear"].isin([2018, 2019])].sort_values("tYear", kind="stable")
+    ref_lon, _ = parse_point_geo(sub[".geo"])
+    np.testing.assert_array_equal(lon, ref_lon)
+
+    groups = tile_groups(lon, lat, tile_km=100.0)
+    Xu, yu = store.load_xy([2020])
+    table = spatial_cv(X, y, groups, n_folds=3, eval_sets={"unbiased": (Xu, yu)}, n_workers=2)
+
+    assert list(table["fold"]) == [0, 1, 2]
+    assert table["test_n"].sum() == int((groups >= 0).sum())
+    assert (table["holdout_roc_auc"] > 0.7).all()
+    assert {"unbiased_pr_auc", "holdout_capture@5"} <= set(table.columns)
+
+
+def test_spatial_holdout_eval_reports_both_sets():
+    df = with_geo(make_signal_df(n=600))
+    tr, te = df[df["tYear"] < 2020], df[df["tYear"] == 2020]
+    model, tiles, metrics = spatial_holdout_metrics(tr, te, FEATURE_COLS, tile_km=100.0, seed=42)
+    assert metrics["holdout_tiles"] == len(tiles) >= 1
+    assert metrics["unbiased_n"] == len(te)
+    assert 0.0 <= metrics["holdout_roc_auc"] <= 1.0
+
+    # the notebook's call: name= and a (model, tiles) pair
+    model_spatial, nb_tiles = spatial_holdout_eval(
+        train_df=tr, test_df=te, feature_cols=FEATURE_COLS, tile_km=100.0, seed=42, name="LOGIT (emb+ctx)"
+    )
+    assert nb_tiles == tiles
+    Xt = te[FEATURE_COLS].to_numpy(np.float32)
+    np.testing.assert_allclose(model_spatial.predict_proba(Xt)[:, 1], model.predict_proba(Xt)[:, 1])
+    named = spatial_holdout_metrics(tr, te, FEATURE_COLS, tile_km=100.0, seed=42, name="LOGIT")[2]
+    assert named["LOGIT_unbiased_roc_auc"] == metrics["unbiased_roc_auc"]
@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.modeling.metrics import RankedScores
+from src.modeling.sample_store import SampleStore, ingest_csv
+from src.modeling.sweep import (
+    CTX_COLS,
+    Split,
+    _open_shared,
+    best_by,
+    expanding_splits,
+    parse_splits,
+    run_sweep,
+    share_split,
+)
+from src.modeling.train_logit import FEATURE_COLS, fit_logit
+
+from test_train_logit import make_signal_df
+
+
+@pytest.fixture
+def store(tmp_path: Path):
+    df = make_signal_df(n=900)
+    df.to_csv(tmp_path / "train.csv", index=False)
+    ingest_csv(tmp_path / "train.csv", tmp_path / "store")
+    return df, tmp_path / "store"
+
+
+def test_parse_and_expanding_splits():
+    assert parse_splits("2018,2019:2020; 2018") == [Split((2018, 2019), 2020), Split((2018,), None)]
+    assert expanding_splits([2020, 2018, 2019]) == [Split((2018,), 2019), Split((2018, 2019), 2020)]
+    with pytest.raises(ValueError, match="without train years"):
+        parse_splits(":2020")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sweep_table_matches_independent_fits(store, workers):
+    df, path = store
+    Cs = [1.0, 0.01, 0.1]
+    table = run_sweep(
+        path,
+        Cs,
+        splits=[Split((2018, 2019), 2020)],
+        feature_sets={"all": FEATURE_COLS, "context": CTX_COLS},
+        n_workers=workers,
+    )
+    assert len(table) == 6
+    assert list(table[table["feature_set"] == "all"]["C"]) == [0.01, 0.1, 1.0]
+
+    # warm-started path gives the same models as cold single fits
+    tr = df[df["tYear"].isin([2018, 2019])]
+    te = df[df["tYear"] == 2020]
+    for C in Cs:
+        model = fit_logit(tr[FEATURE_COLS].to_numpy(np.float32), tr["label"].to_numpy(), C=C)
+        p = model.predict_proba(te[FEATURE_COLS].to_numpy(np.float32))[:, 1]
+        ref = RankedScores(te["label"].to_numpy(), p)
+        row = table[(table["feature_set"] == "all") & (table["C"] == C)].iloc[0]
+        assert row["test_n"] == len(te)
+        assert row["test_roc_auc"] == pytest.approx(ref.roc_auc(), abs=1e-4)
+        assert row["test_capture@5"] == pytest.approx(ref.topk_report([5])[0]["capture"], abs=0.05)
+
+    best = best_by(table, "test_roc_auc")
+    assert set(best["feature_set"]) == {"all", "context"}
+
+
+def test_shared_split_matches_per_task_standardization(store, tmp_path: Path):
+    _, path = store
+    st = SampleStore(path)
+    split = Split((2018, 2019), 2020)
+    shared = share_split(st, split, FEATURE_COLS, tmp_path / "shared")
+
+    X, y, _ = _open_shared(shared, FEATURE_COLS)
+    assert isinstance(X, np.memmap) and not X.flags.writeable  # the workers' common pages
+    for cols in (FEATURE_COLS, CTX_COLS):
+        Xs, ys, moments = _open_shared(shared, cols)
+        ref, yref, mref = st.load_standardized(split.train_years, feature_cols=cols)
+        np.testing.assert_allclose(Xs, ref, rtol=1e-6, atol=1e-6)
+        np.testing.assert_array_equal(ys, yref)
+        np.testing.assert_allclose(moments.to_scaler().scale_, mref.to_scaler().scale_)
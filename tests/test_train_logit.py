@@ -4,7 +4,22 @@ import numpy as np
 import pandas as pd
 import pytest
 
-from src.modeling.train_logit import FEATURE_COLS, train_from_csv
+from src.modeling.sample_store import ingest_csv
+from src.modeling.train_logit import (
+    FEATURE_COLS,
+    RunningMoments,
+    TrainState,
+    fit_logit,
+    fit_logit_streaming,
+    load_xy,
+    raw_space_weights,
+    state_path_for,
+    train_from_csv,
+    train_from_store,
+    train_incremental,
+    train_lean,
+    train_streaming,
+)
 
 
 def make_df(n=200, years=(2018, 2019, 2020), pos_rate=0.3, seed=0) -> pd.DataFrame:
@@ -59,3 +74,140 @@ def test_train_from_csv_raises_on_empty_train_split(tmp_path: Path):
 
     with pytest.raises(ValueError, match="No rows found for train_years"):
         train_from_csv(train_csv=train_csv, train_years=[2050])
+
+
+def make_signal_df(n=1500, seed=1) -> pd.DataFrame:
+    df = make_df(n=n, years=(2018, 2019, 2020), seed=seed)
+    rng = np.random.default_rng(seed)
+    # frontier columns live on a metre scale in the real data
+    df["dist_to_nonforest_m"] = df["dist_to_nonforest_m"] * 1000 + 5000
+    df["dist_to_road_m"] = df["dist_to_road_m"] * 5000 + 20000
+    z = df["A00"] + 0.5 * df["A03"] - df["dist_to_road_m"] / 20000 + rng.normal(size=n)
+    df["label"] = (z > 0.0).astype(int)
+    return df
+
+
+def test_fit_logit_streaming_matches_in_memory_fit():
+    df = make_signal_df()
+    X, y = load_xy(df)
+
+    w_ref, b_ref = raw_space_weights(fit_logit(X, y))
+
+    def chunks():
+        for i in range(0, len(y), 128):
+            yield X[i : i + 128], y[i : i + 128]
+
+    model = fit_logit_streaming(chunks)
+    w, b = raw_space_weights(model)
+
+    np.testing.assert_allclose(w, w_ref, rtol=1e-2, atol=1e-3)
+    assert b == pytest.approx(b_ref, abs=1e-3)
+    np.testing.assert_allclose(model.predict_proba(X)[:, 1], fit_logit(X, y).predict_proba(X)[:, 1], atol=5e-3)
+
+
+def test_fit_logit_streaming_rejects_single_class_before_fitting():
+    df = make_signal_df()
+    X, y = load_xy(df)
+    passes = []
+
+    def chunks():
+        passes.append(1)
+        yield X, np.zeros_like(y)
+
+    with pytest.raises(ValueError, match="both classes"):
+        fit_logit_streaming(chunks)
+    assert len(passes) == 1  # failed on the statistics pass
+
+
+def test_train_streaming_from_csv(tmp_path: Path):
+    df = make_signal_df()
+    train_csv = tmp_path / "train.csv"
+    df.to_csv(train_csv, index=False)
+
+    res_ref, info_ref = train_from_csv(train_csv, train_years=[2018, 2019], test_year=2020)
+    res, info = train_streaming(train_csv, train_years=[2018, 2019], test_year=2020, chunk_rows=100)
+
+    assert info["train_n"] == info_ref["train_n"]
+    assert info["test_n"] == info_ref["test_n"]
+    assert info["train_pos_rate"] == pytest.approx(info_ref["train_pos_rate"])
+    np.testing.assert_allclose(res.w_raw, res_ref.w_raw, rtol=1e-2, atol=1e-3)
+
+
+def test_running_moments_merge_matches_numpy():
+    rng = np.random.default_rng(3)
+    X = rng.normal(loc=5.0, scale=3.0, size=(1000, 4))
+    m = RunningMoments()
+    for i in range(0, 1000, 97):
+        m.update(X[i : i + 97])
+    assert m.count == 1000
+    np.testing.assert_allclose(m.mean, X.mean(axis=0))
+    np.testing.assert_allclose(m.var, X.var(axis=0))
+
+
+def test_incremental_year_matches_full_refit(tmp_path: Path):
+    df = make_signal_df(n=2400)
+    df.to_csv(tmp_path / "train.csv", index=False)
+    ingest_csv(tmp_path / "train.csv", tmp_path / "store")
+
+    res_old, _ = train_from_store(tmp_path / "store", train_years=[2018, 2019])
+    state_path = state_path_for(tmp_path / "w.json")
+    TrainState.from_result(res_old, [2018, 2019], C=1.0).save(state_path)
+    assert state_path.name == "w.state.npz"
+
+    res, info, state = train_incremental(tmp_path / "store", TrainState.load(state_path), new_years=[2020])
+    res_full, info_full = train_from_store(tmp_path / "store", train_years=[2018, 2019, 2020])
+
+    assert info["train_n"] == info_full["train_n"] and state.years == [2018, 2019, 2020]
+    scaler_full = res_full.model.named_steps["scaler"]
+    np.testing.assert_allclose(res.model.named_steps["scaler"].mean_, scaler_full.mean_, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(res.model.named_steps["scaler"].scale_, scaler_full.scale_, rtol=1e-5)
+    np.testing.assert_allclose(res.w_raw, res_full.w_raw, rtol=1e-2, atol=1e-3)
+    assert info["n_iter"] < int(res_full.model.named_steps["clf"].n_iter_[0])
+
+    with pytest.raises(ValueError, match="No new years"):
+        train_incremental(tmp_path / "store", state, new_years=[2020])
+
+
+def test_train_lean_matches_train_from_csv(tmp_path: Path):
+    df = make_signal_df()
+    train_csv = tmp_path / "train.csv"
+    df.to_csv(train_csv, index=False)
+    ingest_csv(train_csv, tmp_path / "store")
+
+    res_ref, info_ref = train_from_csv(train_csv, train_years=[2018, 2019], test_year=2020)
+    X, _ = load_xy(df)
+    p_ref = res_ref.model.predict_proba(X)[:, 1]
+    for source, kwargs in ((train_csv, {"chunk_rows": 111}), (tmp_path / "store", {})):
+        res, info = train_lean(source, train_years=[2018, 2019], test_year=2020, **kwargs)
+        assert info == info_ref
+        np.testing.assert_allclose(res.w_raw, res_ref.w_raw, rtol=1e-3, atol=1e-4)
+        np.testing.assert_allclose(res.model.predict_proba(X)[:, 1], p_ref, atol=1e-4)
+
+
+def test_max_features_budget_keeps_informative_bands(tmp_path: Path):
+    df = make_df(n=2000, seed=3)
+    z = 2.0 * df["A03"] - 1.5 * df["A10"] + df["dist_to_road_m"]
+    df["label"] = (z + np.random.default_rng(3).normal(size=len(df)) > 0).astype(int)
+    csv = tmp_path / "train.csv"
+    df.to_csv(csv, index=False)
+
+    res, _ = train_from_csv(csv, train_years=[2018, 2019, 2020], max_features=3)
+    assert len(res.feature_cols) <= 3 and len(res.w_raw) == len(res.feature_cols)
+    assert {"A03", "A10"} <= set(res.feature_cols)
+    assert res.feature_cols == [c for c in FEATURE_COLS if c in res.feature_cols]  # original order
+
+    X = df[res.feature_cols].to_numpy(np.float32)
+    p = res.model.predict_proba(X)[:, 1]
+    manual = 1 / (1 + np.exp(-(X @ res.w_raw + res.b_raw)))
+    np.testing.assert_allclose(p, manual, rtol=1e-4, atol=1e-6)
+
+
+def test_l1_ratio_without_budget_prunes_noise(tmp_path: Path):
+    df = make_df(n=1500, seed=4)
+    df["label"] = (df["A00"] + 0.1 * np.random.default_rng(4).normal(size=len(df)) > 0).astype(int)
+    csv = tmp_path / "train.csv"
+    df.to_csv(csv, index=False)
+
+    res, _ = train_from_csv(csv, train_years=[2018, 2019, 2020], C=0.01, l1_ratio=1.0)
+    assert "A00" in res.feature_cols
+    assert len(res.feature_cols) < len(FEATURE_COLS)